@@ -1,4 +1,4 @@
-﻿import time
+﻿import os
 import urllib.parse
 from datetime import datetime, timedelta, timezone
 
@@ -16,25 +16,31 @@ from kiwoom_provider import (
     get_stock_snapshots as get_kiwoom_snapshots,
     get_top_stocks as get_kiwoom_top_stocks,
 )
-from scraper import get_market_indices, get_stock_info, get_stock_snapshots, get_top_stocks
-from themes import get_theme, get_theme_list, get_theme_members
+import metrics
+from circuit_breaker import OPEN, breaker_status, source_states
+from hedging import LATENCY, hedge_delay, hedged_call
+from dashboard_engine import (
+    TopListFilter,
+    add_momentum,
+    build_theme_table,
+    build_top_table,
+    expand_themes,
+    filter_top_stocks,
+    quote_lookup_from,
+)
+from quote_history import MOMENTUM_FIELDS
+from quote_scheduler import REQUEST_BUDGETS, QuoteScheduler
+from quote_service import QuoteServiceError, fetch_remote, fetch_remote_quotes
+from snapshot_recorder import record_batch
+from last_quotes import LastKnownQuotes, get_last_known
+from security_master import get_master
+from theme_matrix import get_theme_matrix
+from theme_strength import get_theme_strength
+import warmup
+from scraper import get_market_indices, get_stock_info, get_stock_snapshots, get_top_stocks, refresh_from_sweep
 
 st.set_page_config(page_title='Blue Key Project', layout='wide')
 
-ETF_KEYWORDS = [
-    'KODEX',
-    'TIGER',
-    'KBSTAR',
-    'KOSEF',
-    'ACE',
-    'SOL',
-    'ARIRANG',
-    'HANARO',
-    'ETN',
-    '레버리지',
-    '인버스',
-    '선물',
-]
 TOP_COLUMNS = ['거래대금 순위', '종목명', '테마', '현재가', '등락률', '거래대금 (백만)', '시가총액 (억)']
 DETAIL_COLUMNS = ['종목명', '현재가', '등락률', '거래대금 (백만)', '시가총액 (억)']
 RATE_COL = '등락률'
@@ -42,30 +48,79 @@ PRICE_COL = '현재가'
 AMOUNT_COL = '거래대금 (백만)'
 MCAP_COL = '시가총액 (억)'
 NAME_COL = '종목명'
+# Momentum from the in-process quote history; empty until a code has a few minutes of samples.
+MOMENTUM_COLUMNS = ['1분 Δ', '5분 Δ', '대금 가속', '신고가']
+MOMENTUM_FORMATS = {'1분 Δ': '{:+.2f}', '5분 Δ': '{:+.2f}', '대금 가속': '{:.1f}x'}
 DATA_SOURCE_OPTIONS = {
     'Naver Finance': 'naver',
     'Kiwoom REST API': 'kiwoom',
 }
 CACHE_VERSION = '2026-04-26-kiwoom-toplist-v2'
+# Index metrics are cached for 20s, so polling them faster only repaints the same values.
+INDEX_REFRESH_SECONDS = 20
+# When set, quotes come from a shared quote_service.py instead of scraping upstream directly.
+QUOTE_API_URL = os.getenv('BLUEKEY_QUOTE_API_URL', '').strip()
 
 
-@st.cache_data(ttl=20, show_spinner=False)
+@metrics.cache_loader(st.cache_data(ttl=20, show_spinner=False))
 def load_market_indices(cache_version: str):
+    if QUOTE_API_URL:
+        try:
+            return fetch_remote(QUOTE_API_URL, '/indices')['indices']
+        except (QuoteServiceError, OSError):
+            metrics.record_error('quote_api.indices')
     return get_market_indices()
 
 
-@st.cache_data(ttl=20, show_spinner=False)
+@metrics.cache_loader(st.cache_data(ttl=20, show_spinner=False))
 def load_top_stocks_cached(source: str, limit: int, sort_by: str, cache_version: str):
     if source == 'kiwoom':
-        return get_kiwoom_top_stocks(limit=limit, sort_by=sort_by)
-    return get_top_stocks(limit=limit, sort_by=sort_by)
+        stocks = get_kiwoom_top_stocks(limit=limit, sort_by=sort_by)
+    else:
+        stocks = get_top_stocks(limit=limit, sort_by=sort_by)
+    record_batch(stocks, source)
+    return stocks
+
+
+@metrics.cache_loader(st.cache_data(ttl=20, show_spinner=False))
+def load_top_stocks_hedged(limit: int, sort_by: str, cache_version: str):
+    stocks, source, primary_error = hedged_call(
+        ('kiwoom', lambda: get_kiwoom_top_stocks(limit=limit, sort_by=sort_by)),
+        ('naver', lambda: get_top_stocks(limit=limit, sort_by=sort_by)),
+    )
+    record_batch(stocks, source)
+    return stocks, source, str(primary_error) if primary_error else None
+
+
+@st.cache_resource(show_spinner=False)
+def boot() -> LastKnownQuotes:
+    """Once per process: warm theme indexes in the background and load the last-known quotes."""
+    warmup.warm_up()
+    return get_last_known()
+
 
+@st.cache_resource(show_spinner=False)
+def get_quote_scheduler(source: str) -> QuoteScheduler:
+    scheduler = QuoteScheduler(requests_per_minute=REQUEST_BUDGETS[source])
+    # Seeded with their original time, last-known quotes are due at once but still
+    # fill tables while the first refreshes are under way.
+    quotes, as_of = boot().quotes()
+    scheduler.observe(quotes, now=as_of)
+    return scheduler
 
-@st.cache_data(ttl=20, show_spinner=False)
-def load_stock_snapshots_cached(source: str, codes: tuple[str, ...], cache_version: str):
+
+@st.cache_resource(show_spinner=False)
+def start_metrics_exporters() -> list[str]:
+    return metrics.start_exporters()
+
+
+def fetch_stock_snapshots(source: str, codes: tuple[str, ...]):
     if source == 'kiwoom':
-        return get_kiwoom_snapshots(list(codes))
-    return get_stock_snapshots(list(codes))
+        snapshots = get_kiwoom_snapshots(list(codes))
+    else:
+        snapshots = get_stock_snapshots(list(codes))
+    record_batch(snapshots.values(), source)
+    return snapshots
 
 
 def style_rate(value):
@@ -84,66 +139,78 @@ def build_stock_link(code, name):
     return f'https://finance.naver.com/item/main.naver?code={code}&name={urllib.parse.quote(name)}'
 
 
-def normalize_int(value, default=0):
-    try:
-        return int(str(value).replace(',', ''))
-    except Exception:
-        return default
-
-
 def normalize_source(source: str) -> str:
     return source if source in {'naver', 'kiwoom'} else 'naver'
 
 
-def prepare_quote_lookup(raw_stocks, source: str):
-    quote_lookup = {}
-    preload_sources = list(raw_stocks)
-    if source == 'naver':
-        preload_sources.extend(load_top_stocks_cached('naver', 100, 'volume', CACHE_VERSION))
+def hedging_enabled(source: str) -> bool:
+    return source == 'kiwoom' and st.session_state.get('hedge_requests', True)
 
-    for stock in preload_sources:
-        code = stock.get('code')
-        if not code or code in quote_lookup:
-            continue
-        quote_lookup[code] = {
-            'price': normalize_int(stock.get('price', 0)),
-            'rate': float(pd.to_numeric(pd.Series([stock.get('rate', 0.0)]), errors='coerce').fillna(0.0).iloc[0]),
-            'amount': normalize_int(stock.get('amount', 0)),
-            'market_cap': normalize_int(stock.get('market_cap', 0)),
-        }
-    return quote_lookup
+
+def hedge_warning(what: str, primary_error: str | None) -> str:
+    if primary_error:
+        return f'Kiwoom {what} failed. Served from Naver. {primary_error}'
+    return f'Kiwoom {what} did not answer within {hedge_delay("kiwoom"):.1f}s. Served from Naver.'
 
 
 def load_top_stocks_safe(source: str, limit: int, sort_by: str):
     selected_source = normalize_source(source)
+    if QUOTE_API_URL:
+        try:
+            payload = fetch_remote(QUOTE_API_URL, '/top', source=selected_source, limit=limit, sort_by=sort_by)
+            return payload['stocks'], payload['source'], payload.get('warning')
+        except (QuoteServiceError, OSError):
+            # The service being down should not blank the dashboard; fetch directly instead.
+            metrics.record_error('quote_api.top')
     try:
+        if hedging_enabled(selected_source):
+            stocks, effective_source, primary_error = load_top_stocks_hedged(limit, sort_by, CACHE_VERSION)
+            warning = hedge_warning('top list', primary_error) if effective_source != selected_source else None
+            return stocks, effective_source, warning
         return load_top_stocks_cached(selected_source, limit, sort_by, CACHE_VERSION), selected_source, None
-    except (KiwoomConfigurationError, KiwoomRequestError) as exc:
+    # A hedged call re-raises Kiwoom's error when Naver's answer was empty too, or times out.
+    except (KiwoomConfigurationError, KiwoomRequestError, TimeoutError) as exc:
         if selected_source == 'kiwoom':
             fallback = load_top_stocks_cached('naver', limit, sort_by, CACHE_VERSION)
             return fallback, 'naver', f'Kiwoom source unavailable. Falling back to Naver. {exc}'
         raise
 
 
+def sweep_members(scheduler: QuoteScheduler, source: str, codes) -> set[str]:
+    """Quote Naver codes from the market sweep; returns the codes left for per-code refreshes."""
+    if source == 'naver':
+        return refresh_from_sweep(scheduler, codes)
+    return set(codes)
+
+
 def load_snapshots_safe(source: str, codes: set[str]):
     selected_source = normalize_source(source)
     if not codes:
         return {}, None
+    if QUOTE_API_URL:
+        try:
+            payload = fetch_remote_quotes(QUOTE_API_URL, selected_source, sorted(codes))
+            return payload['quotes'], payload.get('warning')
+        except (QuoteServiceError, OSError):
+            metrics.record_error('quote_api.quotes')
+    ordered_codes = tuple(sorted(codes))
     try:
-        return load_stock_snapshots_cached(selected_source, tuple(sorted(codes)), CACHE_VERSION), None
-    except (KiwoomConfigurationError, KiwoomRequestError) as exc:
+        if hedging_enabled(selected_source):
+            snapshots, effective_source, primary_error = hedged_call(
+                ('kiwoom', lambda: fetch_stock_snapshots('kiwoom', ordered_codes)),
+                ('naver', lambda: fetch_stock_snapshots('naver', ordered_codes)),
+            )
+            warning = hedge_warning('snapshot request', primary_error) if effective_source != selected_source else None
+            return snapshots, warning
+        return fetch_stock_snapshots(selected_source, ordered_codes), None
+    except (KiwoomConfigurationError, KiwoomRequestError, TimeoutError) as exc:
         if selected_source == 'kiwoom':
-            fallback = load_stock_snapshots_cached('naver', tuple(sorted(codes)), CACHE_VERSION)
+            fallback = fetch_stock_snapshots('naver', ordered_codes)
             return fallback, f'Kiwoom snapshot request failed. Falling back to Naver. {exc}'
         raise
 
 
-col_header, col_indices = st.columns([2.5, 1.5])
-
-with col_header:
-    st.title('Blue Key Project')
-
-with col_indices:
+def render_market_indices():
     indices = load_market_indices(CACHE_VERSION)
     if indices:
         index_col1, index_col2 = st.columns(2)
@@ -164,6 +231,300 @@ with col_indices:
     else:
         st.error('지수 정보를 불러오지 못했습니다.')
 
+
+SOURCE_STATE_LABELS = {
+    'closed': '🟢 OK',
+    'half_open': '🟡 Probing',
+    'open': '🔴 Circuit open',
+}
+
+
+def render_source_status():
+    states = source_states()
+    for source in ('naver', 'kiwoom'):
+        st.caption(f"{source.capitalize()}: {SOURCE_STATE_LABELS[states.get(source, 'closed')]}")
+    for row in breaker_status():
+        if row['state'] == OPEN:
+            st.caption(f"{row['endpoint']} skipped, next probe in {row['retry_in_s']:.0f}s ({row['last_error']})")
+
+
+def render_diagnostics():
+    endpoint_rows = metrics.endpoint_summary()
+    if endpoint_rows:
+        st.caption('Upstream requests')
+        st.dataframe(pd.DataFrame(endpoint_rows), hide_index=True, use_container_width=True)
+    cache_rows = metrics.cache_summary()
+    if cache_rows:
+        st.caption('Cache loaders')
+        st.dataframe(pd.DataFrame(cache_rows), hide_index=True, use_container_width=True)
+    parse_rows = metrics.parse_summary()
+    if parse_rows:
+        st.caption('Parse time')
+        st.dataframe(pd.DataFrame(parse_rows), hide_index=True, use_container_width=True)
+    breaker_rows = [row for row in breaker_status() if row['state'] != 'closed' or row['failures']]
+    if breaker_rows:
+        st.caption('Circuit breakers')
+        st.dataframe(pd.DataFrame(breaker_rows), hide_index=True, use_container_width=True)
+    if warmup.timings:
+        st.caption('Boot warmup: ' + ', '.join(f'{name} {seconds * 1000:.0f}ms' for name, seconds in warmup.timings.items()))
+    latency_rows = LATENCY.summary()
+    if latency_rows:
+        st.caption(f'Source latency (Kiwoom hedge delay {hedge_delay("kiwoom"):.1f}s)')
+        st.dataframe(pd.DataFrame(latency_rows), hide_index=True, use_container_width=True)
+    error_counts = metrics.REGISTRY.counter('errors_total')
+    if error_counts:
+        st.caption('Swallowed errors: ' + ', '.join(f"{dict(key)['where']}={int(count)}" for key, count in sorted(error_counts.items())))
+    if not (endpoint_rows or cache_rows or parse_rows):
+        st.caption('No upstream activity recorded yet.')
+    for target in start_metrics_exporters():
+        st.caption(f'Prometheus export: {target}')
+
+
+def with_momentum_columns(display_df: pd.DataFrame, df: pd.DataFrame) -> pd.DataFrame:
+    display_df = display_df.copy()
+    for field, column in zip(MOMENTUM_FIELDS, MOMENTUM_COLUMNS):
+        display_df[column] = df[field].to_numpy()
+    display_df['신고가'] = display_df['신고가'].map({True: '▲', False: ''})
+    return display_df
+
+
+def render_top_table(filtered_stocks: list[dict], momentum: pd.DataFrame | None = None):
+    df = build_top_table(filtered_stocks)
+    df['Link'] = [build_stock_link(code, name) for code, name in zip(df['code'], df['name'])]
+    display_df = df[['rank', 'Link', 'theme', 'price', 'rate', 'amount', 'market_cap']].copy()
+    display_df.columns = TOP_COLUMNS
+    formats = {
+        PRICE_COL: '{:,.0f}',
+        RATE_COL: '{:+.2f}%',
+        AMOUNT_COL: '{:,.0f}',
+        MCAP_COL: '{:,.0f}',
+    }
+    rate_columns = [RATE_COL]
+    if momentum is not None:
+        display_df = with_momentum_columns(display_df, add_momentum(df, momentum))
+        formats.update(MOMENTUM_FORMATS)
+        rate_columns += MOMENTUM_COLUMNS[:2]
+    st.dataframe(
+        display_df.style.map(style_rate, subset=rate_columns).format(formats, na_rep='-'),
+        column_config={
+            NAME_COL: st.column_config.LinkColumn(NAME_COL, display_text='name=(.*)', width='medium'),
+            PRICE_COL: st.column_config.NumberColumn(PRICE_COL),
+            RATE_COL: st.column_config.NumberColumn(RATE_COL),
+            AMOUNT_COL: st.column_config.NumberColumn(AMOUNT_COL),
+            MCAP_COL: st.column_config.NumberColumn(MCAP_COL),
+        },
+        hide_index=True,
+        use_container_width=True,
+        height=(len(display_df) + 1) * 35 + 3,
+    )
+
+
+def render_top_list(
+    selected_source: str,
+    selected_source_label: str,
+    use_rate_filter: bool,
+    rate_threshold: float,
+    display_count: int,
+    exclude_etf: bool,
+):
+    settings = TopListFilter(use_rate_filter=use_rate_filter, rate_threshold=rate_threshold, exclude_etf=exclude_etf)
+    last_known = boot()
+    stale_view = st.empty()
+    if not last_known.is_live(selected_source):
+        # First view in this process: show the previous process's list while the crawl runs.
+        stale_stocks, as_of = last_known.top(selected_source)
+        stale_filtered = filter_top_stocks(stale_stocks, settings)
+        if stale_filtered:
+            with stale_view.container():
+                as_of_text = datetime.fromtimestamp(as_of, timezone(timedelta(hours=9))).strftime('%Y-%m-%d %H:%M:%S')
+                st.warning(f'Stale: last known quotes from {as_of_text} (KST). Live data is loading…')
+                render_top_table(stale_filtered)
+
+    raw_stocks, effective_source, source_warning = load_top_stocks_safe(selected_source, display_count, 'amount')
+    if raw_stocks:
+        # An empty live list (upstream down) leaves the marked stale list in place.
+        stale_view.empty()
+    last_known.record_top(selected_source, raw_stocks)
+    info_col1, info_col2 = st.columns(2)
+    with info_col1:
+        kst = timezone(timedelta(hours=9))
+        current_time = datetime.now(kst).strftime('%Y-%m-%d %H:%M:%S')
+        st.caption(f'Data fetched at: {current_time} (KST)')
+        if use_rate_filter:
+            st.subheader(f'거래대금 상위 Top {display_count} / 등락률 {rate_threshold}% 이상')
+            st.caption(f'Filter: Rate >= {rate_threshold}%')
+        else:
+            st.subheader(f'거래대금 상위 Top {display_count}')
+            st.caption('Filter: Rate Off')
+
+    with info_col2:
+        st.caption(f'Selected source: {selected_source_label}')
+        st.caption(f'Effective source: {effective_source}')
+        if exclude_etf:
+            st.caption('ETF/ETN: Excluded')
+
+    if source_warning:
+        st.warning(source_warning)
+
+    # Every fetched list goes into the quote history, so momentum builds up across reruns.
+    quote_lookup = quote_lookup_from(raw_stocks)
+    scheduler = get_quote_scheduler(effective_source)
+    scheduler.observe(quote_lookup)
+
+    filtered_stocks = filter_top_stocks(raw_stocks, settings)
+    if not filtered_stocks:
+        st.warning('No stocks match the criteria.')
+        return
+
+    render_top_table(filtered_stocks, scheduler.momentum(stock.get('code', '') for stock in filtered_stocks))
+
+    st.markdown('---')
+    st.subheader('테마별 상세 종목 리스트')
+    st.caption('현재 상위 종목들이 포함된 테마의 전체 구성 종목을 표시합니다.')
+
+    theme_members_map, member_codes = expand_themes(filtered_stocks)
+
+    # Member quotes are refreshed by activity tier under a request budget; codes that
+    # are not due yet are served from the scheduler's last known quote. On Naver, every
+    # code the market sweep covers is read from it at once. With a quote service
+    # configured, it does the tiering and every missing code is asked for.
+    missing_codes = {code for code in member_codes if code not in quote_lookup}
+    if QUOTE_API_URL:
+        due_codes = sorted(missing_codes)
+    else:
+        due_codes = scheduler.due_codes(sweep_members(scheduler, effective_source, missing_codes))
+    if due_codes:
+        snapshots, snapshot_warning = load_snapshots_safe(effective_source, set(due_codes))
+        scheduler.observe(snapshots)
+        if snapshot_warning:
+            st.warning(snapshot_warning)
+    quote_lookup.update(scheduler.latest(missing_codes))
+    last_known.record_quotes(quote_lookup)
+    get_theme_strength(effective_source).update(quote_lookup)
+    visible_codes = {stock.get('code', '') for stock in filtered_stocks}
+    member_momentum = scheduler.momentum(member_codes)
+
+    if not theme_members_map:
+        st.info('테마 정보가 없습니다.')
+        return
+
+    for theme in sorted(theme_members_map):
+        members = theme_members_map[theme]
+        with st.expander(f'테마 {theme} 관련 전체 종목', expanded=True):
+            tdf = build_theme_table(members, quote_lookup)
+            if tdf.empty:
+                st.info('조건에 맞는 종목이 없습니다.')
+                continue
+            visible_codes.update(tdf['code'])
+
+            tdf['Link'] = [build_stock_link(code, name) for code, name in zip(tdf['code'], tdf['name'])]
+            tdf_display = tdf[['Link', 'price', 'rate', 'amount', 'market_cap']].copy()
+            tdf_display.columns = DETAIL_COLUMNS
+            tdf_display = with_momentum_columns(tdf_display, add_momentum(tdf, member_momentum))
+            st.dataframe(
+                tdf_display.style.map(style_rate, subset=[RATE_COL] + MOMENTUM_COLUMNS[:2]).format(
+                    {
+                        PRICE_COL: '{:,}',
+                        RATE_COL: '{:+.2f}%',
+                        AMOUNT_COL: '{:,}',
+                        MCAP_COL: '{:,}',
+                        **MOMENTUM_FORMATS,
+                    },
+                    na_rep='-',
+                ),
+                column_config={
+                    NAME_COL: st.column_config.LinkColumn(NAME_COL, display_text='name=(.*)'),
+                    PRICE_COL: st.column_config.NumberColumn(PRICE_COL),
+                    RATE_COL: st.column_config.NumberColumn(RATE_COL),
+                    AMOUNT_COL: st.column_config.NumberColumn(AMOUNT_COL),
+                    MCAP_COL: st.column_config.NumberColumn(MCAP_COL),
+                },
+                hide_index=True,
+                use_container_width=True,
+            )
+    scheduler.mark_visible(visible_codes)
+
+
+def render_theme_strength(selected_source: str):
+    source = normalize_source(selected_source)
+    strength = get_theme_strength(source)
+    control_col1, control_col2, control_col3 = st.columns(3)
+    view = control_col1.radio('View', ['Table', 'Treemap'], horizontal=True, key='theme_strength_view')
+    min_quoted = control_col2.number_input('Min quoted members', min_value=1, max_value=50, value=3, key='theme_strength_min_quoted')
+    quote_all = control_col3.toggle('Quote all theme members', value=False, key='theme_strength_quote_all')
+
+    if quote_all:
+        # Covers themes with no top-list stock too; the scheduler keeps this within the request budget.
+        scheduler = get_quote_scheduler(source)
+        due_codes = scheduler.due_codes(sweep_members(scheduler, source, strength.codes))
+        if due_codes:
+            snapshots, snapshot_warning = load_snapshots_safe(source, set(due_codes))
+            scheduler.observe(snapshots)
+            if snapshot_warning:
+                st.warning(snapshot_warning)
+        strength.update(scheduler.latest(strength.codes))
+
+    board = strength.leaderboard(min_quoted=int(min_quoted))
+    if board.empty:
+        st.info('No theme has enough quoted members yet. Quotes accumulate as the top list refreshes.')
+        return
+    st.caption(f'{len(board)} of {len(strength.themes)} themes ranked by amount-weighted rate.')
+
+    if view == 'Treemap':
+        # plotly.express takes a noticeable share of import time; only the treemap needs it.
+        import plotly.express as px
+
+        fig = px.treemap(
+            board,
+            path=['theme'],
+            values='total_amount',
+            color='weighted_rate',
+            color_continuous_scale='RdBu_r',
+            color_continuous_midpoint=0,
+            hover_data={'breadth': ':.0f', 'leader': True, 'leader_share': ':.0f'},
+        )
+        fig.update_layout(margin=dict(t=10, l=0, r=0, b=0), height=600)
+        st.plotly_chart(fig, use_container_width=True)
+        return
+
+    display_df = board[['theme', 'weighted_rate', 'breadth', 'total_amount', 'quoted', 'members', 'leader', 'leader_share']].copy()
+    display_df.columns = ['테마', '가중 등락률', '상승 비율(%)', AMOUNT_COL, '시세 종목수', '구성 종목수', '대장주', '대장주 비중(%)']
+    st.dataframe(
+        display_df.style.map(style_rate, subset=['가중 등락률']).format(
+            {
+                '가중 등락률': '{:+.2f}%',
+                '상승 비율(%)': '{:.0f}',
+                AMOUNT_COL: '{:,.0f}',
+                '대장주 비중(%)': '{:.0f}',
+            }
+        ),
+        hide_index=True,
+        use_container_width=True,
+    )
+
+
+
+def render_similar_stocks(code: str):
+    matrix = get_theme_matrix()
+    similar = matrix.similar(code)
+    if similar.empty:
+        return
+    st.subheader('Similar Stocks')
+    st.caption(f'Cosine similarity of theme scores. Themes: {", ".join(matrix.themes_of(code))}')
+    similar_df = similar.copy()
+    similar_df.columns = ['코드', '종목명', '유사도', '공통 테마']
+    st.dataframe(similar_df.style.format({'유사도': '{:.2f}'}), hide_index=True, use_container_width=True)
+
+    overlap = matrix.overlap(matrix.themes_of(code))
+    if not overlap.empty:
+        st.markdown('**Theme Overlap**')
+        overlap_df = overlap.copy()
+        overlap_df.columns = ['테마', '겹치는 테마', '공통 종목수', 'Jaccard']
+        st.dataframe(overlap_df.style.format({'Jaccard': '{:.2f}'}), hide_index=True, use_container_width=True)
+
+
+boot()
+
 with st.sidebar:
     st.header('Settings')
     if 'show_kiwoom_key_form' not in st.session_state:
@@ -201,14 +562,23 @@ with st.sidebar:
     selected_source = DATA_SOURCE_OPTIONS[selected_source_label]
     refresh_rate = st.slider('Refresh Rate (seconds)', 5, 60, 10, key='refresh_slider')
     auto_refresh = st.checkbox('Auto Refresh', value=False, key='auto_refresh_check')
+    st.fragment(render_source_status, run_every=refresh_rate if auto_refresh else None)()
 
-    if selected_source == 'kiwoom':
+    if QUOTE_API_URL:
+        st.caption(f'Quotes via local quote service: {QUOTE_API_URL}')
+    elif selected_source == 'kiwoom':
         kiwoom_ready, kiwoom_message = get_kiwoom_status()
         if kiwoom_ready:
             st.caption(f'Kiwoom: {kiwoom_message}')
         else:
             st.warning(f'Kiwoom config incomplete. {kiwoom_message}')
             st.caption('Using Naver automatically if Kiwoom requests fail.')
+        st.checkbox(
+            'Hedge with Naver',
+            value=True,
+            key='hedge_requests',
+            help='Also ask Naver when Kiwoom has not answered within the hedge delay and use whichever answers first.',
+        )
 
     st.subheader('Filter (Top List)')
     exclude_etf = st.checkbox('Exclude ETF/ETN', value=True)
@@ -231,175 +601,55 @@ with st.sidebar:
         help='Show stocks from Top 1 to N by trading value',
     )
 
+    with st.expander('Diagnostics', expanded=False):
+        st.fragment(render_diagnostics, run_every=refresh_rate if auto_refresh else None)()
 
-tab1, tab2 = st.tabs(['Top Trading Value', 'Search Stock'])
-
-with tab1:
-    raw_stocks, effective_source, source_warning = load_top_stocks_safe(selected_source, display_count, 'amount')
-    info_col1, info_col2 = st.columns(2)
-    with info_col1:
-        kst = timezone(timedelta(hours=9))
-        current_time = datetime.now(kst).strftime('%Y-%m-%d %H:%M:%S')
-        st.caption(f'Data fetched at: {current_time} (KST)')
-        if use_rate_filter:
-            st.subheader(f'거래대금 상위 Top {display_count} / 등락률 {rate_threshold}% 이상')
-            st.caption(f'Filter: Rate >= {rate_threshold}%')
-        else:
-            st.subheader(f'거래대금 상위 Top {display_count}')
-            st.caption('Filter: Rate Off')
-
-    with info_col2:
-        st.caption(f'Selected source: {selected_source_label}')
-        st.caption(f'Effective source: {effective_source}')
-        if exclude_etf:
-            st.caption('ETF/ETN: Excluded')
+# Auto refresh reruns only these fragments on their own timers; the sidebar,
+# credential form and search tab stay untouched between ticks.
+quote_refresh_interval = refresh_rate if auto_refresh else None
+index_refresh_interval = max(refresh_rate, INDEX_REFRESH_SECONDS) if auto_refresh else None
 
-    if source_warning:
-        st.warning(source_warning)
+col_header, col_indices = st.columns([2.5, 1.5])
 
-    filtered_stocks = []
-    for idx, stock in enumerate(raw_stocks):
-        stock = dict(stock)
-        stock['original_rank'] = idx + 1
-        stock_rate = pd.to_numeric(pd.Series([stock.get('rate', 0.0)]), errors='coerce').fillna(0.0).iloc[0]
-        if use_rate_filter and stock_rate < rate_threshold:
-            continue
-        if exclude_etf and any(keyword in stock.get('name', '') for keyword in ETF_KEYWORDS):
-            continue
-        stock['rate'] = float(stock_rate)
-        filtered_stocks.append(stock)
-
-    if filtered_stocks:
-        df = pd.DataFrame(filtered_stocks)
-        df['DisplayRank'] = range(1, len(df) + 1)
-        df['Link'] = df.apply(lambda row: build_stock_link(row.get('code', ''), row['name']), axis=1)
-        if 'market_cap' not in df.columns:
-            df['market_cap'] = 0
-        df['price'] = pd.to_numeric(df['price'], errors='coerce').fillna(0).astype(int)
-        df['rate'] = pd.to_numeric(df['rate'], errors='coerce').fillna(0.0)
-        df['amount'] = pd.to_numeric(df['amount'], errors='coerce').fillna(0).astype(int)
-        df['market_cap'] = pd.to_numeric(df['market_cap'], errors='coerce').fillna(0).astype(int)
-        df['theme'] = df['name'].apply(get_theme)
-
-        display_df = df[['DisplayRank', 'Link', 'theme', 'price', 'rate', 'amount', 'market_cap']].copy()
-        display_df.columns = TOP_COLUMNS
-        st.dataframe(
-            display_df.style.map(style_rate, subset=[RATE_COL]).format(
-                {
-                    PRICE_COL: '{:,.0f}',
-                    RATE_COL: '{:+.2f}%',
-                    AMOUNT_COL: '{:,.0f}',
-                    MCAP_COL: '{:,.0f}',
-                }
-            ),
-            column_config={
-                NAME_COL: st.column_config.LinkColumn(NAME_COL, display_text='name=(.*)', width='medium'),
-                PRICE_COL: st.column_config.NumberColumn(PRICE_COL),
-                RATE_COL: st.column_config.NumberColumn(RATE_COL),
-                AMOUNT_COL: st.column_config.NumberColumn(AMOUNT_COL),
-                MCAP_COL: st.column_config.NumberColumn(MCAP_COL),
-            },
-            hide_index=True,
-            use_container_width=True,
-            height=(len(display_df) + 1) * 35 + 3,
-        )
+with col_header:
+    st.title('Blue Key Project')
 
-        st.markdown('---')
-        st.subheader('테마별 상세 종목 리스트')
-        st.caption('현재 상위 종목들이 포함된 테마의 전체 구성 종목을 표시합니다.')
+with col_indices:
+    st.fragment(render_market_indices, run_every=index_refresh_interval)()
 
-        active_themes = set()
-        for stock in filtered_stocks:
-            active_themes.update(get_theme_list(stock['name']))
 
-        quote_lookup = prepare_quote_lookup(raw_stocks, effective_source)
-        theme_members_map = {}
-        member_codes = set()
-        for theme in sorted(active_themes):
-            members = get_theme_members(theme)
-            if not members:
-                continue
-            theme_members_map[theme] = members
-            for member in members:
-                code = member.get('code', '')
-                if code:
-                    member_codes.add(code)
-
-        missing_codes = {code for code in member_codes if code not in quote_lookup}
-        if missing_codes:
-            snapshots, snapshot_warning = load_snapshots_safe(effective_source, missing_codes)
-            quote_lookup.update(snapshots)
-            if snapshot_warning:
-                st.warning(snapshot_warning)
+tab1, tab2, tab3 = st.tabs(['Top Trading Value', 'Theme Strength', 'Search Stock'])
 
-        if theme_members_map:
-            for theme in sorted(theme_members_map):
-                members = theme_members_map[theme]
-                with st.expander(f'테마 {theme} 관련 전체 종목', expanded=True):
-                    tdf = pd.DataFrame(members)
-                    if 'code' not in tdf.columns:
-                        tdf['code'] = ''
-                    if 'name' not in tdf.columns:
-                        tdf['name'] = ''
-
-                    tdf['price'] = tdf['code'].apply(lambda c: quote_lookup.get(c, {}).get('price', 0))
-                    tdf['rate'] = tdf['code'].apply(lambda c: quote_lookup.get(c, {}).get('rate', 0.0))
-                    tdf['amount'] = tdf['code'].apply(lambda c: quote_lookup.get(c, {}).get('amount', 0))
-                    tdf['market_cap'] = tdf['code'].apply(lambda c: quote_lookup.get(c, {}).get('market_cap', 0))
-                    tdf['price'] = pd.to_numeric(tdf['price'], errors='coerce').fillna(0).astype(int)
-                    tdf['rate'] = pd.to_numeric(tdf['rate'], errors='coerce').fillna(0.0)
-                    tdf['amount'] = pd.to_numeric(tdf['amount'], errors='coerce').fillna(0).astype(int)
-                    tdf['market_cap'] = pd.to_numeric(tdf['market_cap'], errors='coerce').fillna(0).astype(int)
-                    tdf = tdf[~((tdf['rate'] < 20.0) & (tdf['market_cap'] < 500))]
-                    tdf = tdf.sort_values(by=['rate', 'amount'], ascending=[False, False], kind='stable')
-
-                    if tdf.empty:
-                        st.info('조건에 맞는 종목이 없습니다.')
-                        continue
-
-                    tdf['Link'] = tdf.apply(lambda row: build_stock_link(row.get('code', ''), row['name']), axis=1)
-                    tdf_display = tdf[['Link', 'price', 'rate', 'amount', 'market_cap']].copy()
-                    tdf_display.columns = DETAIL_COLUMNS
-                    st.dataframe(
-                        tdf_display.style.map(style_rate, subset=[RATE_COL]).format(
-                            {
-                                PRICE_COL: '{:,}',
-                                RATE_COL: '{:+.2f}%',
-                                AMOUNT_COL: '{:,}',
-                                MCAP_COL: '{:,}',
-                            }
-                        ),
-                        column_config={
-                            NAME_COL: st.column_config.LinkColumn(NAME_COL, display_text='name=(.*)'),
-                            PRICE_COL: st.column_config.NumberColumn(PRICE_COL),
-                            RATE_COL: st.column_config.NumberColumn(RATE_COL),
-                            AMOUNT_COL: st.column_config.NumberColumn(AMOUNT_COL),
-                            MCAP_COL: st.column_config.NumberColumn(MCAP_COL),
-                        },
-                        hide_index=True,
-                        use_container_width=True,
-                    )
-        else:
-            st.info('테마 정보가 없습니다.')
-    else:
-        st.warning('No stocks match the criteria.')
+with tab1:
+    st.fragment(render_top_list, run_every=quote_refresh_interval)(
+        selected_source,
+        selected_source_label,
+        use_rate_filter,
+        rate_threshold,
+        display_count,
+        exclude_etf,
+    )
 
 with tab2:
+    st.fragment(render_theme_strength, run_every=quote_refresh_interval)(selected_source)
+
+with tab3:
     st.subheader('Individual Stock Search')
-    stock_code = st.text_input('Enter Stock Code (KRX)', value='005930')
-    if stock_code:
+    query = st.text_input('Enter Stock Code or Name (KRX)', value='005930')
+    if query:
+        security = get_master().resolve(query)
+        stock_code = security.code if security else query.strip()
         info = get_stock_info(stock_code)
         if info:
             metric_col1, metric_col2 = st.columns(2)
-            metric_col1.metric(label=info['name'], value=f"{info['current_price']} KRW", delta=f"{info['rate']}%")
-            metric_col2.write(f"**Volume:** {info['volume']}")
-            st.write(f"**Code:** {info['code']}")
+            metric_col1.metric(label=info.name, value=f"{info.price:,} KRW", delta=f"{info.rate}%")
+            metric_col2.write(f"**Volume:** {info.volume:,}")
+            st.write(f"**Code:** {info.code}")
+            if security:
+                st.caption(f'{security.market or "-"} · {security.kind.upper()} · {security.sector or "-"}')
         else:
-            st.error(f'Failed to fetch info for code: {stock_code}')
-
-if auto_refresh:
-    time.sleep(refresh_rate)
-    st.rerun()
+            st.error(f'Failed to fetch info for: {query}')
+        render_similar_stocks(stock_code)
 
 st.markdown('---')
 st.caption('Primary quote source: Naver Finance or Kiwoom REST API')
@@ -0,0 +1,155 @@
+"""
+Load-test the dashboard against the local mock upstream.
+
+Starts mock_upstream in-process, points NAVER_BASE_URL/KIWOOM_BASE_URL at it and drives N
+concurrent headless dashboard sessions (streamlit.testing AppTest) through repeated renders.
+AppTest is not thread-safe, so every session runs in its own process. Reports render
+throughput, p50/p99 render time and the upstream traffic it caused, and exits non-zero
+when a session crashed or did not finish all of its renders.
+
+    python benchmarks/load_test.py --sessions 8 --renders 5 --latency-ms 80 --rate-limit 50
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from multiprocessing import get_context
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from mock_upstream import MockUpstream, add_behavior_args, behavior_from_args  # noqa: E402
+
+# Files the dashboard persists between runs. A load test points them at a scratch
+# directory, so mock-derived data never lands where real dashboards would trust it.
+STATE_FILES = {
+    "BLUEKEY_SHARES_FILE": "shares_outstanding.json",
+    "BLUEKEY_LAST_QUOTES_FILE": "last_quotes.json",
+    "BLUEKEY_SECURITY_MASTER_FILE": "security_master.json",
+    "BLUEKEY_NAVER_THEMES_FILE": "naver_themes.json",
+    "KIWOOM_TOKEN_CACHE": "kiwoom.token.json",
+}
+
+SOURCE_LABELS = {
+    "naver": "Naver Finance",
+    "kiwoom": "Kiwoom REST API",
+}
+
+
+def percentile(samples: list[float], q: float) -> float:
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+
+@dataclass
+class SessionResult:
+    timings: list[float] = field(default_factory=list)
+    failures: list[str] = field(default_factory=list)
+    completed: int = 0
+
+
+def run_session(source: str, renders: int, think_seconds: float) -> SessionResult:
+    """One dashboard session; runs in a worker process with its own AppTest."""
+    result = SessionResult()
+    try:
+        from streamlit.testing.v1 import AppTest
+
+        app = AppTest.from_file(str(ROOT / "app.py"), default_timeout=120)
+        for render in range(renders):
+            started = time.perf_counter()
+            if render == 0:
+                app.run()
+                if source != "naver":
+                    app.selectbox[0].select(SOURCE_LABELS[source]).run()
+            else:
+                app.run()
+            result.timings.append(time.perf_counter() - started)
+            result.completed += 1
+            if app.exception:
+                result.failures.append(str(app.exception[0].value))
+            if think_seconds:
+                time.sleep(think_seconds)
+    except Exception as e:
+        result.failures.append(f"session crashed after {result.completed} renders: {type(e).__name__}: {e}")
+    return result
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Simulate concurrent dashboard sessions against a mock upstream.")
+    parser.add_argument("--sessions", type=int, default=4, help="Concurrent dashboard sessions")
+    parser.add_argument("--renders", type=int, default=3, help="Renders per session")
+    parser.add_argument("--think-seconds", type=float, default=0.0, help="Pause between renders of one session")
+    parser.add_argument("--source", choices=sorted(SOURCE_LABELS), default="naver", help="Top list source")
+    add_behavior_args(parser)
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    upstream = MockUpstream(behavior_from_args(args)).start()
+    os.environ["NAVER_BASE_URL"] = upstream.base_url
+    os.environ["KRX_BASE_URL"] = upstream.base_url
+    os.environ["KIWOOM_BASE_URL"] = upstream.base_url
+    os.environ.setdefault("KIWOOM_APPKEY", "load-test-appkey")
+    os.environ.setdefault("KIWOOM_SECRETKEY", "load-test-secretkey")
+    os.environ.setdefault("KIWOOM_SNAPSHOT_URL", "/api/dostk/stkinfo")
+    os.environ.setdefault("KIWOOM_SNAPSHOT_API_ID", "ka10001")
+    # Mock quotes must not reach a real Parquet archive either.
+    os.environ.pop("BLUEKEY_RECORD_DIR", None)
+    state_dir = tempfile.mkdtemp(prefix="bluekey-load-test-")
+    for variable, filename in STATE_FILES.items():
+        os.environ[variable] = os.path.join(state_dir, filename)
+
+    timings: list[float] = []
+    failures: list[str] = []
+    incomplete = 0
+    started = time.perf_counter()
+    # Spawned workers inherit the environment above, so they all talk to this mock upstream.
+    with ProcessPoolExecutor(max_workers=args.sessions, mp_context=get_context("spawn")) as executor:
+        futures = [
+            executor.submit(run_session, args.source, args.renders, args.think_seconds)
+            for _ in range(args.sessions)
+        ]
+        for future in futures:
+            try:
+                result = future.result()
+            except Exception as e:
+                result = SessionResult(failures=[f"session process died: {type(e).__name__}: {e}"])
+            timings.extend(result.timings)
+            failures.extend(result.failures)
+            if result.completed < args.renders:
+                incomplete += 1
+    elapsed = time.perf_counter() - started
+    upstream.stop()
+    shutil.rmtree(state_dir, ignore_errors=True)
+
+    print(f"Sessions: {args.sessions} x {args.renders} renders ({args.source}) in {elapsed:.2f}s")
+    print(f"Throughput: {len(timings) / elapsed:.2f} renders/s")
+    if timings:
+        print(
+            f"Render time: p50={percentile(timings, 0.5) * 1000:.0f}ms "
+            f"p99={percentile(timings, 0.99) * 1000:.0f}ms "
+            f"mean={statistics.mean(timings) * 1000:.0f}ms"
+        )
+    print(f"Upstream: {dict(upstream.stats)}")
+    if failures:
+        print(f"Render exceptions: {len(failures)} (first: {failures[0]})")
+    if incomplete:
+        print(f"FAILED: {incomplete} of {args.sessions} sessions did not finish all {args.renders} renders")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""
+Local stand-in for finance.naver.com, kind.krx.co.kr and api.kiwoom.com, served from recorded fixtures.
+
+Point the dashboard at it with:
+    NAVER_BASE_URL=http://127.0.0.1:8765 KRX_BASE_URL=http://127.0.0.1:8765 KIWOOM_BASE_URL=http://127.0.0.1:8765 streamlit run app.py
+
+Latency, error rate and a rate limit (answered with 429) are configurable so load tests can
+reproduce slow or throttling upstreams.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from offline import fixture_bytes  # noqa: E402
+
+
+@dataclass
+class UpstreamBehavior:
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    rate_limit: int = 0  # requests per second across all clients; 0 disables
+
+
+def _naver_fixture(path: str, query: dict[str, list[str]]) -> tuple[str, str] | None:
+    if path == "/item/main.naver":
+        return "naver_item_005930.html", "text/html; charset=utf-8"
+    if path == "/sise/sise_market_sum.naver":
+        sosok = query.get("sosok", ["0"])[0]
+        return f"naver_market_sum_sosok{'1' if sosok == '1' else '0'}_page1.html", "text/html; charset=euc-kr"
+    if path == "/sise/sise_quant.naver":
+        return "naver_sise_quant.html", "text/html; charset=euc-kr"
+    if path == "/sise/sise_index_day.naver":
+        return "naver_sise_index_day_0001_page1.html", "text/html; charset=euc-kr"
+    if path in ("/sise", "/sise/"):
+        return "naver_sise.html", "text/html; charset=utf-8"
+    if path == "/corpgeneral/corpList.do":
+        market_type = query.get("marketType", ["stockMkt"])[0]
+        return f"krx_corplist_{'kosdaqMkt' if market_type == 'kosdaqMkt' else 'stockMkt'}.html", "text/html; charset=euc-kr"
+    return None
+
+
+KIWOOM_FIXTURES = {
+    "/oauth2/token": "kiwoom_token.json",
+    "/api/dostk/rkinfo": "kiwoom_ka10032.json",
+    "/api/dostk/stkinfo": "kiwoom_ka10001.json",
+}
+
+
+class MockUpstream:
+    def __init__(self, behavior: UpstreamBehavior, host: str = "127.0.0.1", port: int = 0) -> None:
+        self.behavior = behavior
+        self.stats: Counter[str] = Counter()
+        self._recent: deque[float] = deque()
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockUpstream":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-upstream", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _admit(self) -> int:
+        """Return the status to answer with before any payload is produced."""
+        with self._lock:
+            self.stats["requests"] += 1
+            if self.behavior.rate_limit:
+                now = time.monotonic()
+                while self._recent and now - self._recent[0] >= 1.0:
+                    self._recent.popleft()
+                if len(self._recent) >= self.behavior.rate_limit:
+                    self.stats["429"] += 1
+                    return 429
+                self._recent.append(now)
+            if self.behavior.error_rate and random.random() < self.behavior.error_rate:
+                self.stats["500"] += 1
+                return 500
+        return 200
+
+    def _delay(self) -> None:
+        delay_ms = self.behavior.latency_ms + random.uniform(0, self.behavior.jitter_ms)
+        if delay_ms > 0:
+            time.sleep(delay_ms / 1000)
+
+    def _handler_class(self) -> type[BaseHTTPRequestHandler]:
+        upstream = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _send(self, status: int, body: bytes, content_type: str) -> None:
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                if status == 429:
+                    self.send_header("Retry-After", "1")
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _serve(self, body_text: str = "") -> None:
+                parts = urlsplit(self.path)
+                upstream._delay()
+                status = upstream._admit()
+                if status != 200:
+                    self._send(status, b"", "text/plain")
+                    return
+
+                fixture = _naver_fixture(parts.path, parse_qs(parts.query))
+                if fixture is not None:
+                    name, content_type = fixture
+                    upstream.stats[parts.path] += 1
+                    self._send(200, fixture_bytes(name), content_type)
+                    return
+
+                name = KIWOOM_FIXTURES.get(parts.path)
+                if name is None:
+                    upstream.stats["404"] += 1
+                    self._send(404, b"", "text/plain")
+                    return
+                upstream.stats[parts.path] += 1
+                payload = fixture_bytes(name)
+                if b"{code}" in payload:
+                    try:
+                        code = str(json.loads(body_text or "{}").get("stk_cd", ""))
+                    except ValueError:
+                        code = ""
+                    payload = payload.replace(b"{code}", code.encode("utf-8"))
+                self._send(200, payload, "application/json;charset=UTF-8")
+
+            def do_GET(self) -> None:
+                self._serve()
+
+            def do_POST(self) -> None:
+                length = int(self.headers.get("Content-Length") or 0)
+                self._serve(self.rfile.read(length).decode("utf-8", "replace") if length else "")
+
+            def log_message(self, format: str, *args: object) -> None:
+                pass
+
+        return Handler
+
+
+def add_behavior_args(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Base latency added to every response")
+    parser.add_argument("--jitter-ms", type=float, default=30.0, help="Uniform random extra latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 500")
+    parser.add_argument("--rate-limit", type=int, default=0, help="Requests/second before answering 429 (0 = off)")
+
+
+def behavior_from_args(args: argparse.Namespace) -> UpstreamBehavior:
+    return UpstreamBehavior(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        rate_limit=args.rate_limit,
+    )
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Serve Naver/Kiwoom fixtures as a local upstream.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_behavior_args(parser)
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    upstream = MockUpstream(behavior_from_args(args), host=args.host, port=args.port).start()
+    print(f"Mock upstream listening on {upstream.base_url}")
+    print(f"  NAVER_BASE_URL={upstream.base_url} KIWOOM_BASE_URL={upstream.base_url}")
+    try:
+        while True:
+            time.sleep(10)
+            print(f"  stats: {dict(upstream.stats)}")
+    except KeyboardInterrupt:
+        upstream.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Serve recorded upstream fixtures in place of live HTTP so benchmarks run offline.
+
+Fixtures live in benchmarks/fixtures and are refreshed with record_fixtures.py.
+"""
+
+from __future__ import annotations
+
+import json
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator
+from unittest import mock
+
+import requests
+
+FIXTURE_DIR = Path(__file__).resolve().parent / "fixtures"
+
+# (url substring, fixture file) pairs; the first match wins, so specific routes go first.
+ROUTES: list[tuple[str, str]] = [
+    ("item/main.naver", "naver_item_005930.html"),
+    ("sise_market_sum.naver?sosok=1", "naver_market_sum_sosok1_page1.html"),
+    ("sise_market_sum.naver", "naver_market_sum_sosok0_page1.html"),
+    ("sise_quant.naver", "naver_sise_quant.html"),
+    ("sise_index_day.naver", "naver_sise_index_day_0001_page1.html"),
+    ("finance.naver.com/sise/", "naver_sise.html"),
+    ("marketType=stockMkt", "krx_corplist_stockMkt.html"),
+    ("marketType=kosdaqMkt", "krx_corplist_kosdaqMkt.html"),
+    ("news.google.com/rss", "google_news_rss.xml"),
+    ("/oauth2/token", "kiwoom_token.json"),
+    ("/api/dostk/rkinfo", "kiwoom_ka10032.json"),
+]
+
+_cache: dict[str, bytes] = {}
+
+
+def fixture_bytes(name: str) -> bytes:
+    if name not in _cache:
+        _cache[name] = (FIXTURE_DIR / name).read_bytes()
+    return _cache[name]
+
+
+def fixture_json(name: str) -> Any:
+    return json.loads(fixture_bytes(name).decode("utf-8"))
+
+
+def route(url: str) -> str | None:
+    for needle, name in ROUTES:
+        if needle in url:
+            return name
+    return None
+
+
+class FixtureResponse:
+    def __init__(self, url: str, content: bytes, status_code: int = 200) -> None:
+        self.url = url
+        self.content = content
+        self.status_code = status_code
+        self.encoding: str | None = None
+        self.headers: dict[str, str] = {}
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding or "utf-8", "replace")
+
+    def json(self) -> Any:
+        return json.loads(self.content.decode("utf-8"))
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} for fixture url: {self.url}", response=self)
+
+
+def _respond(method: str, url: str, **kwargs: Any) -> FixtureResponse:
+    name = route(url)
+    if name is None:
+        return FixtureResponse(url, b"", status_code=404)
+    return FixtureResponse(url, fixture_bytes(name))
+
+
+@contextmanager
+def offline_upstream() -> Iterator[None]:
+    """Patch requests so every upstream call is answered from the fixture directory."""
+    with mock.patch.object(requests, "request", _respond), mock.patch.object(
+        requests, "get", lambda url, **kwargs: _respond("GET", url, **kwargs)
+    ), mock.patch.object(requests, "post", lambda url, **kwargs: _respond("POST", url, **kwargs)), mock.patch.object(
+        requests.Session, "request", lambda self, method, url, **kwargs: _respond(method, url, **kwargs)
+    ):
+        yield
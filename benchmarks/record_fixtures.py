@@ -0,0 +1,76 @@
+"""
+Re-record the upstream fixtures used by the offline benchmarks.
+
+Needs network access. Kiwoom fixtures are only recorded when credentials are configured.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+import requests
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from offline import FIXTURE_DIR  # noqa: E402
+
+HEADERS = {"User-Agent": "Mozilla/5.0"}
+
+NAVER_FIXTURES = {
+    "naver_item_005930.html": "https://finance.naver.com/item/main.naver?code=005930",
+    "naver_market_sum_sosok0_page1.html": "https://finance.naver.com/sise/sise_market_sum.naver?sosok=0&page=1",
+    "naver_market_sum_sosok1_page1.html": "https://finance.naver.com/sise/sise_market_sum.naver?sosok=1&page=1",
+    "naver_sise_quant.html": "https://finance.naver.com/sise/sise_quant.naver",
+    "naver_sise_index_day_0001_page1.html": "https://finance.naver.com/sise/sise_index_day.naver?code=0001&page=1",
+    "naver_sise.html": "https://finance.naver.com/sise/",
+    "krx_corplist_stockMkt.html": "https://kind.krx.co.kr/corpgeneral/corpList.do?method=download&marketType=stockMkt",
+    "krx_corplist_kosdaqMkt.html": "https://kind.krx.co.kr/corpgeneral/corpList.do?method=download&marketType=kosdaqMkt",
+    "google_news_rss.xml": "https://news.google.com/rss/search?q=%EC%82%BC%EC%84%B1%EC%A0%84%EC%9E%90+%EC%A3%BC%EC%8B%9D+%ED%85%8C%EB%A7%88&hl=ko&gl=KR&ceid=KR:ko",
+}
+
+
+def record_naver() -> None:
+    for name, url in NAVER_FIXTURES.items():
+        res = requests.get(url, headers=HEADERS, timeout=20)
+        res.raise_for_status()
+        (FIXTURE_DIR / name).write_bytes(res.content)
+        print(f"Recorded {name} ({len(res.content):,} bytes)")
+
+
+def record_kiwoom() -> None:
+    import kiwoom_provider
+
+    if not kiwoom_provider.has_credentials():
+        print("Kiwoom credentials missing; keeping existing Kiwoom fixtures.")
+        return
+    payload = kiwoom_provider._request_api(
+        "KIWOOM_TOP_STOCKS_URL",
+        "KIWOOM_TOP_STOCKS_API_ID",
+        "KIWOOM_TOP_STOCKS_BODY",
+        method_env="KIWOOM_TOP_STOCKS_METHOD",
+    )
+    path = FIXTURE_DIR / "kiwoom_ka10032.json"
+    path.write_text(json.dumps(payload, ensure_ascii=False, indent=1), encoding="utf-8")
+    print(f"Recorded {path.name}")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Record upstream fixtures for offline benchmarks.")
+    parser.add_argument("--skip-kiwoom", action="store_true", help="Only record Naver/KRX/Google fixtures")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    FIXTURE_DIR.mkdir(parents=True, exist_ok=True)
+    record_naver()
+    if not args.skip_kiwoom:
+        record_kiwoom()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""
+Offline benchmark suite for the hot parsing/classification paths.
+
+All upstream traffic is answered from recorded fixtures (see offline.py), so runs are
+repeatable and never touch Naver, KRX, Google News or Kiwoom.
+
+Usage:
+    python benchmarks/run_benchmarks.py                  # run and compare with baseline.json
+    python benchmarks/run_benchmarks.py --save-baseline  # record new baseline timings
+    python benchmarks/run_benchmarks.py -k classify      # only cases whose name contains "classify"
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from bs4 import BeautifulSoup  # noqa: E402
+
+import build_themes  # noqa: E402
+import crawl  # noqa: E402
+import index_history  # noqa: E402
+import kiwoom_provider  # noqa: E402
+import naver_list  # noqa: E402
+import quote_history  # noqa: E402
+import refresh_trend_signals  # noqa: E402
+import scraper  # noqa: E402
+import security_master  # noqa: E402
+import theme_matrix  # noqa: E402
+from offline import fixture_bytes, fixture_json, offline_upstream  # noqa: E402
+
+BASELINE_PATH = Path(__file__).resolve().parent / "baseline.json"
+DEFAULT_TOLERANCE = 0.25
+SYNTHETIC_UNIVERSE_SIZE = 10_000
+
+
+@dataclass
+class Case:
+    name: str
+    func: Callable[[], Any]
+    repeat: int = 5
+
+
+def _theme_inputs() -> tuple[dict[str, list[str]], dict[str, Any], dict[str, list[dict[str, Any]]]]:
+    rules = build_themes.load_json(ROOT / "theme_rules.json", build_themes.DEFAULT_THEME_RULES)
+    rules = build_themes.merge_with_extra_rules(rules)
+    overrides = build_themes.load_json(ROOT / "theme_overrides.json", {"by_code": {}, "by_name": {}})
+    trend_signals = build_themes.load_trend_signals(ROOT / "trend_signals.json")
+    return rules, overrides, trend_signals
+
+
+def real_universe() -> list[build_themes.StockRecord]:
+    details = build_themes.load_json(ROOT / "theme_details.json", {})
+    return [
+        build_themes.StockRecord(
+            code=row["code"],
+            name=row["name"],
+            market=row["market"],
+            sector=row.get("sector", ""),
+            products=row.get("products", ""),
+            tags=[],
+        )
+        for row in details.values()
+    ]
+
+
+def synthetic_universe(size: int, seed: int = 7) -> list[build_themes.StockRecord]:
+    """Scale the real universe up by recombining real names, sectors and products."""
+    rng = random.Random(seed)
+    base = real_universe()
+    out = []
+    for index in range(size):
+        a, b, c = rng.choice(base), rng.choice(base), rng.choice(base)
+        out.append(
+            build_themes.StockRecord(
+                code=f"{900000 + index:06d}",
+                name=f"{a.name[:3]}{b.name[-3:]}{index}",
+                market=rng.choice(("KOSPI", "KOSDAQ")),
+                sector=b.sector,
+                products=c.products,
+                tags=[],
+            )
+        )
+    return out
+
+
+def build_cases() -> list[Case]:
+    rules, overrides, trend_signals = _theme_inputs()
+    universe = real_universe()
+    universe_10k = synthetic_universe(SYNTHETIC_UNIVERSE_SIZE)
+    item_html = fixture_bytes("naver_item_005930.html").decode("utf-8", "replace")
+    item_soup = BeautifulSoup(item_html, "html.parser")
+    market_sum_html = fixture_bytes("naver_market_sum_sosok0_page1.html").decode("euc-kr", "replace")
+    quant_html = fixture_bytes("naver_sise_quant.html").decode("euc-kr", "replace")
+    ka10032_payload = fixture_json("kiwoom_ka10032.json")
+    ka10032_rows, ka10032_schema = kiwoom_provider._extract_table("ka10032", ka10032_payload)
+    ungated = crawl.CrawlScheduler(min_interval=0.0)
+    theme_keywords = refresh_trend_signals.build_theme_keywords(rules)
+    matrix_inputs = theme_matrix._load_scores()
+    matrix = theme_matrix.ThemeMatrix(*matrix_inputs)
+    history = quote_history.QuoteHistory()
+    history_codes = [f"{index:06d}" for index in range(300)]
+    for step in range(quote_history.RING_SLOTS):
+        quotes = {code: {"price": 1000 + step, "rate": step * 0.05, "amount": step * step} for code in history_codes}
+        history.record(quotes, 1_700_000_000.0 + step * 6)
+
+    def classify(stocks: list[build_themes.StockRecord]) -> Callable[[], Any]:
+        return lambda: build_themes.classify_all(stocks, rules, overrides, trend_signals, 1.0, 5, 0.9)
+
+    return [
+        Case("naver_item.parse_and_extract", lambda: scraper._extract_stock_snapshot(BeautifulSoup(item_html, "html.parser"), "005930"), 20),
+        Case("naver_item.extract_stock_snapshot", lambda: scraper._extract_stock_snapshot(item_soup, "005930"), 50),
+        Case("naver_list.parse_market_sum", lambda: naver_list.parse_list_page(market_sum_html), 50),
+        Case("naver_list.parse_quant", lambda: naver_list.parse_list_page(quant_html), 50),
+        Case("naver_list.get_top_stocks_amount", lambda: scraper.get_top_stocks(limit=100, sort_by="amount"), 5),
+        Case("naver_list.get_top_stocks_volume", lambda: scraper.get_top_stocks(limit=100, sort_by="volume"), 10),
+        Case("naver_index.get_market_indices", scraper.get_market_indices, 20),
+        Case("naver_index.get_index_history", lambda: index_history.get_index_history("KOSPI", 60), 5),
+        # No request spacing: the case times download handling and parsing, not the politeness gate.
+        Case("krx.fetch_krx_listing", lambda: security_master.fetch_krx_listing("KOSDAQ", ungated), 3),
+        Case("kiwoom.normalize_table", lambda: kiwoom_provider._normalize_table(ka10032_rows, ka10032_schema), 50),
+        Case("kiwoom.extract_table", lambda: kiwoom_provider._extract_table("ka10032", fixture_json("kiwoom_ka10032.json")), 50),
+        Case("themes.classify_all_real", classify(universe), 3),
+        Case("themes.classify_all_synthetic_10k", classify(universe_10k), 1),
+        Case("quote_history.momentum_300", lambda: history.momentum(history_codes), 50),
+        Case("theme_matrix.build", lambda: theme_matrix.ThemeMatrix(*matrix_inputs), 10),
+        Case("theme_matrix.similar", lambda: matrix.similar("005930"), 200),
+        Case("theme_matrix.overlap", lambda: theme_matrix.ThemeMatrix(*matrix_inputs).overlap(), 10),
+        Case(
+            "news.score_themes_from_news",
+            lambda: refresh_trend_signals.score_themes_from_news("삼성전자", theme_keywords, 120, 12),
+            10,
+        ),
+    ]
+
+
+def time_case(case: Case) -> dict[str, float]:
+    case.func()  # warm-up: imports, fixture reads, regex compilation
+    samples = []
+    for _ in range(case.repeat):
+        started = time.perf_counter()
+        case.func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return {
+        "median_ms": round(statistics.median(samples), 3),
+        "min_ms": round(min(samples), 3),
+        "repeat": case.repeat,
+    }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run offline benchmarks against recorded fixtures.")
+    parser.add_argument("-k", "--filter", default="", help="Only run cases whose name contains this text")
+    parser.add_argument("--save-baseline", action="store_true", help="Write results to baseline.json")
+    parser.add_argument("--baseline", default=str(BASELINE_PATH), help="Baseline JSON path")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=DEFAULT_TOLERANCE,
+        help="Flag a regression when median exceeds baseline by this fraction",
+    )
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    os.environ.setdefault("KIWOOM_APPKEY", "offline-appkey")
+    os.environ.setdefault("KIWOOM_SECRETKEY", "offline-secretkey")
+    baseline_path = Path(args.baseline)
+    baseline = build_themes.load_json(baseline_path, {})
+    results: dict[str, dict[str, float]] = {}
+    regressions = []
+
+    with offline_upstream():
+        cases = [case for case in build_cases() if args.filter in case.name]
+        print(f"{'case':<42} {'median ms':>11} {'min ms':>10} {'baseline':>10}  status")
+        for case in cases:
+            result = time_case(case)
+            results[case.name] = result
+            previous = baseline.get(case.name, {}).get("median_ms")
+            status = "new"
+            if previous:
+                ratio = result["median_ms"] / previous
+                status = f"{ratio:.2f}x"
+                if ratio > 1 + args.tolerance:
+                    status += " REGRESSION"
+                    regressions.append(case.name)
+            previous_text = f"{previous:.3f}" if previous else "-"
+            print(f"{case.name:<42} {result['median_ms']:>11.3f} {result['min_ms']:>10.3f} {previous_text:>10}  {status}")
+
+    if args.save_baseline:
+        merged = {**baseline, **results}
+        build_themes.save_json(baseline_path, dict(sorted(merged.items())))
+        print(f"Saved baseline: {baseline_path}")
+        return 0
+
+    if regressions:
+        print(f"Regressions over {args.tolerance:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -12,6 +12,7 @@ from __future__ import annotations
 
 import argparse
 import json
+import os
 import re
 from collections import defaultdict
 from dataclasses import dataclass
@@ -19,9 +20,7 @@ from datetime import datetime
 from pathlib import Path
 from typing import Any
 
-import pandas as pd
-import requests
-from bs4 import BeautifulSoup
+from security_master import EXCHANGE_TRADED_KINDS, get_master
 
 
 DEFAULT_THEME_RULES = {
@@ -262,111 +261,34 @@ def merge_trend_scores(
 
 
 def save_json(path: Path, data: Any) -> None:
-    with path.open("w", encoding="utf-8") as f:
+    # Write then rename, so a running dashboard reloading themes never reads a partial file.
+    tmp_path = path.with_name(path.name + ".tmp")
+    with tmp_path.open("w", encoding="utf-8") as f:
         json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
 
 
 def clean_text(text: str) -> str:
     return re.sub(r"\s+", " ", (text or "").lower().strip())
 
 
-def fetch_krx_market_list(market: str) -> pd.DataFrame:
-    market_type = "stockMkt" if market == "KOSPI" else "kosdaqMkt"
-    url = f"https://kind.krx.co.kr/corpgeneral/corpList.do?method=download&marketType={market_type}"
-    res = requests.get(url, timeout=20)
-    res.raise_for_status()
-    res.encoding = "euc-kr"
-    soup = BeautifulSoup(res.text, "html.parser")
-
-    table = soup.select_one("table")
-    if table is None:
-        raise RuntimeError(f"Failed to parse KRX list for {market}")
-
-    rows = table.select("tr")
-    if not rows:
-        raise RuntimeError(f"No rows found in KRX list for {market}")
-
-    headers = [th.get_text(strip=True) for th in rows[0].select("th")]
-    records: list[dict[str, str]] = []
-    for tr in rows[1:]:
-        tds = tr.select("td")
-        if not tds:
-            continue
-        values = [td.get_text(strip=True) for td in tds]
-        if len(values) == len(headers):
-            records.append(dict(zip(headers, values)))
-
-    df = pd.DataFrame(records)
-    df["시장"] = market
-    return df
-
-
-def fetch_naver_code_name_map() -> dict[str, str]:
-    """
-    Build code->short_name map from Naver market sum pages.
-    This helps normalize KRX company name to traded name shown in app.
-    """
-    out: dict[str, str] = {}
-    headers = {"User-Agent": "Mozilla/5.0"}
-    for sosok in (0, 1):  # 0=KOSPI, 1=KOSDAQ
-        for page in range(1, 41):
-            url = f"https://finance.naver.com/sise/sise_market_sum.naver?sosok={sosok}&page={page}"
-            try:
-                res = requests.get(url, headers=headers, timeout=20)
-                res.raise_for_status()
-                soup = BeautifulSoup(res.content.decode("euc-kr", "replace"), "html.parser")
-                table = soup.select_one("table.type_2")
-                if table is None:
-                    break
-
-                found = 0
-                for a in table.select('a[href*="item/main.naver?code="]'):
-                    href = a.get("href", "")
-                    name = a.get_text(strip=True)
-                    if "code=" not in href or not name:
-                        continue
-                    code = href.split("code=")[-1].split("&")[0].strip()
-                    if code:
-                        out[code] = name
-                        found += 1
-                if found == 0:
-                    break
-            except Exception:
-                break
-    return out
-
-
 def build_universe() -> list[StockRecord]:
-    frames = [fetch_krx_market_list("KOSPI"), fetch_krx_market_list("KOSDAQ")]
-    df = pd.concat(frames, ignore_index=True)
-    naver_name_map = fetch_naver_code_name_map()
-
-    name_col = "회사명"
-    code_col = "종목코드"
-    sector_col = "업종" if "업종" in df.columns else ""
-    product_col = "주요제품" if "주요제품" in df.columns else ""
-
-    universe: list[StockRecord] = []
-    for _, row in df.iterrows():
-        raw_code = str(row[code_col]).strip().upper()
-        code = raw_code.zfill(6) if raw_code.isdigit() else raw_code
-        base_name = str(row[name_col]).strip()
-        name = naver_name_map.get(code, base_name)
-        market = str(row["시장"]).strip()
-        sector = str(row[sector_col]).strip() if sector_col else ""
-        products = str(row[product_col]).strip() if product_col else ""
-        if not name:
-            continue
-        universe.append(
-            StockRecord(
-                code=code,
-                name=name,
-                market=market,
-                sector=sector,
-                products=products,
-                tags=[],
-            )
+    """Every KRX-listed stock from the security master (ETFs and ETNs are not classified)."""
+    master = get_master(wait=True)
+    universe = [
+        StockRecord(
+            code=security.code,
+            name=security.name,
+            market=security.market,
+            sector=security.sector,
+            products=security.products,
+            tags=[],
         )
+        for security in master
+        if security.listed_name and security.kind not in EXCHANGE_TRADED_KINDS
+    ]
+    if not universe:
+        raise RuntimeError("Security master has no KRX listings; check the KRX corp list download.")
     return universe
 
 
@@ -575,7 +497,7 @@ def main() -> None:
     overrides = load_json(Path(args.overrides), {"by_code": {}, "by_name": {}})
     trend_signals = load_trend_signals(Path(args.trend_signals))
 
-    print("Loading KOSPI/KOSDAQ universe from KRX...")
+    print("Loading KOSPI/KOSDAQ universe from the security master...")
     universe = build_universe()
     print(f"Universe size: {len(universe)}")
     print(f"Trend signals: {len(trend_signals)} stocks ({datetime.now().strftime('%Y-%m-%d %H:%M:%S')})")
@@ -590,9 +512,10 @@ def main() -> None:
         min_score=args.min_score,
     )
 
+    # Details first: running dashboards reload on the other two and rebuild the theme matrix from details.
+    save_json(Path(args.details), detailed)
     save_json(Path("stock_themes.json"), stock_themes)
     save_json(Path("theme_map.json"), theme_map)
-    save_json(Path(args.details), detailed)
 
     covered = sum(1 for v in stock_themes.values() if v)
     print(f"Classified stocks: {covered}/{len(stock_themes)}")
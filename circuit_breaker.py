@@ -0,0 +1,122 @@
+import threading
+import time
+from typing import Any
+
+import requests
+
+from metrics import REGISTRY
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+FAILURE_THRESHOLD = 3
+BASE_PROBE_SECONDS = 5.0
+MAX_PROBE_SECONDS = 300.0
+# 404 means a bad code or path, not a sick upstream; these statuses do.
+FAILURE_STATUSES = frozenset({401, 403, 429})
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """Raised instead of sending a request to an endpoint whose breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Closed -> open after `failure_threshold` consecutive failures. While open, requests
+    fail immediately; once the probe interval passes, one request is let through
+    (half-open). Success closes the breaker, failure reopens it with a doubled interval.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = FAILURE_THRESHOLD,
+        base_probe_seconds: float = BASE_PROBE_SECONDS,
+        max_probe_seconds: float = MAX_PROBE_SECONDS,
+    ) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.base_probe_seconds = base_probe_seconds
+        self.max_probe_seconds = max_probe_seconds
+        self.state = CLOSED
+        self.failures = 0
+        self.probe_seconds = base_probe_seconds
+        self.next_probe_at = 0.0
+        self.last_error = ''
+        self._lock = threading.Lock()
+
+    def allow(self, now: float | None = None) -> bool:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and now >= self.next_probe_at:
+                self.state = HALF_OPEN
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self.probe_seconds = self.base_probe_seconds
+            self.last_error = ''
+
+    def record_failure(self, error: str = '', now: float | None = None) -> None:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self.failures += 1
+            self.last_error = error
+            if self.state == HALF_OPEN:
+                self.probe_seconds = min(self.max_probe_seconds, self.probe_seconds * 2)
+            elif self.state == CLOSED and self.failures < self.failure_threshold:
+                return
+            if self.state != OPEN:
+                REGISTRY.inc('circuit_opened_total', endpoint=self.name)
+            self.state = OPEN
+            self.next_probe_at = now + self.probe_seconds
+
+    def status(self, now: float | None = None) -> dict[str, Any]:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            return {
+                'endpoint': self.name,
+                'state': self.state,
+                'failures': self.failures,
+                'retry_in_s': round(max(0.0, self.next_probe_at - now), 1) if self.state == OPEN else 0.0,
+                'last_error': self.last_error,
+            }
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(endpoint: str) -> CircuitBreaker:
+    breaker = _breakers.get(endpoint)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.setdefault(endpoint, CircuitBreaker(endpoint))
+    return breaker
+
+
+def breaker_status() -> list[dict[str, Any]]:
+    with _breakers_lock:
+        breakers = sorted(_breakers.values(), key=lambda breaker: breaker.name)
+    return [breaker.status() for breaker in breakers]
+
+
+def source_states() -> dict[str, str]:
+    """Worst breaker state per source ('naver', 'kiwoom', ...), keyed by endpoint prefix."""
+    rank = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+    states: dict[str, str] = {}
+    for row in breaker_status():
+        source = row['endpoint'].split('.', 1)[0]
+        if rank[row['state']] >= rank[states.get(source, CLOSED)]:
+            states[source] = row['state']
+    return states
+
+
+def reset() -> None:
+    with _breakers_lock:
+        _breakers.clear()
@@ -0,0 +1,221 @@
+"""
+Shared crawl scheduler for the build scripts, the security master and the Naver market sweep.
+
+A `CrawlScheduler` fetches the pages of a paged list concurrently once the last page is
+known -- from the pagination links on page 1, or by probing when a page has none -- and
+runs independent crawls (e.g. KRX KOSPI, KRX KOSDAQ and the Naver name map) in parallel.
+Every request goes through a per-host gate, so concurrency never exceeds `per_host`
+requests at a time or `1 / min_interval` request starts per second against one site.
+`naver_market_sum_pages` is the one crawler of Naver's market-sum list.
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Iterable, Iterator, TypeVar
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import http_client
+from metrics import parse_timer
+from naver_list import ListPage, parse_list_page
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+CRAWL_WORKERS = 4
+# The shared scheduler runs the market sweep's two markets next to reference-table crawls.
+SHARED_CRAWL_WORKERS = 8
+PAGE_WORKERS = 8
+PER_HOST_LIMIT = 4
+MIN_INTERVAL_SECONDS = 0.05
+MAX_PAGES = 100
+
+NAVER_HEADERS = {"User-Agent": "Mozilla/5.0"}
+NAVER_MARKET_SUM_PATH = "/sise/sise_market_sum.naver?sosok={sosok}&page={page}"
+NAVER_ROWS_PER_PAGE = 50
+
+
+class _HostGate:
+    def __init__(self, limit: int, min_interval: float) -> None:
+        self.slots = threading.BoundedSemaphore(limit)
+        self.min_interval = min_interval
+        self.next_start = 0.0
+        self.lock = threading.Lock()
+
+    def wait_turn(self) -> None:
+        with self.lock:
+            now = time.monotonic()
+            start = max(self.next_start, now)
+            self.next_start = start + self.min_interval
+        if start > now:
+            time.sleep(start - now)
+
+
+class CrawlScheduler:
+    """Thread pools for crawls and pages plus a politeness gate per host."""
+
+    def __init__(
+        self,
+        crawl_workers: int = CRAWL_WORKERS,
+        page_workers: int = PAGE_WORKERS,
+        per_host: int = PER_HOST_LIMIT,
+        min_interval: float = MIN_INTERVAL_SECONDS,
+    ) -> None:
+        self.per_host = per_host
+        self.min_interval = min_interval
+        # Crawls wait on pages, so they get their own pool; page tasks never submit work.
+        self._crawls = ThreadPoolExecutor(max_workers=crawl_workers, thread_name_prefix="crawl")
+        self._pages = ThreadPoolExecutor(max_workers=page_workers, thread_name_prefix="crawl-page")
+        self._gates: dict[str, _HostGate] = {}
+        self._gates_lock = threading.Lock()
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_maxsize=max(page_workers, crawl_workers))
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+    def __enter__(self) -> CrawlScheduler:
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._crawls.shutdown(wait=True)
+        self._pages.shutdown(wait=True)
+        self._session.close()
+
+    def _gate(self, url: str) -> _HostGate:
+        host = urlsplit(url).netloc
+        with self._gates_lock:
+            gate = self._gates.get(host)
+            if gate is None:
+                gate = self._gates[host] = _HostGate(self.per_host, self.min_interval)
+            return gate
+
+    def get(self, url: str, endpoint: str | None = None, **kwargs: Any) -> requests.Response:
+        """
+        requests.get under the host's concurrency limit and request spacing. With an
+        `endpoint` label it goes through http_client (metrics and circuit breaker).
+        """
+        gate = self._gate(url)
+        with gate.slots:
+            gate.wait_turn()
+            if endpoint:
+                return http_client.get(endpoint, url, **kwargs)
+            return self._session.get(url, **kwargs)
+
+    def submit(self, fn: Callable[..., R], *args: Any, **kwargs: Any) -> Future[R]:
+        """Start an independent crawl. It may fetch pages via `paged`, but must not wait on another crawl."""
+        return self._crawls.submit(fn, *args, **kwargs)
+
+    def map(self, fn: Callable[[T], R], items: Iterable[T]) -> Iterator[R]:
+        """Run `fn` over `items` as parallel crawls; results come back in input order."""
+        return self._crawls.map(fn, items)
+
+    def paged(
+        self,
+        fetch_page: Callable[[int], T],
+        last_page: Callable[[T], int | None],
+        has_rows: Callable[[T], bool] = lambda page: bool(len(page)),
+        max_pages: int = MAX_PAGES,
+    ) -> list[T]:
+        """
+        Fetch pages 1..N of one paged list. Page 1 is fetched first and `last_page(page1)`
+        gives N; when it returns None, N is found by probing for the first page without
+        rows. Pages 2..N are then fetched concurrently. Pages that fail or come back empty
+        are left out. Errors from page 1 propagate.
+        """
+        fetched: dict[int, T | None] = {1: fetch_page(1)}
+        last = last_page(fetched[1])
+        if last is None:
+            last = self._probe_last_page(fetch_page, has_rows, max_pages, fetched)
+        last = max(1, min(last, max_pages))
+
+        futures = {number: self._pages.submit(fetch_page, number) for number in range(2, last + 1) if number not in fetched}
+        for number, future in futures.items():
+            try:
+                fetched[number] = future.result()
+            except Exception as e:
+                print(f"Skipping page {number}: {e}")
+        return [
+            page for number, page in sorted(fetched.items(), key=lambda item: item[0])
+            if number <= last and page is not None and has_rows(page)
+        ]
+
+    def _probe_last_page(
+        self,
+        fetch_page: Callable[[int], T],
+        has_rows: Callable[[T], bool],
+        max_pages: int,
+        fetched: dict[int, T | None],
+    ) -> int:
+        """Last page with rows: double the page number until one is empty, then bisect."""
+
+        def nonempty(number: int) -> bool:
+            if number not in fetched:
+                try:
+                    fetched[number] = fetch_page(number)
+                except Exception:
+                    fetched[number] = None
+            page = fetched[number]
+            return page is not None and has_rows(page)
+
+        if not nonempty(1):
+            return 1
+        low, high = 1, 2
+        while high <= max_pages and nonempty(high):
+            low, high = high, high * 2
+        high = min(high, max_pages + 1)
+        while high - low > 1:
+            middle = (low + high) // 2
+            if nonempty(middle):
+                low = middle
+            else:
+                high = middle
+        return low
+
+
+def naver_market_sum_pages(crawler: CrawlScheduler, sosok: int, max_pages: int = MAX_PAGES) -> list[ListPage]:
+    """All sise_market_sum pages of one market (0=KOSPI, 1=KOSDAQ), fetched concurrently."""
+    from scraper import naver_url
+
+    def fetch(page: int) -> ListPage:
+        url = naver_url(NAVER_MARKET_SUM_PATH.format(sosok=sosok, page=page))
+        res = crawler.get(url, endpoint="naver.market_sum", headers=NAVER_HEADERS, timeout=20)
+        res.raise_for_status()
+        with parse_timer("naver.market_sum"):
+            return parse_list_page(res.content.decode("euc-kr", "replace"))
+
+    def last_page(page: ListPage) -> int | None:
+        # A full page without pagination links does not mean there is only one page.
+        if page.last_page > 1 or len(page) < NAVER_ROWS_PER_PAGE:
+            return page.last_page
+        return None
+
+    return crawler.paged(fetch, last_page, max_pages=max_pages)
+
+
+def pages_for(rows: int, rows_per_page: int = NAVER_ROWS_PER_PAGE) -> int:
+    return max(1, math.ceil(rows / rows_per_page))
+
+
+_shared: CrawlScheduler | None = None
+_shared_lock = threading.Lock()
+
+
+def get_crawler() -> CrawlScheduler:
+    """
+    Process-wide scheduler for crawls outside the build scripts (the dashboard's market
+    sweep, the security master and shares tables), so they all share one gate per host.
+    """
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = CrawlScheduler(crawl_workers=SHARED_CRAWL_WORKERS)
+        return _shared
@@ -0,0 +1,138 @@
+from dataclasses import dataclass
+from typing import Any, Iterable, Mapping
+
+import pandas as pd
+
+from quote_history import MOMENTUM_FIELDS
+from quotes import Quote
+from security_master import EXCHANGE_TRADED_KINDS, SecurityMaster, get_master, name_kind
+from themes import get_theme, get_theme_list, get_theme_members
+
+# Theme tables hide small caps (< 500억) unless they are nearly limit-up.
+THEME_PRUNE_RATE = 20.0
+THEME_PRUNE_MARKET_CAP = 500
+TOP_TABLE_FIELDS = ['rank', 'original_rank', 'code', 'name', 'theme', 'price', 'rate', 'amount', 'market_cap']
+THEME_TABLE_FIELDS = ['code', 'name', 'market', 'price', 'rate', 'amount', 'market_cap']
+
+
+@dataclass(frozen=True)
+class TopListFilter:
+    use_rate_filter: bool = True
+    rate_threshold: float = 4.0
+    exclude_etf: bool = True
+
+
+def normalize_int(value: Any, default: int = 0) -> int:
+    try:
+        return int(str(value).replace(',', ''))
+    except Exception:
+        return default
+
+
+def normalize_float(value: Any, default: float = 0.0) -> float:
+    try:
+        number = float(str(value).replace('%', '').replace(',', '').strip())
+    except Exception:
+        return default
+    return default if number != number else number
+
+
+def is_etf(stock: Mapping[str, Any], master: SecurityMaster | None = None) -> bool:
+    """ETF or ETN per the security master; codes it does not know fall back to name keywords."""
+    kind = (master or get_master()).kind_of(stock.get('code', '')) or name_kind(stock.get('name', ''))
+    return kind in EXCHANGE_TRADED_KINDS
+
+
+def filter_top_stocks(raw_stocks: Iterable[dict[str, Any]], settings: TopListFilter) -> list[dict[str, Any]]:
+    filtered = []
+    master = get_master()
+    for idx, stock in enumerate(raw_stocks):
+        stock = dict(stock)
+        stock['original_rank'] = idx + 1
+        stock_rate = normalize_float(stock.get('rate', 0.0))
+        if settings.use_rate_filter and stock_rate < settings.rate_threshold:
+            continue
+        if settings.exclude_etf and is_etf(stock, master):
+            continue
+        stock['rate'] = stock_rate
+        filtered.append(stock)
+    return filtered
+
+
+def build_top_table(filtered_stocks: list[dict[str, Any]]) -> pd.DataFrame:
+    df = pd.DataFrame(filtered_stocks)
+    if df.empty:
+        return pd.DataFrame(columns=TOP_TABLE_FIELDS)
+    df['rank'] = range(1, len(df) + 1)
+    for column in ('code', 'name'):
+        if column not in df.columns:
+            df[column] = ''
+    if 'market_cap' not in df.columns:
+        df['market_cap'] = 0
+    df['price'] = pd.to_numeric(df['price'], errors='coerce').fillna(0).astype(int)
+    df['rate'] = pd.to_numeric(df['rate'], errors='coerce').fillna(0.0)
+    df['amount'] = pd.to_numeric(df['amount'], errors='coerce').fillna(0).astype(int)
+    df['market_cap'] = pd.to_numeric(df['market_cap'], errors='coerce').fillna(0).astype(int)
+    df['theme'] = df['name'].apply(get_theme)
+    return df[TOP_TABLE_FIELDS]
+
+
+def add_momentum(df: pd.DataFrame, momentum: pd.DataFrame) -> pd.DataFrame:
+    """Append the momentum columns (QuoteHistory.momentum, indexed by code) to a table with a code column."""
+    joined = momentum.reindex(df['code'])
+    df = df.copy()
+    for field in MOMENTUM_FIELDS:
+        df[field] = joined[field].to_numpy()
+    df['new_high'] = df['new_high'].fillna(False).astype(bool)
+    return df
+
+
+def quote_lookup_from(stocks: Iterable[Mapping[str, Any]]) -> dict[str, Quote]:
+    quote_lookup: dict[str, Quote] = {}
+    for stock in stocks:
+        code = stock.get('code')
+        if not code or code in quote_lookup:
+            continue
+        quote_lookup[code] = Quote.from_mapping(stock)
+    return quote_lookup
+
+
+def expand_themes(filtered_stocks: list[dict[str, Any]]) -> tuple[dict[str, list[dict[str, str]]], set[str]]:
+    """Return {theme: members} for every theme of the filtered stocks, plus all member codes."""
+    active_themes = set()
+    for stock in filtered_stocks:
+        active_themes.update(get_theme_list(stock['name']))
+
+    theme_members_map: dict[str, list[dict[str, str]]] = {}
+    member_codes: set[str] = set()
+    for theme in sorted(active_themes):
+        members = get_theme_members(theme)
+        if not members:
+            continue
+        theme_members_map[theme] = members
+        for member in members:
+            code = member.get('code', '')
+            if code:
+                member_codes.add(code)
+    return theme_members_map, member_codes
+
+
+def build_theme_table(members: list[dict[str, str]], quote_lookup: Mapping[str, Mapping[str, Any]]) -> pd.DataFrame:
+    tdf = pd.DataFrame(members)
+    for column in ('code', 'name', 'market'):
+        if column not in tdf.columns:
+            tdf[column] = ''
+    if tdf.empty:
+        return pd.DataFrame(columns=THEME_TABLE_FIELDS)
+
+    tdf['price'] = tdf['code'].apply(lambda c: quote_lookup.get(c, {}).get('price', 0))
+    tdf['rate'] = tdf['code'].apply(lambda c: quote_lookup.get(c, {}).get('rate', 0.0))
+    tdf['amount'] = tdf['code'].apply(lambda c: quote_lookup.get(c, {}).get('amount', 0))
+    tdf['market_cap'] = tdf['code'].apply(lambda c: quote_lookup.get(c, {}).get('market_cap', 0))
+    tdf['price'] = pd.to_numeric(tdf['price'], errors='coerce').fillna(0).astype(int)
+    tdf['rate'] = pd.to_numeric(tdf['rate'], errors='coerce').fillna(0.0)
+    tdf['amount'] = pd.to_numeric(tdf['amount'], errors='coerce').fillna(0).astype(int)
+    tdf['market_cap'] = pd.to_numeric(tdf['market_cap'], errors='coerce').fillna(0).astype(int)
+    tdf = tdf[~((tdf['rate'] < THEME_PRUNE_RATE) & (tdf['market_cap'] < THEME_PRUNE_MARKET_CAP))]
+    tdf = tdf.sort_values(by=['rate', 'amount'], ascending=[False, False], kind='stable')
+    return tdf[THEME_TABLE_FIELDS]
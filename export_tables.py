@@ -0,0 +1,187 @@
+"""
+Headless export of the dashboard's top list and per-theme tables.
+
+Runs the same filtering/theme logic as app.py (via dashboard_engine) without Streamlit and
+writes each cycle to JSON Lines or Parquet, so batch consumers and alerting jobs can read the
+numbers the dashboard shows.
+
+Examples:
+    python export_tables.py                          # one cycle, JSON Lines under ./exports
+    python export_tables.py --interval 30            # daemon: one cycle every 30 seconds
+    python export_tables.py --format parquet --source kiwoom --limit 50
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+
+from dashboard_engine import (
+    TopListFilter,
+    build_theme_table,
+    build_top_table,
+    expand_themes,
+    filter_top_stocks,
+    quote_lookup_from,
+)
+from kiwoom_provider import KiwoomConfigurationError, KiwoomRequestError
+from kiwoom_provider import get_stock_snapshots as get_kiwoom_snapshots
+from kiwoom_provider import get_top_stocks as get_kiwoom_top_stocks
+from metrics import record_error
+from quote_scheduler import REQUEST_BUDGETS, QuoteScheduler
+from scraper import get_stock_snapshots, get_top_stocks, refresh_from_sweep
+from snapshot_recorder import record_batch
+
+KST = timezone(timedelta(hours=9))
+
+
+def fetch_top_stocks(source: str, limit: int) -> tuple[list[dict[str, Any]], str]:
+    if source == "kiwoom":
+        try:
+            return get_kiwoom_top_stocks(limit=limit, sort_by="amount"), "kiwoom"
+        except (KiwoomConfigurationError, KiwoomRequestError) as exc:
+            print(f"Kiwoom top list unavailable, using Naver: {exc}")
+    return get_top_stocks(limit=limit, sort_by="amount"), "naver"
+
+
+def fetch_snapshots(source: str, codes: list[str]) -> dict[str, dict[str, Any]]:
+    if not codes:
+        return {}
+    if source == "kiwoom":
+        try:
+            return get_kiwoom_snapshots(codes)
+        except (KiwoomConfigurationError, KiwoomRequestError) as exc:
+            print(f"Kiwoom snapshots unavailable, using Naver: {exc}")
+    return get_stock_snapshots(codes)
+
+
+def run_cycle(
+    source: str,
+    limit: int,
+    settings: TopListFilter,
+    schedulers: dict[str, QuoteScheduler],
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    raw_stocks, effective_source = fetch_top_stocks(source, limit)
+    record_batch(raw_stocks, effective_source)
+    filtered = filter_top_stocks(raw_stocks, settings)
+    top_df = build_top_table(filtered)
+
+    theme_members_map, member_codes = expand_themes(filtered)
+    quote_lookup = quote_lookup_from(raw_stocks)
+    scheduler = schedulers.setdefault(
+        effective_source, QuoteScheduler(requests_per_minute=REQUEST_BUDGETS[effective_source])
+    )
+    scheduler.observe(quote_lookup)
+    missing_codes = member_codes - quote_lookup.keys()
+    unswept = refresh_from_sweep(scheduler, missing_codes) if effective_source == "naver" else missing_codes
+    due_codes = scheduler.due_codes(unswept)
+    snapshots = fetch_snapshots(effective_source, due_codes)
+    record_batch(snapshots.values(), effective_source)
+    scheduler.observe(snapshots)
+    quote_lookup.update(scheduler.latest(missing_codes))
+
+    theme_frames = []
+    for theme, members in sorted(theme_members_map.items()):
+        tdf = build_theme_table(members, quote_lookup)
+        if tdf.empty:
+            continue
+        tdf.insert(0, "theme", theme)
+        theme_frames.append(tdf)
+    theme_df = pd.concat(theme_frames, ignore_index=True) if theme_frames else pd.DataFrame()
+
+    ts = datetime.now(KST).isoformat(timespec="seconds")
+    for frame in (top_df, theme_df):
+        if not frame.empty:
+            frame.insert(0, "ts", ts)
+            frame.insert(1, "source", effective_source)
+    return top_df, theme_df
+
+
+def write_jsonl(df: pd.DataFrame, path: Path) -> None:
+    if df.empty:
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    text = df.to_json(orient="records", lines=True, force_ascii=False)
+    with path.open("a", encoding="utf-8") as f:
+        f.write(text if text.endswith("\n") else text + "\n")
+
+
+def write_parquet(df: pd.DataFrame, path: Path) -> None:
+    if df.empty:
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        df.to_parquet(path, index=False, compression="zstd")
+    except ImportError as exc:
+        raise SystemExit(f"Parquet output needs pyarrow (pip install pyarrow): {exc}")
+
+
+def write_cycle(top_df: pd.DataFrame, theme_df: pd.DataFrame, output_dir: Path, fmt: str) -> None:
+    now = datetime.now(KST)
+    day = now.strftime("%Y%m%d")
+    if fmt == "parquet":
+        # Microseconds, so cycles less than a second apart do not overwrite each other.
+        stamp = now.strftime("%H%M%S_%f")
+        write_parquet(top_df, output_dir / "top_list" / day / f"{stamp}.parquet")
+        write_parquet(theme_df, output_dir / "themes" / day / f"{stamp}.parquet")
+    else:
+        write_jsonl(top_df, output_dir / f"top_list-{day}.jsonl")
+        write_jsonl(theme_df, output_dir / f"themes-{day}.jsonl")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Export dashboard tables without Streamlit.")
+    parser.add_argument("--source", choices=["naver", "kiwoom"], default="naver", help="Top list source")
+    parser.add_argument("--limit", type=int, default=30, help="Top N by trading value")
+    parser.add_argument("--rate-threshold", type=float, default=4.0, help="Min rate (%%) for the top list")
+    parser.add_argument("--no-rate-filter", action="store_true", help="Disable the rate filter")
+    parser.add_argument("--include-etf", action="store_true", help="Keep ETF/ETN rows")
+    parser.add_argument("--format", choices=["jsonl", "parquet"], default="jsonl", help="Output format")
+    parser.add_argument("--output-dir", default="exports", help="Output directory")
+    parser.add_argument("--interval", type=float, default=0.0, help="Seconds between cycles (0 = run once)")
+    parser.add_argument("--cycles", type=int, default=0, help="Stop after N cycles (0 = unlimited with --interval)")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    settings = TopListFilter(
+        use_rate_filter=not args.no_rate_filter,
+        rate_threshold=args.rate_threshold,
+        exclude_etf=not args.include_etf,
+    )
+    output_dir = Path(args.output_dir)
+    schedulers: dict[str, QuoteScheduler] = {}
+    max_cycles = args.cycles or (0 if args.interval > 0 else 1)
+
+    cycle = 0
+    next_run = time.monotonic()
+    try:
+        while True:
+            cycle += 1
+            try:
+                top_df, theme_df = run_cycle(args.source, args.limit, settings, schedulers)
+                write_cycle(top_df, theme_df, output_dir, args.format)
+            except Exception as exc:
+                # A daemon outlives a failed upstream fetch or write; a one-shot run reports it.
+                if args.interval <= 0:
+                    raise
+                record_error("export.cycle")
+                print(f"[{datetime.now(KST):%H:%M:%S}] cycle {cycle} failed: {type(exc).__name__}: {exc}")
+            else:
+                print(f"[{datetime.now(KST):%H:%M:%S}] cycle {cycle}: {len(top_df)} top rows, {len(theme_df)} theme rows")
+            if max_cycles and cycle >= max_cycles:
+                break
+            next_run += args.interval
+            time.sleep(max(0.0, next_run - time.monotonic()))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
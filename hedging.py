@@ -0,0 +1,205 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable
+
+from metrics import REGISTRY
+
+DEFAULT_HEDGE_DELAY_SECONDS = 1.0
+MIN_HEDGE_DELAY_SECONDS = 0.2
+MAX_HEDGE_DELAY_SECONDS = 5.0
+HEDGE_QUANTILE = 0.95
+LATENCY_WINDOW = 200
+MIN_LATENCY_SAMPLES = 20
+# Upper bound on one hedged call. A Kiwoom snapshot makes one 15s-timeout request per
+# code, so without it a hung primary could hold the caller for minutes.
+HEDGE_DEADLINE_SECONDS = 30.0
+
+_HEDGE_WORKERS = 8
+# Secondaries get their own pool: primaries that lost (or hang) must never queue the hedge.
+_primary_executor = ThreadPoolExecutor(max_workers=_HEDGE_WORKERS, thread_name_prefix='hedge-primary')
+_secondary_executor = ThreadPoolExecutor(max_workers=_HEDGE_WORKERS, thread_name_prefix='hedge-secondary')
+_current = threading.local()
+
+
+class CallCancelled(Exception):
+    """Raised inside a hedged call that lost the race or ran past the deadline."""
+
+
+def raise_if_cancelled() -> None:
+    """
+    For long multi-request calls (e.g. one request per code) to check between requests:
+    stops the call once hedged_call no longer needs its result. A no-op outside a hedged call.
+    """
+    cancel = getattr(_current, 'cancel', None)
+    if cancel is not None and cancel.is_set():
+        raise CallCancelled('Hedged call no longer needed')
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies per source, used to tune the hedge delay."""
+
+    def __init__(self, window: int = LATENCY_WINDOW) -> None:
+        self.window = window
+        self._samples: dict[str, deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, source: str, seconds: float) -> None:
+        with self._lock:
+            self._samples.setdefault(source, deque(maxlen=self.window)).append(seconds)
+        REGISTRY.observe('source_call_seconds', seconds, source=source)
+
+    def quantile(self, source: str, q: float) -> float | None:
+        with self._lock:
+            samples = sorted(self._samples.get(source, ()))
+        if len(samples) < MIN_LATENCY_SAMPLES:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    def summary(self) -> list[dict[str, Any]]:
+        with self._lock:
+            sources = sorted(self._samples)
+        rows = []
+        for source in sources:
+            with self._lock:
+                samples = sorted(self._samples[source])
+            rows.append(
+                {
+                    'source': source,
+                    'calls': len(samples),
+                    'p50_ms': round(samples[len(samples) // 2] * 1000),
+                    'p95_ms': round(samples[min(len(samples) - 1, int(0.95 * len(samples)))] * 1000),
+                }
+            )
+        return rows
+
+
+LATENCY = LatencyTracker()
+
+
+def hedge_delay(primary: str) -> float:
+    """
+    Seconds to wait for `primary` before firing the secondary source.
+    BLUEKEY_HEDGE_DELAY pins it; otherwise it follows the primary's recent p95.
+    """
+    configured = os.getenv('BLUEKEY_HEDGE_DELAY', '').strip()
+    if configured:
+        try:
+            return max(0.0, float(configured))
+        except ValueError:
+            pass
+    observed = LATENCY.quantile(primary, HEDGE_QUANTILE)
+    if observed is None:
+        return DEFAULT_HEDGE_DELAY_SECONDS
+    return min(MAX_HEDGE_DELAY_SECONDS, max(MIN_HEDGE_DELAY_SECONDS, observed))
+
+
+class _Call:
+    """One side of a hedged call: records its latency exactly once, also when it fails or is abandoned."""
+
+    def __init__(self, source: str, func: Callable[[], Any]) -> None:
+        self.source = source
+        self.func = func
+        self.cancel = threading.Event()
+        self.future: Future | None = None
+        self._started: float | None = None
+        self._recorded = False
+        self._lock = threading.Lock()
+
+    def submit(self, executor: ThreadPoolExecutor) -> Future:
+        self.future = executor.submit(self._run)
+        return self.future
+
+    def _run(self) -> Any:
+        with self._lock:
+            if self.cancel.is_set():
+                raise CallCancelled('Hedged call no longer needed')
+            self._started = time.perf_counter()
+        _current.cancel = self.cancel
+        try:
+            return self.func()
+        except Exception:
+            REGISTRY.inc('hedge_call_failures_total', source=self.source)
+            raise
+        finally:
+            _current.cancel = None
+            self._record()
+
+    def _record(self) -> None:
+        with self._lock:
+            if self._recorded or self._started is None:
+                return
+            self._recorded = True
+            elapsed = time.perf_counter() - self._started
+        LATENCY.record(self.source, elapsed)
+
+    def abandon(self) -> None:
+        """Stop waiting for this call: cancel it if queued, else signal it and record its time so far."""
+        self.cancel.set()
+        if self.future is not None and self.future.cancel():
+            return
+        if self.future is not None and not self.future.done():
+            REGISTRY.inc('hedge_call_abandoned_total', source=self.source)
+            self._record()
+
+
+def _valid(future: Future, is_valid: Callable[[Any], bool]) -> bool:
+    return not future.cancelled() and future.exception() is None and is_valid(future.result())
+
+
+def hedged_call(
+    primary: tuple[str, Callable[[], Any]],
+    secondary: tuple[str, Callable[[], Any]],
+    delay: float | None = None,
+    is_valid: Callable[[Any], bool] = bool,
+    deadline: float = HEDGE_DEADLINE_SECONDS,
+) -> tuple[Any, str, BaseException | None]:
+    """
+    Run `primary`; if it has not produced a valid result after `delay` seconds (or fails
+    sooner), also run `secondary` and return whichever valid result arrives first.
+
+    Returns (result, source, primary_error). The losing call is signalled to stop (see
+    raise_if_cancelled) and its result is discarded. Raises the primary's error when
+    neither source succeeds, and TimeoutError when neither answers within `deadline`.
+    """
+    primary_source, _ = primary
+    secondary_source, _ = secondary
+    delay = hedge_delay(primary_source) if delay is None else delay
+    deadline_at = time.monotonic() + deadline
+
+    primary_call = _Call(*primary)
+    primary_future = primary_call.submit(_primary_executor)
+    wait([primary_future], timeout=min(delay, deadline))
+    if primary_future.done() and _valid(primary_future, is_valid):
+        return primary_future.result(), primary_source, None
+
+    REGISTRY.inc('hedge_fired_total', source=secondary_source)
+    secondary_call = _Call(*secondary)
+    secondary_future = secondary_call.submit(_secondary_executor)
+    pending = {primary_future, secondary_future}
+    while pending:
+        done, pending = wait(pending, timeout=max(0.0, deadline_at - time.monotonic()), return_when=FIRST_COMPLETED)
+        if not done:
+            for call in (primary_call, secondary_call):
+                call.abandon()
+            REGISTRY.inc('hedge_deadline_total', source=primary_source)
+            raise TimeoutError(f'Neither {primary_source} nor {secondary_source} answered within {deadline:g}s')
+        for call, future in ((primary_call, primary_future), (secondary_call, secondary_future)):
+            if future in done and _valid(future, is_valid):
+                REGISTRY.inc('hedge_wins_total', source=call.source)
+                if call is primary_call:
+                    secondary_call.abandon()
+                    return future.result(), call.source, None
+                primary_error = primary_future.exception() if primary_future.done() else None
+                primary_call.abandon()
+                return future.result(), call.source, primary_error
+
+    primary_error = primary_future.exception()
+    if primary_error is not None:
+        raise primary_error
+    secondary_error = secondary_future.exception()
+    if secondary_error is not None:
+        raise secondary_error
+    return primary_future.result(), primary_source, None
@@ -0,0 +1,96 @@
+import json
+import threading
+import time
+from typing import Any
+
+import requests
+
+from circuit_breaker import FAILURE_STATUSES, CircuitOpenError, get_breaker
+from metrics import REGISTRY, record_request
+
+
+class _InFlight:
+    __slots__ = ('done', 'response', 'error')
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.response: requests.Response | None = None
+        self.error: BaseException | None = None
+
+
+_in_flight: dict[str, _InFlight] = {}
+_in_flight_lock = threading.Lock()
+
+
+def _flight_key(endpoint: str, method: str, url: str, kwargs: dict[str, Any]) -> str:
+    parts = {name: kwargs.get(name) for name in ('params', 'json', 'data', 'headers')}
+    return f'{endpoint} {method.upper()} {url} ' + json.dumps(parts, sort_keys=True, default=str)
+
+
+def request(endpoint: str, method: str, url: str, **kwargs: Any) -> requests.Response:
+    """
+    Single-flight wrapper around `_send`: concurrent calls with the same endpoint, method,
+    URL, params, body and headers share one upstream request and its response, so a
+    burst of reruns after a cache expiry costs one fetch instead of one per session.
+    """
+    key = _flight_key(endpoint, method, url, kwargs)
+    with _in_flight_lock:
+        flight = _in_flight.get(key)
+        leader = flight is None
+        if leader:
+            flight = _in_flight[key] = _InFlight()
+    if not leader:
+        REGISTRY.inc('http_coalesced_total', endpoint=endpoint)
+        flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.response
+
+    try:
+        flight.response = _send(endpoint, method, url, **kwargs)
+        return flight.response
+    except BaseException as exc:
+        flight.error = exc
+        raise
+    finally:
+        with _in_flight_lock:
+            _in_flight.pop(key, None)
+        flight.done.set()
+
+
+def _send(endpoint: str, method: str, url: str, **kwargs: Any) -> requests.Response:
+    """
+    Issue an upstream HTTP request and record its latency, size and outcome under `endpoint`.
+    `endpoint` is a short stable label such as 'naver.item' or 'kiwoom.ka10032'; it also
+    keys the circuit breaker, so an endpoint that keeps failing is skipped until a probe succeeds.
+    """
+    breaker = get_breaker(endpoint)
+    if not breaker.allow():
+        REGISTRY.inc('circuit_rejected_total', endpoint=endpoint)
+        raise CircuitOpenError(f'{endpoint} circuit open: {breaker.last_error}')
+    started = time.perf_counter()
+    try:
+        response = requests.request(method, url, **kwargs)
+    except Exception as exc:
+        record_request(endpoint, time.perf_counter() - started, error=True)
+        breaker.record_failure(type(exc).__name__)
+        raise
+    if response.status_code >= 500 or response.status_code in FAILURE_STATUSES:
+        breaker.record_failure(f'HTTP {response.status_code}')
+    else:
+        breaker.record_success()
+    record_request(
+        endpoint,
+        time.perf_counter() - started,
+        nbytes=len(response.content or b''),
+        error=response.status_code >= 400,
+    )
+    return response
+
+
+def get(endpoint: str, url: str, **kwargs: Any) -> requests.Response:
+    return request(endpoint, 'GET', url, **kwargs)
+
+
+def post(endpoint: str, url: str, **kwargs: Any) -> requests.Response:
+    return request(endpoint, 'POST', url, **kwargs)
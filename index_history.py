@@ -2,8 +2,9 @@
 Fetch historical index data from Naver Finance for sparkline charts.
 Supports fetching multiple pages for longer time periods (3 months+).
 """
-import requests
-from bs4 import BeautifulSoup
+import http_client
+from metrics import parse_timer, record_error
+from scraper import naver_url
 
 def get_index_history(index_code="KOSPI", days=60):
     """
@@ -19,8 +20,11 @@ def get_index_history(index_code="KOSPI", days=60):
         "KOSDAQ": "1001"
     }
     
+    # bs4 is imported on first use, so importing this module stays cheap.
+    from bs4 import BeautifulSoup
+
     code = code_map.get(index_code, "0001")
-    base_url = f"https://finance.naver.com/sise/sise_index_day.naver?code={code}"
+    base_url = naver_url(f"/sise/sise_index_day.naver?code={code}")
     
     values = []
     seen_dates = set()
@@ -30,8 +34,9 @@ def get_index_history(index_code="KOSPI", days=60):
     try:
         while len(values) < days and page <= max_pages:
             url = f"{base_url}&page={page}"
-            res = requests.get(url, headers={'User-Agent': 'Mozilla/5.0'})
-            soup = BeautifulSoup(res.content.decode('euc-kr', 'replace'), 'html.parser')
+            res = http_client.get('naver.index_day', url, headers={'User-Agent': 'Mozilla/5.0'})
+            with parse_timer('naver.index_day'):
+                soup = BeautifulSoup(res.content.decode('euc-kr', 'replace'), 'html.parser')
             
             table = soup.select_one('table.type_1')
             if not table:
@@ -69,6 +74,7 @@ def get_index_history(index_code="KOSPI", days=60):
         return list(reversed(values))
         
     except Exception as e:
+        record_error('naver.index_day')
         print(f"Error fetching {index_code} history: {e}")
         return []
 
@@ -1,11 +1,20 @@
-﻿import json
+﻿import hashlib
+import json
 import os
 import threading
 import time
+from dataclasses import dataclass
 from pathlib import Path
 from typing import Any
 
 import requests
+
+import http_client
+from hedging import raise_if_cancelled
+from metrics import parse_timer, record_error
+from quotes import Quote
+from shares_reference import apply_market_caps
+
 try:
     from dotenv import load_dotenv
 except ImportError:
@@ -38,6 +47,12 @@ DEFAULT_TOP_STOCKS_BODY = {
     'stex_tp': '1',
 }
 LOCAL_ENV_FILENAME = 'kiwoom.local.env'
+TOKEN_CACHE_FILENAME = 'kiwoom.token.json'
+TOKEN_EXPIRY_MARGIN_SECONDS = 60
+# Tokens closer than this to expiry are renewed in the background while still being served.
+TOKEN_PREFETCH_SECONDS = 300
+# A failed background refresh is retried at most this often within the prefetch window.
+TOKEN_REFRESH_RETRY_SECONDS = 30.0
 
 _CODE_KEYS = ['code', 'stk_cd', 'stock_code', 'shrn_iscd', 'isu_cd', 'item_code', 'jongmok_code']
 _NAME_KEYS = ['name', 'stk_nm', 'stock_name', 'prdt_name', 'isu_nm', 'item_name', 'jongmok_name']
@@ -46,9 +61,22 @@ _RATE_KEYS = ['rate', 'flu_rt', 'prdy_ctrt', 'updn_rate', 'chg_rt']
 _AMOUNT_KEYS = ['amount', 'trde_amt', 'acc_trde_amt', 'deal_amount', 'trade_amount', 'acml_tr_pbmn', 'trde_prica']
 _VOLUME_KEYS = ['volume', 'trde_qty', 'acc_trde_qty', 'deal_qty', 'trade_volume', 'acml_vol', 'now_trde_qty']
 _MARKET_CAP_KEYS = ['market_cap', 'mkt_cap', 'mrkt_tot_amt', 'tot_mrkt_cap']
+_FIELD_CANDIDATES = {
+    'code': _CODE_KEYS,
+    'name': _NAME_KEYS,
+    'price': _PRICE_KEYS,
+    'rate': _RATE_KEYS,
+    'amount': _AMOUNT_KEYS,
+    'volume': _VOLUME_KEYS,
+    'market_cap': _MARKET_CAP_KEYS,
+}
+_SCHEMA_SAMPLE_ROWS = 20
 
 _token_cache: dict[str, Any] = {'token': None, 'expires_at': 0.0}
 _token_lock = threading.Lock()
+_token_refresh_thread: threading.Thread | None = None
+_token_refresh_attempt = 0.0
+_token_refresh_guard = threading.Lock()
 _env_loaded = False
 
 
@@ -89,12 +117,21 @@ def _get_env(name: str, default: str = '') -> str:
 def _reset_runtime_state() -> None:
     _token_cache['token'] = None
     _token_cache['expires_at'] = 0.0
+    try:
+        _token_cache_path().unlink(missing_ok=True)
+    except OSError:
+        record_error('kiwoom.token_cache')
 
 
 def _local_env_path() -> Path:
     return Path(__file__).resolve().parent / LOCAL_ENV_FILENAME
 
 
+def _token_cache_path() -> Path:
+    configured = os.getenv('KIWOOM_TOKEN_CACHE', '').strip()
+    return Path(configured) if configured else Path(__file__).resolve().parent / TOKEN_CACHE_FILENAME
+
+
 def has_credentials() -> bool:
     return bool(_get_env('KIWOOM_APPKEY') and _get_env('KIWOOM_SECRETKEY'))
 
@@ -178,39 +215,124 @@ def _coerce_float(value: Any) -> float:
         return 0.0
 
 
-def _pick_value(payload: dict[str, Any], candidates: list[str]) -> Any:
-    for key in candidates:
-        if key in payload and payload[key] not in (None, ''):
-            return payload[key]
-    return None
+@dataclass(frozen=True)
+class _TableSchema:
+    """Where an api-id's rows live in its payload and which key holds each field."""
 
+    path: tuple[str, ...] | None  # None: the payload itself is the single row
+    fields: dict[str, str | None]
 
-def _first_table(payload: Any) -> list[dict[str, Any]]:
+
+_schemas: dict[str, _TableSchema] = {}
+
+
+def _table_path(payload: Any, path: tuple[str, ...] = ()) -> tuple[str, ...] | None:
     if isinstance(payload, list):
-        return [row for row in payload if isinstance(row, dict)]
+        return path
     if isinstance(payload, dict):
-        for value in payload.values():
+        for key, value in payload.items():
             if isinstance(value, list) and value and all(isinstance(row, dict) for row in value):
-                return value
-        for value in payload.values():
+                return path + (key,)
+        for key, value in payload.items():
             if isinstance(value, dict):
-                nested = _first_table(value)
-                if nested:
+                nested = _table_path(value, path + (key,))
+                if nested is not None:
                     return nested
-    return []
+    return None
 
 
-def _first_row(payload: Any) -> dict[str, Any]:
-    if isinstance(payload, dict):
-        table = _first_table(payload)
-        if table:
-            return table[0]
-        return payload
-    if isinstance(payload, list):
-        for row in payload:
-            if isinstance(row, dict):
-                return row
-    return {}
+def _rows_at(payload: Any, path: tuple[str, ...] | None) -> list[dict[str, Any]] | None:
+    if path is None:
+        return [payload] if isinstance(payload, dict) else None
+    for key in path:
+        if not isinstance(payload, dict) or key not in payload:
+            return None
+        payload = payload[key]
+    if not isinstance(payload, list):
+        return None
+    return [row for row in payload if isinstance(row, dict)]
+
+
+def _resolve_field(candidates: list[str], sample: list[dict[str, Any]]) -> str | None:
+    return next((key for key in candidates if any(row.get(key) not in (None, '') for row in sample)), None)
+
+
+def _compile_schema(payload: Any) -> _TableSchema:
+    path = _table_path(payload)
+    rows = _rows_at(payload, path) or []
+    sample = rows[:_SCHEMA_SAMPLE_ROWS]
+    fields = {field: _resolve_field(candidates, sample) for field, candidates in _FIELD_CANDIDATES.items()}
+    return _TableSchema(path=path, fields=fields)
+
+
+def _fill_unresolved(schema: _TableSchema, rows: list[dict[str, Any]]) -> _TableSchema:
+    """
+    Resolve fields the schema could not place (their keys were empty when it was compiled,
+    e.g. a single-row ka10001 whose first response had mac: '') from these rows.
+    """
+    sample = rows[:_SCHEMA_SAMPLE_ROWS]
+    filled = {
+        field: _resolve_field(_FIELD_CANDIDATES[field], sample)
+        for field, key in schema.fields.items()
+        if key is None and field in _FIELD_CANDIDATES
+    }
+    filled = {field: key for field, key in filled.items() if key is not None}
+    if not filled:
+        return schema
+    return _TableSchema(path=schema.path, fields={**schema.fields, **filled})
+
+
+def _first_table(payload: Any) -> list[dict[str, Any]]:
+    path = _table_path(payload)
+    return (_rows_at(payload, path) or []) if path is not None else []
+
+
+def _extract_table(api_id: str, payload: Any) -> tuple[list[dict[str, Any]], _TableSchema]:
+    """
+    Rows of a response plus the cached schema for its api-id: recompiled if the layout
+    changed, and completed whenever these rows carry a field the schema left unresolved.
+    Only list layouts that resolve the code are cached, so an error envelope (or a
+    single-row payload) never pins a schema that later responses cannot use.
+    """
+    schema = _schemas.get(api_id)
+    rows = _rows_at(payload, schema.path) if schema else None
+    if rows and schema is not None and schema.fields.get('code') not in rows[0]:
+        rows = None
+    if not rows:
+        schema = _compile_schema(payload)
+        rows = _rows_at(payload, schema.path) or []
+        if rows and schema.path is not None and schema.fields.get('code'):
+            _schemas[api_id] = schema
+    elif schema is not None and None in schema.fields.values():
+        completed = _fill_unresolved(schema, rows)
+        if completed is not schema:
+            _schemas[api_id] = schema = completed
+    return rows, schema
+
+
+def _int_column(rows: list[dict[str, Any]], key: str | None) -> list[int]:
+    if key is None:
+        return [0] * len(rows)
+    return [abs(_coerce_int(row.get(key))) for row in rows]
+
+
+def _normalize_table(rows: list[dict[str, Any]], schema: _TableSchema) -> dict[str, list[Any]]:
+    """Normalize a whole table in one pass per field into columns; display strings are left to the renderer."""
+    fields = schema.fields
+    code_key, name_key, rate_key = fields.get('code'), fields.get('name'), fields.get('rate')
+    return {
+        'code': [str(row.get(code_key) or '').strip() for row in rows] if code_key else [''] * len(rows),
+        'name': [str(row.get(name_key) or '').strip() for row in rows] if name_key else [''] * len(rows),
+        'price': _int_column(rows, fields.get('price')),
+        'rate': [_coerce_float(row.get(rate_key)) for row in rows] if rate_key else [0.0] * len(rows),
+        'amount': _int_column(rows, fields.get('amount')),
+        'volume': _int_column(rows, fields.get('volume')),
+        'market_cap': _int_column(rows, fields.get('market_cap')),
+    }
+
+
+def _column_records(columns: dict[str, list[Any]], order: list[int]) -> list[Quote]:
+    return [Quote(**{name: values[index] for name, values in columns.items()}) for index in order]
 
 
 def _render_template(value: Any, context: dict[str, str]) -> Any:
@@ -252,39 +374,119 @@ def _base_url() -> str:
     return _get_env('KIWOOM_BASE_URL', DEFAULT_BASE_URL).rstrip('/')
 
 
-def _request_token() -> str:
-    _require_config()
-    with _token_lock:
-        now = time.time()
-        cached_token = _token_cache.get('token')
-        expires_at = float(_token_cache.get('expires_at') or 0.0)
-        if cached_token and expires_at - now > 60:
-            return cached_token
-
-        body = {
-            'grant_type': 'client_credentials',
-            'appkey': _get_env('KIWOOM_APPKEY'),
-            'secretkey': _get_env('KIWOOM_SECRETKEY'),
-        }
-        response = requests.post(_base_url() + TOKEN_URL, headers=DEFAULT_HEADERS, json=body, timeout=15)
+def _token_identity() -> str:
+    # Ties a persisted token to the base URL and AppKey it was issued for, without storing the key.
+    return hashlib.sha256(f"{_base_url()}|{_get_env('KIWOOM_APPKEY')}".encode('utf-8')).hexdigest()[:16]
+
+
+def _load_persisted_token() -> None:
+    try:
+        payload = json.loads(_token_cache_path().read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return
+    if payload.get('identity') != _token_identity() or not payload.get('token'):
+        return
+    _token_cache['token'] = payload['token']
+    _token_cache['expires_at'] = float(payload.get('expires_at') or 0.0)
+
+
+def _persist_token(token: str, expires_at: float) -> None:
+    path = _token_cache_path()
+    tmp_path = path.with_name(path.name + '.tmp')
+    payload = json.dumps({'identity': _token_identity(), 'token': token, 'expires_at': expires_at})
+    try:
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(payload)
+        os.chmod(tmp_path, 0o600)
+        os.replace(tmp_path, path)
+    except OSError:
+        record_error('kiwoom.token_cache')
+
+
+def _cached_token(margin: float) -> str | None:
+    token = _token_cache.get('token')
+    if token and float(_token_cache.get('expires_at') or 0.0) - time.time() > margin:
+        return token
+    return None
+
+
+def _fetch_token() -> str:
+    """Request a new token and publish it; callers hold _token_lock."""
+    body = {
+        'grant_type': 'client_credentials',
+        'appkey': _get_env('KIWOOM_APPKEY'),
+        'secretkey': _get_env('KIWOOM_SECRETKEY'),
+    }
+    now = time.time()
+    try:
+        response = http_client.post('kiwoom.token', _base_url() + TOKEN_URL, headers=DEFAULT_HEADERS, json=body, timeout=15)
         response.raise_for_status()
-        payload = response.json()
-        token = payload.get('token')
-        if not token:
-            raise KiwoomRequestError(f'Kiwoom token response missing token: {payload}')
-
-        expires_dt = str(payload.get('expires_dt', ''))
-        expires_at = now + 60 * 50
-        if len(expires_dt) == 14 and expires_dt.isdigit():
+    except requests.RequestException as exc:
+        raise KiwoomRequestError(f'Kiwoom token request failed: {exc}') from exc
+    payload = response.json()
+    token = payload.get('token')
+    if not token:
+        raise KiwoomRequestError(f'Kiwoom token response missing token: {payload}')
+
+    expires_dt = str(payload.get('expires_dt', ''))
+    expires_at = now + 60 * 50
+    if len(expires_dt) == 14 and expires_dt.isdigit():
+        try:
+            expires_at = time.mktime(time.strptime(expires_dt, '%Y%m%d%H%M%S'))
+        except ValueError:
+            pass
+
+    _token_cache['token'] = token
+    _token_cache['expires_at'] = expires_at
+    _persist_token(token, expires_at)
+    return token
+
+
+def _refresh_token_in_background() -> None:
+    global _token_refresh_thread, _token_refresh_attempt
+
+    def refresh() -> None:
+        with _token_lock:
+            if _cached_token(TOKEN_PREFETCH_SECONDS):
+                return
             try:
-                expires_at = time.mktime(time.strptime(expires_dt, '%Y%m%d%H%M%S'))
-            except ValueError:
-                pass
+                _fetch_token()
+            except Exception:
+                record_error('kiwoom.token_refresh')
+
+    with _token_refresh_guard:
+        if _token_refresh_thread is not None and _token_refresh_thread.is_alive():
+            return
+        if time.monotonic() - _token_refresh_attempt < TOKEN_REFRESH_RETRY_SECONDS and _token_refresh_attempt:
+            return
+        _token_refresh_attempt = time.monotonic()
+        _token_refresh_thread = threading.Thread(target=refresh, name='kiwoom-token-refresh', daemon=True)
+        _token_refresh_thread.start()
+
 
-        _token_cache['token'] = token
-        _token_cache['expires_at'] = expires_at
+def _request_token() -> str:
+    """
+    Return a valid token without blocking on a refresh whenever one is still usable.
+    Tokens are persisted (0600) so restarts and other workers skip the OAuth round trip.
+    """
+    _require_config()
+    token = _cached_token(TOKEN_EXPIRY_MARGIN_SECONDS)
+    if token:
+        if not _cached_token(TOKEN_PREFETCH_SECONDS):
+            _refresh_token_in_background()
         return token
 
+    with _token_lock:
+        token = _cached_token(TOKEN_EXPIRY_MARGIN_SECONDS)
+        if token:
+            return token
+        _load_persisted_token()
+        token = _cached_token(TOKEN_EXPIRY_MARGIN_SECONDS)
+        if token:
+            return token
+        return _fetch_token()
+
 
 def _request_api(url_env: str, api_id_env: str, body_env: str, context: dict[str, str] | None = None, method_env: str | None = None) -> Any:
     _require_config()
@@ -305,63 +507,21 @@ def _request_api(url_env: str, api_id_env: str, body_env: str, context: dict[str
         'next-key': '',
     }
     url = endpoint if endpoint.startswith('http') else _base_url() + endpoint
-    request_fn = requests.get if method_name == 'GET' else requests.post
     kwargs: dict[str, Any] = {'headers': headers, 'timeout': 15}
     if method_name == 'GET':
         kwargs['params'] = body
     else:
         kwargs['json'] = body
-    response = request_fn(url, **kwargs)
-    response.raise_for_status()
-    return response.json()
-
-
-def _normalize_stock_row(row: dict[str, Any]) -> dict[str, Any]:
-    code = str(_pick_value(row, _CODE_KEYS) or '').strip()
-    name = str(_pick_value(row, _NAME_KEYS) or '').strip()
-    price = abs(_coerce_int(_pick_value(row, _PRICE_KEYS)))
-    rate = _coerce_float(_pick_value(row, _RATE_KEYS))
-    amount = abs(_coerce_int(_pick_value(row, _AMOUNT_KEYS)))
-    volume = abs(_coerce_int(_pick_value(row, _VOLUME_KEYS)))
-    market_cap = abs(_coerce_int(_pick_value(row, _MARKET_CAP_KEYS)))
-    return {
-        'code': code,
-        'name': name,
-        'price': price,
-        'price_str': f'{price:,}' if price else '0',
-        'current_price': f'{price:,}' if price else '0',
-        'rate': rate,
-        'rate_str': f'{rate:+.2f}%',
-        'amount': amount,
-        'amount_str': f'{amount:,}',
-        'volume': volume,
-        'market_cap': market_cap,
-        'market_cap_str': f'{market_cap:,}' if market_cap else '0',
-    }
-
-
-def _enrich_market_caps(stocks: list[dict[str, Any]]) -> None:
-    missing_codes = [stock['code'] for stock in stocks if stock.get('code') and not stock.get('market_cap')]
-    if not missing_codes:
-        return
-
     try:
-        from scraper import get_stock_snapshots as get_naver_snapshots
-
-        snapshots = get_naver_snapshots(missing_codes)
-        for stock in stocks:
-            snapshot = snapshots.get(stock.get('code', ''))
-            if not snapshot:
-                continue
-            market_cap = abs(_coerce_int(snapshot.get('market_cap')))
-            if market_cap:
-                stock['market_cap'] = market_cap
-                stock['market_cap_str'] = f'{market_cap:,}'
-    except Exception:
-        pass
+        response = http_client.request(f'kiwoom.{api_id}', method_name, url, **kwargs)
+        response.raise_for_status()
+    except requests.RequestException as exc:
+        raise KiwoomRequestError(f'Kiwoom {api_id} request failed: {exc}') from exc
+    with parse_timer(f'kiwoom.{api_id}'):
+        return response.json()
 
 
-def get_top_stocks(limit: int = 30, sort_by: str = 'amount') -> list[dict[str, Any]]:
+def get_top_stocks(limit: int = 30, sort_by: str = 'amount') -> list[Quote]:
     if sort_by != 'amount':
         raise KiwoomConfigurationError('Kiwoom source currently supports sort_by="amount" only.')
     payload = _request_api(
@@ -370,23 +530,27 @@ def get_top_stocks(limit: int = 30, sort_by: str = 'amount') -> list[dict[str, A
         'KIWOOM_TOP_STOCKS_BODY',
         method_env='KIWOOM_TOP_STOCKS_METHOD',
     )
-    rows = _first_table(payload)
-    stocks = []
-    for row in rows:
-        stock = _normalize_stock_row(row)
-        if stock['code'] and stock['name']:
-            stocks.append(stock)
-    _enrich_market_caps(stocks)
-    stocks.sort(key=lambda item: item['amount'], reverse=True)
+    api_id = _get_endpoint_config('KIWOOM_TOP_STOCKS_URL', 'KIWOOM_TOP_STOCKS_API_ID', 'KIWOOM_TOP_STOCKS_BODY')[1]
+    with parse_timer('kiwoom.normalize'):
+        rows, schema = _extract_table(api_id, payload)
+        columns = _normalize_table(rows, schema)
+        codes, names = columns['code'], columns['name']
+        valid = [index for index in range(len(rows)) if codes[index] and names[index]]
+        stocks = _column_records(columns, valid)
+    apply_market_caps(stocks)
+    stocks.sort(key=lambda item: item.amount, reverse=True)
     for index, stock in enumerate(stocks[:limit], start=1):
-        stock['rank'] = index
+        stock.rank = index
     return stocks[:limit]
 
 
-def get_stock_snapshots(codes: list[str]) -> dict[str, dict[str, Any]]:
+def get_stock_snapshots(codes: list[str]) -> dict[str, Quote]:
     _require_snapshot_config()
-    snapshots: dict[str, dict[str, Any]] = {}
+    snapshots: dict[str, Quote] = {}
+    api_id = _get_endpoint_config('KIWOOM_SNAPSHOT_URL', 'KIWOOM_SNAPSHOT_API_ID', 'KIWOOM_SNAPSHOT_BODY')[1]
     for code in dict.fromkeys(code for code in codes if code):
+        # One request per code: stop early once a hedged call has been answered by Naver.
+        raise_if_cancelled()
         payload = _request_api(
             'KIWOOM_SNAPSHOT_URL',
             'KIWOOM_SNAPSHOT_API_ID',
@@ -394,10 +558,13 @@ def get_stock_snapshots(codes: list[str]) -> dict[str, dict[str, Any]]:
             context={'code': code},
             method_env='KIWOOM_SNAPSHOT_METHOD',
         )
-        row = _first_row(payload)
-        stock = _normalize_stock_row(row)
-        if not stock['code']:
-            stock['code'] = code
-        if stock['code']:
-            snapshots[stock['code']] = stock
+        rows, schema = _extract_table(api_id, payload)
+        if not rows:
+            continue
+        stock = _column_records(_normalize_table(rows[:1], schema), [0])[0]
+        if not stock.code:
+            stock.code = code
+        if stock.code:
+            snapshots[stock.code] = stock
+    apply_market_caps(snapshots.values())
     return snapshots
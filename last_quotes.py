@@ -0,0 +1,134 @@
+"""
+Last-known quotes, persisted so a fresh process can render before its first crawl.
+
+The dashboard records every top list and member-quote batch it fetches. The snapshot is
+written to last_quotes.json at most once a minute and at shutdown, and loaded at boot.
+Anything served from it is stale and has to be shown as such.
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Iterable, Mapping
+
+from metrics import record_error
+from quotes import Quote
+
+SNAPSHOT_FILENAME = 'last_quotes.json'
+SAVE_INTERVAL_SECONDS = 60.0
+
+
+class LastKnownQuotes:
+    def __init__(self, path: str | Path, save_interval: float = SAVE_INTERVAL_SECONDS) -> None:
+        self.path = Path(path)
+        self.save_interval = save_interval
+        self._top: dict[str, tuple[float, list[Quote]]] = {}
+        self._quotes: dict[str, Quote] = {}
+        self._quotes_as_of = 0.0
+        self._live: set[str] = set()
+        self._dirty = False
+        self._last_save = time.monotonic()
+        self._lock = threading.Lock()
+
+    def load(self) -> bool:
+        """Read the snapshot written by a previous process; returns whether one was found."""
+        try:
+            payload = json.loads(self.path.read_text(encoding='utf-8'))
+            top = {
+                str(source): (float(entry['as_of']), [Quote.from_mapping(row) for row in entry['stocks']])
+                for source, entry in payload.get('top', {}).items()
+            }
+            quotes = {str(code): Quote.from_mapping(row) for code, row in payload.get('quotes', {}).items()}
+            quotes_as_of = float(payload.get('quotes_as_of', 0.0))
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            return False
+        with self._lock:
+            for source, entry in top.items():
+                self._top.setdefault(source, entry)
+            for code, quote in quotes.items():
+                self._quotes.setdefault(code, quote)
+            self._quotes_as_of = self._quotes_as_of or quotes_as_of
+        return True
+
+    def is_live(self, source: str) -> bool:
+        """Whether this process has fetched the top list for `source` itself yet."""
+        return source in self._live
+
+    def top(self, source: str) -> tuple[list[Quote], float]:
+        """(stocks, as_of epoch seconds) of the last top list for `source`; empty when unknown."""
+        with self._lock:
+            as_of, stocks = self._top.get(source, (0.0, []))
+            return list(stocks), as_of
+
+    def quotes(self) -> tuple[dict[str, Quote], float]:
+        with self._lock:
+            return dict(self._quotes), self._quotes_as_of
+
+    def record_top(self, source: str, stocks: Iterable[Mapping[str, Any]]) -> None:
+        rows = [Quote.from_mapping(stock) for stock in stocks]
+        if not rows:
+            return
+        with self._lock:
+            self._top[source] = (time.time(), rows)
+            self._live.add(source)
+            self._dirty = True
+        self._save_if_due()
+
+    def record_quotes(self, quotes: Mapping[str, Mapping[str, Any]]) -> None:
+        if not quotes:
+            return
+        rows = {code: Quote.from_mapping(quote) for code, quote in quotes.items() if code}
+        with self._lock:
+            self._quotes.update(rows)
+            self._quotes_as_of = time.time()
+            self._dirty = True
+        self._save_if_due()
+
+    def _save_if_due(self) -> None:
+        if time.monotonic() - self._last_save >= self.save_interval:
+            self.save()
+
+    def save(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            payload = {
+                'top': {
+                    source: {'as_of': as_of, 'stocks': [quote.to_dict() for quote in stocks]}
+                    for source, (as_of, stocks) in self._top.items()
+                },
+                'quotes': {code: quote.to_dict() for code, quote in self._quotes.items()},
+                'quotes_as_of': self._quotes_as_of,
+            }
+            self._dirty = False
+            self._last_save = time.monotonic()
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_name(self.path.name + '.tmp')
+            tmp_path.write_text(json.dumps(payload, ensure_ascii=False), encoding='utf-8')
+            os.replace(tmp_path, self.path)
+        except OSError:
+            record_error('last_quotes.save')
+
+
+_store: LastKnownQuotes | None = None
+_store_lock = threading.Lock()
+
+
+def _snapshot_path() -> Path:
+    configured = os.getenv('BLUEKEY_LAST_QUOTES_FILE', '').strip()
+    return Path(configured) if configured else Path(__file__).resolve().parent / SNAPSHOT_FILENAME
+
+
+def get_last_known() -> LastKnownQuotes:
+    """Process-wide store, loaded from disk on first use and saved again at exit."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = LastKnownQuotes(_snapshot_path())
+            _store.load()
+            atexit.register(_store.save)
+        return _store
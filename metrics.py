@@ -0,0 +1,297 @@
+import functools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 15.0)
+PARSE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+METRIC_PREFIX = 'bluekey_'
+EXPORT_INTERVAL_SECONDS = 15.0
+
+_HELP = {
+    'http_requests_total': 'Upstream HTTP requests by endpoint.',
+    'http_errors_total': 'Upstream HTTP requests that raised or returned status >= 400.',
+    'http_bytes_total': 'Response bytes downloaded by endpoint.',
+    'http_request_seconds': 'Upstream request latency by endpoint.',
+    'parse_seconds': 'Time spent parsing upstream payloads.',
+    'cache_calls_total': 'Calls into st.cache_data loaders.',
+    'cache_misses_total': 'st.cache_data loader calls that ran the loader body.',
+    'errors_total': 'Errors swallowed on the hot path.',
+    'source_call_seconds': 'Latency of whole source calls (top list, snapshot batch) by source.',
+    'hedge_fired_total': 'Hedged calls that also fired the secondary source.',
+    'hedge_wins_total': 'Hedged calls won, by the source whose answer was used.',
+    'hedge_call_failures_total': 'Primary or secondary calls of a hedged call that raised, by source.',
+    'hedge_call_abandoned_total': 'Hedged calls still running when they lost or hit the deadline, by source.',
+    'hedge_deadline_total': 'Hedged calls where neither source answered within the deadline.',
+    'circuit_opened_total': 'Circuit breaker transitions to open by endpoint.',
+    'circuit_rejected_total': 'Requests skipped because the endpoint circuit was open.',
+    'http_coalesced_total': 'Requests served by joining an identical in-flight request.',
+}
+
+LabelKey = tuple[tuple[str, str], ...]
+
+
+class _Histogram:
+    __slots__ = ('buckets', 'counts', 'total', 'count')
+
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.total += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Upper bucket bound that covers the q-th quantile (inf past the last bucket)."""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        running = 0
+        for index, bound in enumerate(self.buckets):
+            running += self.counts[index]
+            if running >= target:
+                return bound
+        return float('inf')
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._counters: dict[str, dict[LabelKey, float]] = {}
+        self._histograms: dict[str, dict[LabelKey, _Histogram]] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, buckets: tuple[float, ...] = LATENCY_BUCKETS, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = _Histogram(buckets)
+            histogram.observe(value)
+
+    def counter(self, name: str) -> dict[LabelKey, float]:
+        with self._lock:
+            return dict(self._counters.get(name, {}))
+
+    def histogram(self, name: str) -> dict[LabelKey, _Histogram]:
+        with self._lock:
+            return dict(self._histograms.get(name, {}))
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def render_prometheus(self) -> str:
+        lines: list[str] = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                full_name = METRIC_PREFIX + name
+                lines.append(f'# HELP {full_name} {_HELP.get(name, name)}')
+                lines.append(f'# TYPE {full_name} counter')
+                for key, value in sorted(series.items()):
+                    lines.append(f'{full_name}{_format_labels(key)} {value:g}')
+            for name, series in sorted(self._histograms.items()):
+                full_name = METRIC_PREFIX + name
+                lines.append(f'# HELP {full_name} {_HELP.get(name, name)}')
+                lines.append(f'# TYPE {full_name} histogram')
+                for key, histogram in sorted(series.items()):
+                    running = 0
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        running += count
+                        lines.append(f'{full_name}_bucket{_format_labels(key + (("le", f"{bound:g}"),))} {running}')
+                    lines.append(f'{full_name}_bucket{_format_labels(key + (("le", "+Inf"),))} {histogram.count}')
+                    lines.append(f'{full_name}_sum{_format_labels(key)} {histogram.total:.6f}')
+                    lines.append(f'{full_name}_count{_format_labels(key)} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape_label(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"')
+
+
+def _format_labels(key: LabelKey) -> str:
+    if not key:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape_label(value)}"' for name, value in key) + '}'
+
+
+REGISTRY = MetricsRegistry()
+
+
+def record_request(endpoint: str, seconds: float, nbytes: int = 0, error: bool = False) -> None:
+    REGISTRY.inc('http_requests_total', endpoint=endpoint)
+    REGISTRY.observe('http_request_seconds', seconds, endpoint=endpoint)
+    if nbytes:
+        REGISTRY.inc('http_bytes_total', nbytes, endpoint=endpoint)
+    if error:
+        REGISTRY.inc('http_errors_total', endpoint=endpoint)
+
+
+def record_error(where: str) -> None:
+    REGISTRY.inc('errors_total', where=where)
+
+
+@contextmanager
+def parse_timer(parser: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        REGISTRY.observe('parse_seconds', time.perf_counter() - started, buckets=PARSE_BUCKETS, parser=parser)
+
+
+def cache_loader(cache_decorator: Callable[[Callable[..., Any]], Any]) -> Callable[[Callable[..., Any]], Any]:
+    """
+    Wrap an st.cache_data loader so calls and misses are counted per loader.
+    Usage: @cache_loader(st.cache_data(ttl=20)) in place of @st.cache_data(ttl=20).
+    """
+
+    def decorator(func: Callable[..., Any]) -> Any:
+        loader = func.__name__
+
+        @functools.wraps(func)
+        def on_miss(*args: Any, **kwargs: Any) -> Any:
+            REGISTRY.inc('cache_misses_total', loader=loader)
+            return func(*args, **kwargs)
+
+        cached = cache_decorator(on_miss)
+
+        @functools.wraps(func)
+        def call(*args: Any, **kwargs: Any) -> Any:
+            REGISTRY.inc('cache_calls_total', loader=loader)
+            return cached(*args, **kwargs)
+
+        call.clear = cached.clear
+        return call
+
+    return decorator
+
+
+def endpoint_summary() -> list[dict[str, Any]]:
+    requests_total = REGISTRY.counter('http_requests_total')
+    errors_total = REGISTRY.counter('http_errors_total')
+    bytes_total = REGISTRY.counter('http_bytes_total')
+    latencies = REGISTRY.histogram('http_request_seconds')
+    rows = []
+    for key, count in sorted(requests_total.items()):
+        histogram = latencies.get(key)
+        rows.append(
+            {
+                'endpoint': dict(key).get('endpoint', ''),
+                'requests': int(count),
+                'errors': int(errors_total.get(key, 0)),
+                'avg_ms': round(histogram.total / histogram.count * 1000, 1) if histogram and histogram.count else 0.0,
+                'p95_le_s': histogram.quantile(0.95) if histogram else 0.0,
+                'kb': round(bytes_total.get(key, 0) / 1024, 1),
+            }
+        )
+    return rows
+
+
+def cache_summary() -> list[dict[str, Any]]:
+    calls = REGISTRY.counter('cache_calls_total')
+    misses = REGISTRY.counter('cache_misses_total')
+    rows = []
+    for key, count in sorted(calls.items()):
+        missed = misses.get(key, 0)
+        rows.append(
+            {
+                'loader': dict(key).get('loader', ''),
+                'calls': int(count),
+                'misses': int(missed),
+                'hit_ratio': round(1 - missed / count, 3) if count else 0.0,
+            }
+        )
+    return rows
+
+
+def parse_summary() -> list[dict[str, Any]]:
+    rows = []
+    for key, histogram in sorted(REGISTRY.histogram('parse_seconds').items()):
+        rows.append(
+            {
+                'parser': dict(key).get('parser', ''),
+                'count': histogram.count,
+                'avg_ms': round(histogram.total / histogram.count * 1000, 2) if histogram.count else 0.0,
+                'p95_le_s': histogram.quantile(0.95),
+            }
+        )
+    return rows
+
+
+def write_prometheus_file(path: str | Path) -> None:
+    path = Path(path)
+    tmp_path = path.with_suffix(path.suffix + '.tmp')
+    tmp_path.write_text(REGISTRY.render_prometheus(), encoding='utf-8')
+    os.replace(tmp_path, path)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = REGISTRY.render_prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+def start_exporters(port: int | None = None, textfile: str | None = None) -> list[str]:
+    """
+    Start the optional exporters configured by BLUEKEY_METRICS_PORT / BLUEKEY_METRICS_FILE.
+    Returns a short description of each exporter that was started, or why it was skipped
+    (e.g. a second dashboard replica finding the metrics port already taken).
+    """
+    port = port if port is not None else int(os.getenv('BLUEKEY_METRICS_PORT', '0') or 0)
+    textfile = textfile if textfile is not None else os.getenv('BLUEKEY_METRICS_FILE', '').strip()
+    started = []
+
+    if port:
+        try:
+            server = ThreadingHTTPServer(('127.0.0.1', port), _MetricsHandler)
+        except OSError as exc:
+            record_error('metrics.http')
+            started.append(f'HTTP exporter skipped, port {port} unavailable: {exc.strerror or exc}')
+        else:
+            threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+            started.append(f'http://127.0.0.1:{port}/metrics')
+
+    if textfile:
+        def export_loop() -> None:
+            while True:
+                try:
+                    write_prometheus_file(textfile)
+                except OSError:
+                    record_error('metrics.textfile')
+                time.sleep(EXPORT_INTERVAL_SECONDS)
+
+        threading.Thread(target=export_loop, name='metrics-textfile', daemon=True).start()
+        started.append(textfile)
+
+    return started
@@ -0,0 +1,118 @@
+"""
+Columnar parser for Naver's stock list pages (sise_market_sum, sise_quant).
+
+Both pages render one `table.type_2` with a row per stock, but their columns differ
+(market-sum: cap and listed shares, no trading value; quant: trading value and cap).
+Columns are located from the table header, so either layout -- or a market-sum page with
+a customised field set -- parses into the same typed arrays without building a soup.
+"""
+
+import html
+import re
+from dataclasses import dataclass
+
+import numpy as np
+
+from quotes import QuoteBatch
+
+# Header label -> field. Units: amount in 백만원, market_cap in 억원, shares in 천주 on the page.
+HEADER_FIELDS = {
+    '현재가': 'price',
+    '등락률': 'rate',
+    '거래량': 'volume',
+    '거래대금': 'amount',
+    '시가총액': 'market_cap',
+    '상장주식수': 'shares',
+}
+INT_FIELDS = ('price', 'volume', 'amount', 'market_cap', 'shares')
+
+_TABLE_RE = re.compile(r'<table[^>]*class="type_2"[^>]*>(.*?)</table>', re.S)
+_HEADER_RE = re.compile(r'<th[^>]*>(.*?)</th>', re.S)
+_ROW_RE = re.compile(r'<tr[^>]*>\s*<td class="no">.*?</tr>', re.S)
+_CELL_RE = re.compile(r'<td[^>]*>(.*?)</td>', re.S)
+_LINK_RE = re.compile(r'code=(\w+)[^>]*>([^<]*)</a>')
+_TAG_RE = re.compile(r'<[^>]+>')
+_LAST_PAGE_RE = re.compile(r'class="pgRR">\s*<a href="[^"]*page=(\d+)')
+
+
+@dataclass(frozen=True)
+class ListPage:
+    code: np.ndarray
+    name: np.ndarray
+    price: np.ndarray
+    rate: np.ndarray
+    volume: np.ndarray
+    amount: np.ndarray
+    market_cap: np.ndarray
+    shares: np.ndarray
+    last_page: int = 1
+
+    def __len__(self) -> int:
+        return len(self.code)
+
+    def batch(self) -> QuoteBatch:
+        """The page's quotes as a QuoteBatch (shares and paging are list-page only)."""
+        return QuoteBatch(self.code, self.name, self.price, self.rate, self.volume, self.amount, self.market_cap)
+
+
+def _number(cell: str) -> str:
+    return _TAG_RE.sub('', cell).strip().replace(',', '').replace('%', '')
+
+
+def _to_int(text: str) -> int:
+    if text.isdigit():
+        return int(text)
+    try:
+        return int(float(text))
+    except ValueError:
+        return 0
+
+
+def _to_float(text: str) -> float:
+    try:
+        return float(text)
+    except ValueError:
+        return 0.0
+
+
+def parse_list_page(page_html: str) -> ListPage:
+    """Parse a sise_market_sum or sise_quant page into column arrays."""
+    match = _TABLE_RE.search(page_html)
+    table = match.group(1) if match else ''
+    positions = {}
+    for index, label in enumerate(_HEADER_RE.findall(table)):
+        field = HEADER_FIELDS.get(_TAG_RE.sub('', label).strip())
+        if field:
+            positions.setdefault(field, index)
+
+    codes, names = [], []
+    values: dict[str, list] = {field: [] for field in positions}
+    for row in _ROW_RE.findall(table):
+        cells = _CELL_RE.findall(row)
+        link = _LINK_RE.search(cells[1]) if len(cells) > 1 else None
+        if not link or len(cells) <= max(positions.values(), default=0):
+            continue
+        codes.append(link.group(1))
+        names.append(html.unescape(link.group(2)).strip())
+        for field, index in positions.items():
+            text = _number(cells[index])
+            values[field].append(_to_float(text) if field == 'rate' else _to_int(text))
+
+    size = len(codes)
+    columns = {
+        field: np.array(values[field], dtype=np.float64 if field == 'rate' else np.int64)
+        if field in values else np.zeros(size, dtype=np.float64 if field == 'rate' else np.int64)
+        for field in ('rate',) + INT_FIELDS
+    }
+    if 'amount' not in values:
+        # Market-sum pages have no trading value; approximate it in 백만원.
+        columns['amount'] = columns['price'] * columns['volume'] // 1_000_000
+    columns['shares'] = columns['shares'] * 1000
+
+    last = _LAST_PAGE_RE.search(page_html)
+    return ListPage(
+        code=np.array(codes, dtype=str),
+        name=np.array(names, dtype=object),
+        last_page=int(last.group(1)) if last else 1,
+        **columns,
+    )
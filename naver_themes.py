@@ -0,0 +1,204 @@
+"""
+Naver theme catalog (theme number -> name and member codes) and bulk member quotes.
+
+Naver's theme group page (sise_group_detail) quotes every member of a theme in one
+response. The catalog is crawled from the theme list pages plus one group page per theme
+at most once per day, in a background thread, and persisted to naver_themes.json.
+`get_group_quotes` then covers a set of codes with a few concurrent group-page fetches
+instead of one item page per code. All of these go through the process-wide crawl
+scheduler, so they share its per-host limit with the market sweep.
+
+    python naver_themes.py            # refresh now
+"""
+
+import argparse
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Iterable
+
+from crawl import CrawlScheduler, get_crawler
+from metrics import parse_timer, record_error
+from quotes import Quote
+
+KST = timezone(timedelta(hours=9))
+CATALOG_FILENAME = 'naver_themes.json'
+REFRESH_RETRY_SECONDS = 600.0
+# A group page that would cover a single requested code is no cheaper than its item page.
+MIN_CODES_PER_GROUP = 2
+_THEME_LINK_RE = re.compile(r'sise_group_detail\.naver\?type=theme&(?:amp;)?no=(\d+)"[^>]*>([^<]+)</a>')
+_LAST_PAGE_RE = re.compile(r'class="pgRR">\s*<a href="[^"]*page=(\d+)')
+
+_catalog: dict[str, dict[str, Any]] = {}
+_code_themes: dict[str, list[str]] = {}
+_catalog_date = ''
+_loaded = False
+_refresh_thread: threading.Thread | None = None
+_last_attempt = 0.0
+_lock = threading.Lock()
+
+
+def _catalog_path() -> Path:
+    configured = os.getenv('BLUEKEY_NAVER_THEMES_FILE', '').strip()
+    return Path(configured) if configured else Path(__file__).resolve().parent / CATALOG_FILENAME
+
+
+def _today() -> str:
+    return datetime.now(KST).strftime('%Y%m%d')
+
+
+def group_quotes_enabled() -> bool:
+    return os.getenv('BLUEKEY_NAVER_GROUP_QUOTES', '1').strip().lower() not in ('0', 'false', 'no', 'off')
+
+
+def _parse_theme_list_page(html: str) -> tuple[dict[str, str], int]:
+    """Return ({theme no: name}, last page number) for one sise/theme.naver page."""
+    themes = {no: name.strip() for no, name in _THEME_LINK_RE.findall(html)}
+    match = _LAST_PAGE_RE.search(html)
+    return themes, int(match.group(1)) if match else 1
+
+
+def _fetch_theme_list_page(crawler: CrawlScheduler, page: int) -> tuple[dict[str, str], int]:
+    from scraper import DEFAULT_HEADERS, naver_url
+
+    response = crawler.get(naver_url(f'/sise/theme.naver?page={page}'), endpoint='naver.theme_list', headers=DEFAULT_HEADERS, timeout=10)
+    response.raise_for_status()
+    with parse_timer('naver.theme_list'):
+        return _parse_theme_list_page(response.content.decode('euc-kr', 'replace'))
+
+
+def crawl_catalog(crawler: CrawlScheduler | None = None) -> dict[str, dict[str, Any]]:
+    """Crawl every Naver theme: {theme no: {'name', 'codes'}}."""
+    from scraper import get_theme_details
+
+    crawler = crawler or get_crawler()
+    pages = crawler.paged(
+        lambda page: _fetch_theme_list_page(crawler, page),
+        last_page=lambda page: page[1],
+        has_rows=lambda page: bool(page[0]),
+    )
+    names = {no: name for page_names, _ in pages for no, name in page_names.items()}
+    members = crawler.map(lambda no: get_theme_details(no, crawler), names)
+    return {
+        no: {'name': names[no], 'codes': [stock.code for stock in stocks]}
+        for no, stocks in zip(names, members)
+        if stocks
+    }
+
+
+def _index(catalog: dict[str, dict[str, Any]]) -> dict[str, list[str]]:
+    code_themes: dict[str, list[str]] = {}
+    for no, theme in catalog.items():
+        for code in theme['codes']:
+            code_themes.setdefault(code, []).append(no)
+    return code_themes
+
+
+def refresh_catalog() -> dict[str, dict[str, Any]]:
+    global _catalog, _code_themes, _catalog_date
+    catalog = crawl_catalog()
+    if not catalog:
+        raise RuntimeError('Naver theme pages returned no themes.')
+    today = _today()
+    path = _catalog_path()
+    tmp_path = path.with_name(path.name + '.tmp')
+    tmp_path.write_text(json.dumps({'date': today, 'themes': catalog}, ensure_ascii=False), encoding='utf-8')
+    os.replace(tmp_path, path)
+    code_themes = _index(catalog)
+    with _lock:
+        _catalog, _code_themes, _catalog_date = catalog, code_themes, today
+    return catalog
+
+
+def _load() -> None:
+    global _catalog, _code_themes, _catalog_date, _loaded
+    try:
+        payload = json.loads(_catalog_path().read_text(encoding='utf-8'))
+        _catalog = {
+            str(no): {'name': str(theme.get('name', '')), 'codes': [str(code) for code in theme.get('codes', [])]}
+            for no, theme in payload.get('themes', {}).items()
+        }
+        _code_themes = _index(_catalog)
+        _catalog_date = str(payload.get('date', ''))
+    except (OSError, ValueError, AttributeError):
+        pass
+    _loaded = True
+
+
+def _refresh_in_background() -> None:
+    global _refresh_thread, _last_attempt
+
+    def refresh() -> None:
+        try:
+            refresh_catalog()
+        except Exception:
+            record_error('naver_themes.refresh')
+
+    if _refresh_thread is not None and _refresh_thread.is_alive():
+        return
+    if time.monotonic() - _last_attempt < REFRESH_RETRY_SECONDS and _last_attempt:
+        return
+    _last_attempt = time.monotonic()
+    _refresh_thread = threading.Thread(target=refresh, name='naver-themes-refresh', daemon=True)
+    _refresh_thread.start()
+
+
+def get_catalog() -> tuple[dict[str, dict[str, Any]], dict[str, list[str]]]:
+    """Current (catalog, {code: [theme no]}); a stale or missing catalog is refreshed in the background."""
+    with _lock:
+        if not _loaded:
+            _load()
+        if _catalog_date != _today():
+            _refresh_in_background()
+        return _catalog, _code_themes
+
+
+def plan_groups(codes: Iterable[str]) -> list[str]:
+    """Greedy cover of `codes` by Naver themes; only groups covering several wanted codes are used."""
+    catalog, code_themes = get_catalog()
+    remaining = set(codes)
+    candidates = {no for code in remaining for no in code_themes.get(code, ())}
+    groups = []
+    while candidates:
+        best = max(candidates, key=lambda no: (len(remaining.intersection(catalog[no]['codes'])), no))
+        covered = remaining.intersection(catalog[best]['codes'])
+        if len(covered) < MIN_CODES_PER_GROUP:
+            break
+        groups.append(best)
+        remaining -= covered
+        candidates.discard(best)
+    return groups
+
+
+def get_group_quotes(codes: Iterable[str], crawler: CrawlScheduler | None = None) -> dict[str, Quote]:
+    """
+    Quotes for as many of `codes` as the catalog's theme groups cover, fetched concurrently.
+    Codes no selected group covers are absent from the result.
+    """
+    from scraper import get_theme_details
+
+    wanted = set(codes)
+    groups = plan_groups(wanted) if group_quotes_enabled() else []
+    quotes: dict[str, Quote] = {}
+    if not groups:
+        return quotes
+    crawler = crawler or get_crawler()
+    for stocks in crawler.map(lambda no: get_theme_details(no, crawler), groups):
+        for stock in stocks:
+            if stock.code in wanted:
+                quotes.setdefault(stock.code, stock)
+    return quotes
+
+
+def main() -> None:
+    argparse.ArgumentParser(description='Refresh the Naver theme catalog.').parse_args()
+    catalog = refresh_catalog()
+    print(f'Saved {len(catalog)} Naver themes to {_catalog_path()}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""
+Fixed-size intraday ring buffer of quotes per code.
+
+Every quote the dashboard already receives is appended to its code's ring (one row of
+preallocated NumPy arrays), so memory is bounded by codes x slots however long the
+session runs. Momentum columns -- 1m/5m rate change, trading-value acceleration and
+new-high flags -- are computed from the rings for many codes at once.
+"""
+
+import threading
+from typing import Iterable, Mapping
+
+import numpy as np
+import pandas as pd
+
+RING_SLOTS = 96
+# Samples closer together than this replace the newest slot instead of taking a new one,
+# so re-observing an unchanged list every render cannot flush the window.
+MIN_SAMPLE_SECONDS = 5.0
+RATE_WINDOWS = {'rate_1m': 60.0, 'rate_5m': 300.0}
+ACCEL_RECENT_SECONDS = 60.0
+ACCEL_BASE_SECONDS = 300.0
+MOMENTUM_FIELDS = ['rate_1m', 'rate_5m', 'amount_accel', 'new_high']
+_FIELDS = ('ts', 'price', 'rate', 'amount')
+
+
+class QuoteHistory:
+    def __init__(self, slots: int = RING_SLOTS, min_spacing: float = MIN_SAMPLE_SECONDS, capacity: int = 256) -> None:
+        self.slots = slots
+        self.min_spacing = min_spacing
+        self._rows: dict[str, int] = {}
+        self._columns = {field: np.full((capacity, slots), np.nan) for field in _FIELDS}
+        self._head = np.zeros(capacity, dtype=np.int64)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _row(self, code: str) -> int:
+        row = self._rows.get(code)
+        if row is None:
+            row = self._rows[code] = len(self._rows)
+            capacity = len(self._head)
+            if row >= capacity:
+                for field, column in self._columns.items():
+                    grown = np.full((capacity * 2, self.slots), np.nan)
+                    grown[:capacity] = column
+                    self._columns[field] = grown
+                self._head = np.concatenate([self._head, np.zeros(capacity, dtype=np.int64)])
+        return row
+
+    def record(self, quotes: Mapping[str, Mapping], now: float) -> None:
+        """Append one sample per code at time `now` (epoch seconds)."""
+        codes = [code for code in quotes if code]
+        if not codes:
+            return
+        with self._lock:
+            rows = np.array([self._row(code) for code in codes], dtype=np.int64)
+            ts = self._columns['ts']
+            newest = (self._head[rows] - 1) % self.slots
+            newest_ts = np.nan_to_num(ts[rows, newest], nan=-np.inf)
+            # A sample older than the ring's newest (e.g. a late seed) would break time order.
+            in_order = newest_ts <= now
+            codes = [code for code, keep in zip(codes, in_order.tolist()) if keep]
+            rows, newest, newest_ts = rows[in_order], newest[in_order], newest_ts[in_order]
+            # Keep the ring in time order: only a sample newer than min_spacing takes a new slot.
+            replace = newest_ts > now - self.min_spacing
+            slot = np.where(replace, newest, self._head[rows] % self.slots)
+            ts[rows, slot] = now
+            for field in ('price', 'rate', 'amount'):
+                self._columns[field][rows, slot] = [float(quotes[code].get(field, 0) or 0) for code in codes]
+            self._head[rows] = np.where(replace, self._head[rows], self._head[rows] + 1)
+
+    def momentum(self, codes: Iterable[str]) -> pd.DataFrame:
+        """
+        Momentum per code, relative to the code's newest sample:
+        rate_1m / rate_5m: rate change (%p) since the sample 1 / 5 minutes earlier;
+        amount_accel: trading value per minute over the last minute divided by that of the
+        four minutes before (>1 is accelerating); new_high: the newest price is above every
+        earlier buffered price. Values without enough history are NaN / False.
+        """
+        codes = list(dict.fromkeys(codes))
+        with self._lock:
+            known = [code for code in codes if code in self._rows]
+            rows = np.array([self._rows[code] for code in known], dtype=np.int64)
+            ts, price, rate, amount = (self._columns[field][rows].copy() for field in _FIELDS)
+            newest = (self._head[rows] - 1) % self.slots
+
+        if not known:
+            frame = pd.DataFrame(index=pd.Index(codes, name='code'), columns=MOMENTUM_FIELDS, dtype=float)
+            frame['new_high'] = False
+            return frame
+        at = np.arange(len(known))
+        now = ts[at, newest]
+
+        def sample_before(seconds: float) -> tuple[np.ndarray, np.ndarray]:
+            # Newest sample at least `seconds` old, but not more than twice that.
+            cutoff = (now - seconds)[:, None]
+            inside = (ts <= cutoff) & (ts >= cutoff - seconds)
+            return np.where(inside, ts, -np.inf).argmax(axis=1), inside.any(axis=1)
+
+        columns: dict[str, np.ndarray] = {}
+        for field, seconds in RATE_WINDOWS.items():
+            slot, found = sample_before(seconds)
+            columns[field] = np.where(found, rate[at, newest] - rate[at, slot], np.nan)
+
+        recent_slot, recent_found = sample_before(ACCEL_RECENT_SECONDS)
+        base_slot, base_found = sample_before(ACCEL_BASE_SECONDS)
+        recent = (amount[at, newest] - amount[at, recent_slot]) / np.maximum(now - ts[at, recent_slot], 1e-9)
+        base = (amount[at, recent_slot] - amount[at, base_slot]) / np.maximum(ts[at, recent_slot] - ts[at, base_slot], 1e-9)
+        valid = recent_found & base_found & (base_slot != recent_slot) & (recent >= 0) & (base > 0)
+        columns['amount_accel'] = np.where(valid, recent / np.where(base > 0, base, 1.0), np.nan)
+
+        earlier = price.copy()
+        earlier[at, newest] = np.nan
+        earlier_high = np.where(np.isnan(earlier), -np.inf, earlier).max(axis=1)
+        columns['new_high'] = (price[at, newest] > earlier_high) & np.isfinite(earlier_high)
+
+        frame = pd.DataFrame(columns, index=pd.Index(known, name='code'), columns=MOMENTUM_FIELDS)
+        frame = frame.reindex(pd.Index(codes, name='code'))
+        frame['new_high'] = frame['new_high'].fillna(False).astype(bool)
+        return frame
@@ -0,0 +1,183 @@
+import heapq
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Iterable, Mapping
+
+import pandas as pd
+
+from quote_history import QuoteHistory
+from quotes import Quote
+
+HOT = 'hot'
+WARM = 'warm'
+COLD = 'cold'
+DEFAULT_TIER_INTERVALS = {
+    HOT: 5.0,
+    WARM: 20.0,
+    COLD: 60.0,
+}
+DEFAULT_HOT_COUNT = 40
+HOT_RATE = 10.0
+WARM_RATE = 4.0
+BUDGET_WINDOW_SECONDS = 60.0
+# A code shown by any session stays visible this long, so sessions sharing the scheduler
+# (and refreshing at up to 60s) never demote each other's rows.
+VISIBLE_SECONDS = 90.0
+# Per-process upstream request budget for member quotes: one request per code, or one
+# per page of a Naver market sweep (see QuoteScheduler.charge).
+REQUEST_BUDGETS = {
+    'naver': 300,
+    'kiwoom': 120,
+}
+
+
+@dataclass
+class _CodeState:
+    quote: Quote | None = None
+    amount: int = 0
+    rate: float = 0.0
+    visible_until: float = 0.0
+    refreshed_at: float = 0.0
+
+
+class QuoteScheduler:
+    """
+    Decides which codes of a quote working set are due for a refresh.
+
+    Codes are tiered by trading value, rate change and whether any UI session showed
+    them within the last VISIBLE_SECONDS. Hot codes refresh every few seconds, cold ones every minute,
+    and the number of upstream requests stays under a per-minute budget. Every observed
+    quote is also kept in a bounded per-code history for momentum columns.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: int,
+        tier_intervals: Mapping[str, float] | None = None,
+        hot_count: int = DEFAULT_HOT_COUNT,
+    ) -> None:
+        self.requests_per_minute = max(1, int(requests_per_minute))
+        self.tier_intervals = dict(tier_intervals or DEFAULT_TIER_INTERVALS)
+        self.hot_count = hot_count
+        self._states: dict[str, _CodeState] = {}
+        self._sent: deque[float] = deque()
+        self._lock = threading.Lock()
+        self.history = QuoteHistory()
+
+    def _state(self, code: str) -> _CodeState:
+        state = self._states.get(code)
+        if state is None:
+            state = self._states[code] = _CodeState()
+        return state
+
+    def observe(self, quotes: Mapping[str, Mapping[str, Any]], now: float | None = None) -> None:
+        """Record quotes that arrived for free (e.g. from list pages) as fresh."""
+        now = time.time() if now is None else now
+        observed: dict[str, Quote] = {}
+        with self._lock:
+            for code, quote in quotes.items():
+                if not code:
+                    continue
+                state = self._state(code)
+                state.quote = observed[code] = Quote.from_mapping(quote)
+                state.amount = state.quote.amount
+                state.rate = state.quote.rate
+                state.refreshed_at = now
+        self.history.record(observed, now)
+
+    def mark_visible(self, codes: Iterable[str], now: float | None = None) -> None:
+        """Mark codes one session just rendered; other sessions' visible codes are kept until they expire."""
+        visible_until = (time.time() if now is None else now) + VISIBLE_SECONDS
+        with self._lock:
+            for code in codes:
+                if code:
+                    state = self._state(code)
+                    state.visible_until = max(state.visible_until, visible_until)
+
+    def _hot_amount(self) -> int:
+        top = heapq.nlargest(self.hot_count, (state.amount for state in self._states.values()))
+        return top[-1] if top else 0
+
+    def _tier(self, state: _CodeState, hot_amount: int, now: float) -> str:
+        visible = state.visible_until > now
+        if visible and ((hot_amount and state.amount >= hot_amount) or abs(state.rate) >= HOT_RATE):
+            return HOT
+        if visible or abs(state.rate) >= WARM_RATE:
+            return WARM
+        return COLD
+
+    def tier_of(self, code: str, now: float | None = None) -> str:
+        now = time.time() if now is None else now
+        with self._lock:
+            state = self._states.get(code)
+            if state is None:
+                return COLD
+            return self._tier(state, self._hot_amount(), now)
+
+    def _remaining_budget(self, now: float) -> int:
+        while self._sent and now - self._sent[0] >= BUDGET_WINDOW_SECONDS:
+            self._sent.popleft()
+        return max(0, self.requests_per_minute - len(self._sent))
+
+    def due_codes(self, codes: Iterable[str], now: float | None = None) -> list[str]:
+        """
+        Return the codes that should be fetched now, most overdue first.
+        The returned codes are charged against the request budget immediately and
+        are not offered again until their tier interval elapses, even if the fetch fails.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            hot_amount = self._hot_amount()
+            candidates: list[tuple[float, str]] = []
+            for code in dict.fromkeys(code for code in codes if code):
+                state = self._states.get(code)
+                if state is None:
+                    candidates.append((float('inf'), code))
+                    continue
+                interval = self.tier_intervals[self._tier(state, hot_amount, now)]
+                overdue = (now - state.refreshed_at) / interval
+                if overdue >= 1.0:
+                    candidates.append((overdue, code))
+
+            candidates.sort(key=lambda item: item[0], reverse=True)
+            due = [code for _, code in candidates[: self._remaining_budget(now)]]
+            for code in due:
+                self._state(code).refreshed_at = now
+            self._sent.extend([now] * len(due))
+            return due
+
+    def charge(self, requests: int, now: float | None = None) -> bool:
+        """
+        Charge `requests` made outside due_codes (e.g. the pages of a market sweep) if the
+        budget covers them. A cost above the whole budget is allowed once the window is empty.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            if requests > self._remaining_budget(now) and self._sent:
+                return False
+            self._sent.extend([now] * requests)
+            return True
+
+    def latest(self, codes: Iterable[str]) -> dict[str, Quote]:
+        with self._lock:
+            return {
+                code: state.quote
+                for code in codes
+                if (state := self._states.get(code)) is not None and state.quote is not None
+            }
+
+    def momentum(self, codes: Iterable[str]) -> pd.DataFrame:
+        """1m/5m rate change, trading-value acceleration and new-high flag per code (see QuoteHistory)."""
+        return self.history.momentum(codes)
+
+    def stats(self, now: float | None = None) -> dict[str, int]:
+        now = time.time() if now is None else now
+        with self._lock:
+            hot_amount = self._hot_amount()
+            counts = {HOT: 0, WARM: 0, COLD: 0}
+            for state in self._states.values():
+                counts[self._tier(state, hot_amount, now)] += 1
+            counts['budget_left'] = self._remaining_budget(now)
+            return counts
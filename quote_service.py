@@ -0,0 +1,237 @@
+"""
+Local quote API that owns all upstream fetching for any number of dashboards.
+
+Every dashboard process (and every session inside one) that points BLUEKEY_QUOTE_API_URL at
+this service reads cached JSON from it instead of scraping Naver/Kiwoom itself, so upstream
+load stays constant no matter how many dashboards or replicas are open.
+
+    python quote_service.py --port 8787
+    BLUEKEY_QUOTE_API_URL=http://127.0.0.1:8787 streamlit run app.py
+
+Endpoints (all GET, JSON):
+    /health
+    /indices
+    /top?source=naver|kiwoom&limit=30&sort_by=amount|volume
+    /quotes?source=naver|kiwoom&codes=005930,000660   (at most 500 codes, else 413)
+    /themes/{name}?source=naver|kiwoom
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import http_client
+from kiwoom_provider import KiwoomConfigurationError, KiwoomRequestError
+from kiwoom_provider import get_stock_snapshots as get_kiwoom_snapshots
+from kiwoom_provider import get_top_stocks as get_kiwoom_top_stocks
+from quote_scheduler import REQUEST_BUDGETS, QuoteScheduler
+from quotes import Quote
+from scraper import get_market_indices, get_stock_snapshots, get_top_stocks, refresh_from_sweep
+from hedging import hedged_call
+from snapshot_recorder import record_batch
+from themes import get_theme_members
+from warmup import warm_up
+
+DEFAULT_PORT = 8787
+DEFAULT_TTL_SECONDS = 20.0
+MAX_CODES_PER_REQUEST = 500
+CLIENT_TIMEOUT_SECONDS = 30
+# Errors a hedged Kiwoom call can end with; the service then answers from Naver instead of a 502.
+HEDGE_FALLBACK_ERRORS = (KiwoomConfigurationError, KiwoomRequestError, TimeoutError)
+
+
+class QuoteServiceError(RuntimeError):
+    pass
+
+
+class _TTLCache:
+    """Per-key TTL cache; concurrent misses on one key wait for a single fetch."""
+
+    def __init__(self, ttl: float) -> None:
+        self.ttl = ttl
+        self._values: dict[Any, tuple[float, Any]] = {}
+        self._key_locks: dict[Any, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Any, loader: Callable[[], Any]) -> Any:
+        entry = self._values.get(key)
+        if entry and time.monotonic() - entry[0] < self.ttl:
+            return entry[1]
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            entry = self._values.get(key)
+            if entry and time.monotonic() - entry[0] < self.ttl:
+                return entry[1]
+            value = loader()
+            self._values[key] = (time.monotonic(), value)
+            return value
+
+
+class QuoteService:
+    def __init__(self, ttl: float = DEFAULT_TTL_SECONDS) -> None:
+        self._cache = _TTLCache(ttl)
+        self._schedulers = {source: QuoteScheduler(requests_per_minute=budget) for source, budget in REQUEST_BUDGETS.items()}
+
+    def indices(self) -> dict[str, Any]:
+        return {'indices': self._cache.get('indices', get_market_indices)}
+
+    def top(self, source: str, limit: int, sort_by: str) -> dict[str, Any]:
+        return self._cache.get(('top', source, limit, sort_by), lambda: self._fetch_top(source, limit, sort_by))
+
+    def _fetch_top(self, source: str, limit: int, sort_by: str) -> dict[str, Any]:
+        payload = self._fetch_top_from_upstream(source, limit, sort_by)
+        record_batch(payload['stocks'], payload['source'])
+        return payload
+
+    def _fetch_top_from_upstream(self, source: str, limit: int, sort_by: str) -> dict[str, Any]:
+        if source == 'kiwoom':
+            try:
+                stocks, used, primary_error = hedged_call(
+                    ('kiwoom', lambda: get_kiwoom_top_stocks(limit=limit, sort_by=sort_by)),
+                    ('naver', lambda: get_top_stocks(limit=limit, sort_by=sort_by)),
+                )
+            except HEDGE_FALLBACK_ERRORS as exc:
+                # Kiwoom failed and Naver's answer was empty too (or neither answered in time).
+                stocks, used, primary_error = get_top_stocks(limit=limit, sort_by=sort_by), 'naver', exc
+            warning = f'Kiwoom top list slow or unavailable. Served from Naver. {primary_error or ""}'.strip() if used != source else None
+            return {'source': used, 'warning': warning, 'stocks': stocks}
+        return {'source': 'naver', 'warning': None, 'stocks': get_top_stocks(limit=limit, sort_by=sort_by)}
+
+    def quotes(self, source: str, codes: list[str]) -> dict[str, Any]:
+        scheduler = self._schedulers[source]
+        warning = None
+        # On Naver, codes the market sweep covers are quoted from it, charged per sweep page.
+        due_codes = scheduler.due_codes(refresh_from_sweep(scheduler, codes) if source == 'naver' else codes)
+        if due_codes:
+            snapshots, warning = self._fetch_snapshots(source, due_codes)
+            record_batch(snapshots.values(), 'naver' if warning else source)
+            scheduler.observe(snapshots)
+        return {'source': source, 'warning': warning, 'quotes': scheduler.latest(codes)}
+
+    def _fetch_snapshots(self, source: str, codes: list[str]) -> tuple[dict[str, Any], str | None]:
+        if source == 'kiwoom':
+            try:
+                snapshots, used, primary_error = hedged_call(
+                    ('kiwoom', lambda: get_kiwoom_snapshots(codes)),
+                    ('naver', lambda: get_stock_snapshots(codes)),
+                )
+            except HEDGE_FALLBACK_ERRORS as exc:
+                snapshots, used, primary_error = get_stock_snapshots(codes), 'naver', exc
+            if used != source:
+                return snapshots, f'Kiwoom snapshot request slow or unavailable. Served from Naver. {primary_error or ""}'.strip()
+            return snapshots, None
+        return get_stock_snapshots(codes), None
+
+    def theme(self, name: str, source: str) -> dict[str, Any]:
+        members = get_theme_members(name)
+        payload = self.quotes(source, [member['code'] for member in members if member.get('code')])
+        quotes = payload['quotes']
+        rows = [{**member, **quotes.get(member.get('code', ''), {})} for member in members]
+        return {'theme': name, 'source': source, 'warning': payload['warning'], 'members': rows}
+
+
+def _make_handler(service: QuoteService) -> type[BaseHTTPRequestHandler]:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def _send_json(self, status: int, payload: Any) -> None:
+            body = json.dumps(payload, ensure_ascii=False, default=Quote.to_dict).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self) -> None:
+            parts = urlsplit(self.path)
+            query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+            source = query.get('source', 'naver')
+            if source not in REQUEST_BUDGETS:
+                source = 'naver'
+            try:
+                if parts.path == '/health':
+                    self._send_json(200, {'ok': True})
+                elif parts.path == '/indices':
+                    self._send_json(200, service.indices())
+                elif parts.path == '/top':
+                    limit = max(1, min(200, int(query.get('limit', 30))))
+                    self._send_json(200, service.top(source, limit, query.get('sort_by', 'amount')))
+                elif parts.path == '/quotes':
+                    codes = [code for code in dict.fromkeys(query.get('codes', '').split(',')) if code]
+                    if len(codes) > MAX_CODES_PER_REQUEST:
+                        self._send_json(413, {'error': f'{len(codes)} codes requested; at most {MAX_CODES_PER_REQUEST} per request'})
+                    else:
+                        self._send_json(200, service.quotes(source, codes))
+                elif parts.path.startswith('/themes/'):
+                    self._send_json(200, service.theme(unquote(parts.path[len('/themes/'):]), source))
+                else:
+                    self._send_json(404, {'error': f'unknown path: {parts.path}'})
+            except Exception as exc:
+                self._send_json(502, {'error': str(exc)})
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+    return Handler
+
+
+def serve(host: str = '127.0.0.1', port: int = DEFAULT_PORT, ttl: float = DEFAULT_TTL_SECONDS) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), _make_handler(QuoteService(ttl=ttl)))
+    server.daemon_threads = True
+    return server
+
+
+def fetch_remote(base_url: str, path: str, **params: Any) -> dict[str, Any]:
+    """Client side: GET a quote service endpoint and return its JSON payload."""
+    response = http_client.get(
+        f'quote_api.{path.strip("/").split("/")[0]}',
+        base_url.rstrip('/') + path,
+        params={key: value for key, value in params.items() if value is not None},
+        timeout=CLIENT_TIMEOUT_SECONDS,
+    )
+    if response.status_code != 200:
+        raise QuoteServiceError(f'Quote service {path} returned {response.status_code}: {response.text[:200]}')
+    return response.json()
+
+
+def fetch_remote_quotes(base_url: str, source: str, codes: list[str]) -> dict[str, Any]:
+    """Client side: /quotes for any number of codes, split into requests the service accepts."""
+    quotes: dict[str, Any] = {}
+    warnings: list[str] = []
+    for start in range(0, len(codes), MAX_CODES_PER_REQUEST):
+        chunk = codes[start:start + MAX_CODES_PER_REQUEST]
+        payload = fetch_remote(base_url, '/quotes', source=source, codes=','.join(chunk))
+        quotes.update(payload['quotes'])
+        if payload.get('warning') and payload['warning'] not in warnings:
+            warnings.append(payload['warning'])
+    return {'source': source, 'warning': ' '.join(warnings) or None, 'quotes': quotes}
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Serve cached Naver/Kiwoom quotes to local dashboards.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--ttl', type=float, default=DEFAULT_TTL_SECONDS, help='Cache TTL for top list and indices')
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    warm_up()
+    server = serve(args.host, args.port, args.ttl)
+    print(f'Quote service listening on http://{args.host}:{args.port}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,165 @@
+"""
+Typed quote records shared by the Naver and Kiwoom providers.
+
+A `Quote` holds raw numbers only (price in KRW, amount in 백만원, market_cap in 억원);
+display strings are produced by the renderer. `QuoteBatch` keeps many quotes as NumPy
+columns, e.g. the market-wide sweep table, and hands out `Quote`s on lookup.
+"""
+
+from dataclasses import dataclass, replace
+from typing import Any, Iterable, Iterator, Mapping
+
+import numpy as np
+import pandas as pd
+
+QUOTE_FIELDS = ('code', 'name', 'price', 'rate', 'volume', 'amount', 'market_cap', 'rank')
+BATCH_FIELDS = QUOTE_FIELDS[:-1]
+_INT_FIELDS = ('price', 'volume', 'amount', 'market_cap', 'rank')
+
+
+def _int(value: Any) -> int:
+    try:
+        return int(str(value).replace(',', ''))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _float(value: Any) -> float:
+    try:
+        number = float(str(value).replace('%', '').replace(',', '').strip())
+    except (TypeError, ValueError):
+        return 0.0
+    return 0.0 if number != number else number
+
+
+@dataclass(slots=True)
+class Quote:
+    code: str
+    name: str = ''
+    price: int = 0
+    rate: float = 0.0
+    volume: int = 0
+    amount: int = 0
+    market_cap: int = 0
+    rank: int = 0
+
+    @classmethod
+    def from_mapping(cls, values: Mapping[str, Any]) -> 'Quote':
+        """Coerce a quote-like mapping (e.g. a quote service JSON row) into a new Quote."""
+        if isinstance(values, Quote):
+            return replace(values)
+        return cls(
+            code=str(values.get('code') or ''),
+            name=str(values.get('name') or ''),
+            rate=_float(values.get('rate', 0.0)),
+            **{name: _int(values.get(name, 0)) for name in _INT_FIELDS},
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        return {name: getattr(self, name) for name in QUOTE_FIELDS}
+
+    # Mapping-style access, so dict-based consumers (filters, recorders,
+    # `{**member, **quote}`, apply_market_caps) work unchanged.
+    def keys(self) -> tuple[str, ...]:
+        return QUOTE_FIELDS
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(QUOTE_FIELDS)
+
+    def __contains__(self, key: object) -> bool:
+        return key in QUOTE_FIELDS
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in QUOTE_FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key not in QUOTE_FIELDS:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key) if key in QUOTE_FIELDS else default
+
+
+class QuoteBatch:
+    """Many quotes as NumPy columns with an index by code; the first row per code wins."""
+
+    __slots__ = BATCH_FIELDS + ('_index',)
+
+    def __init__(
+        self,
+        code: np.ndarray,
+        name: np.ndarray,
+        price: np.ndarray,
+        rate: np.ndarray,
+        volume: np.ndarray,
+        amount: np.ndarray,
+        market_cap: np.ndarray,
+    ) -> None:
+        self.code = np.asarray(code, dtype=str)
+        self.name = np.asarray(name, dtype=object)
+        self.price = np.asarray(price, dtype=np.int64)
+        self.rate = np.asarray(rate, dtype=np.float64)
+        self.volume = np.asarray(volume, dtype=np.int64)
+        self.amount = np.asarray(amount, dtype=np.int64)
+        self.market_cap = np.asarray(market_cap, dtype=np.int64)
+        self._index: dict[str, int] | None = None
+
+    @classmethod
+    def empty(cls) -> 'QuoteBatch':
+        return cls(*([] for _ in BATCH_FIELDS))
+
+    @classmethod
+    def from_quotes(cls, quotes: Iterable[Mapping[str, Any]]) -> 'QuoteBatch':
+        rows = [Quote.from_mapping(quote) for quote in quotes]
+        return cls(*([getattr(row, name) for row in rows] for name in BATCH_FIELDS))
+
+    @classmethod
+    def concat(cls, batches: Iterable['QuoteBatch']) -> 'QuoteBatch':
+        batches = list(batches)
+        if not batches:
+            return cls.empty()
+        merged = cls(*(np.concatenate([getattr(batch, name) for batch in batches]) for name in BATCH_FIELDS))
+        _, first = np.unique(merged.code, return_index=True)
+        return merged.take(np.sort(first))
+
+    def take(self, rows: np.ndarray) -> 'QuoteBatch':
+        return QuoteBatch(*(getattr(self, name)[rows] for name in BATCH_FIELDS))
+
+    def __len__(self) -> int:
+        return len(self.code)
+
+    def _row_index(self) -> dict[str, int]:
+        if self._index is None:
+            index: dict[str, int] = {}
+            for row, code in enumerate(self.code.tolist()):
+                index.setdefault(code, row)
+            self._index = index
+        return self._index
+
+    def __contains__(self, code: object) -> bool:
+        return code in self._row_index()
+
+    def quote(self, row: int) -> Quote:
+        return Quote(
+            code=str(self.code[row]),
+            name=str(self.name[row]),
+            price=int(self.price[row]),
+            rate=float(self.rate[row]),
+            volume=int(self.volume[row]),
+            amount=int(self.amount[row]),
+            market_cap=int(self.market_cap[row]),
+        )
+
+    def get(self, code: str) -> Quote | None:
+        row = self._row_index().get(code)
+        return None if row is None else self.quote(row)
+
+    def __iter__(self) -> Iterator[Quote]:
+        columns = [getattr(self, name).tolist() for name in BATCH_FIELDS]
+        return (Quote(*values) for values in zip(*columns))
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame({name: getattr(self, name) for name in BATCH_FIELDS})
@@ -19,6 +19,9 @@ from urllib.parse import quote_plus
 import requests
 from bs4 import BeautifulSoup, XMLParsedAsHTMLWarning
 
+from crawl import CrawlScheduler, naver_market_sum_pages, pages_for
+from security_master import get_master
+
 warnings.filterwarnings("ignore", category=XMLParsedAsHTMLWarning)
 
 
@@ -93,56 +96,30 @@ def is_noisy_market_title(title: str) -> bool:
     return any(p in t for p in NOISY_TITLE_PATTERNS)
 
 
-def fetch_naver_top_marketcap_codes(limit: int = 120) -> list[tuple[str, str]]:
+def fetch_naver_top_marketcap_codes(limit: int = 120, crawler: CrawlScheduler | None = None) -> list[tuple[str, str]]:
+    if crawler is None:
+        with CrawlScheduler() as own:
+            return fetch_naver_top_marketcap_codes(limit, own)
+
     rows: list[tuple[str, str]] = []
     seen = set()
     for sosok in (0, 1):  # 0 KOSPI, 1 KOSDAQ
-        for page in range(1, 51):
-            url = f"https://finance.naver.com/sise/sise_market_sum.naver?sosok={sosok}&page={page}"
-            try:
-                res = requests.get(url, headers=HEADERS, timeout=20)
-                res.raise_for_status()
-                soup = BeautifulSoup(res.content.decode("euc-kr", "replace"), "html.parser")
-                table = soup.select_one("table.type_2")
-                if table is None:
-                    break
-                found = 0
-                for a in table.select('a[href*="item/main.naver?code="]'):
-                    href = a.get("href", "")
-                    if "code=" not in href:
-                        continue
-                    code = href.split("code=")[-1].split("&")[0].strip()
-                    name = a.get_text(strip=True)
-                    if not code or not name or code in seen:
-                        continue
-                    seen.add(code)
-                    rows.append((code, name))
-                    found += 1
-                    if len(rows) >= limit:
-                        return rows
-                if found == 0:
-                    break
-            except Exception:
-                break
+        try:
+            # Only as many pages as `limit` rows can take, fetched concurrently.
+            pages = naver_market_sum_pages(crawler, sosok, max_pages=pages_for(limit - len(rows)))
+        except Exception:
+            continue
+        for parsed in pages:
+            for code, name in zip(parsed.code.tolist(), parsed.name.tolist()):
+                if not name or code in seen:
+                    continue
+                seen.add(code)
+                rows.append((code, name))
+                if len(rows) >= limit:
+                    return rows
     return rows
 
 
-def resolve_name_by_code(code: str) -> str:
-    url = f"https://finance.naver.com/item/main.naver?code={code}"
-    try:
-        res = requests.get(url, headers=HEADERS, timeout=20)
-        res.raise_for_status()
-        soup = BeautifulSoup(res.content.decode("utf-8", "replace"), "html.parser")
-        el = soup.select_one(".wrap_company h2 a")
-        if el:
-            name = el.get_text(strip=True)
-            if name:
-                return name
-    except Exception:
-        pass
-    return code
-
-
 def recency_weight(pub_date_text: str, window_days: int) -> float:
     if not pub_date_text:
         return 0.6
@@ -177,10 +154,10 @@ def build_theme_keywords(theme_rules: dict[str, list[str]]) -> dict[str, list[st
     return out
 
 
-def fetch_news_items(query: str, max_items: int) -> list[dict[str, str]]:
+def fetch_news_items(query: str, max_items: int, crawler: CrawlScheduler | None = None) -> list[dict[str, str]]:
     q = quote_plus(query)
     url = f"https://news.google.com/rss/search?q={q}&hl=ko&gl=KR&ceid=KR:ko"
-    res = requests.get(url, headers=HEADERS, timeout=20)
+    res = (crawler.get if crawler else requests.get)(url, headers=HEADERS, timeout=20)
     res.raise_for_status()
     soup = BeautifulSoup(res.text, "html.parser")
     items = []
@@ -193,7 +170,9 @@ def fetch_news_items(query: str, max_items: int) -> list[dict[str, str]]:
     return items
 
 
-def fetch_news_items_for_stock(stock_name: str, max_items: int) -> list[dict[str, str]]:
+def fetch_news_items_for_stock(
+    stock_name: str, max_items: int, crawler: CrawlScheduler | None = None
+) -> list[dict[str, str]]:
     queries = [
         f"{stock_name} 주식 테마",
         f"{stock_name} 사업 확장 AI 로봇",
@@ -202,7 +181,7 @@ def fetch_news_items_for_stock(stock_name: str, max_items: int) -> list[dict[str
     seen_titles = set()
     for q in queries:
         try:
-            items = fetch_news_items(q, max_items=max_items)
+            items = fetch_news_items(q, max_items=max_items, crawler=crawler)
         except Exception:
             continue
         for it in items:
@@ -219,9 +198,10 @@ def score_themes_from_news(
     theme_keywords: dict[str, list[str]],
     window_days: int,
     max_items: int,
+    crawler: CrawlScheduler | None = None,
 ) -> list[dict[str, Any]]:
     try:
-        news = fetch_news_items_for_stock(stock_name=stock_name, max_items=max_items)
+        news = fetch_news_items_for_stock(stock_name=stock_name, max_items=max_items, crawler=crawler)
     except Exception:
         return []
 
@@ -285,28 +265,31 @@ def main() -> None:
 
     theme_keywords = build_theme_keywords(rules)
 
-    if args.codes.strip():
-        code_list = [c.strip() for c in args.codes.split(",") if c.strip()]
-        universe = []
-        name_map = dict(fetch_naver_top_marketcap_codes(limit=2000))
-        for code in code_list:
-            name = name_map.get(code) or resolve_name_by_code(code)
-            universe.append((code, name))
-    else:
-        universe = fetch_naver_top_marketcap_codes(limit=args.top_n)
-
-    signals: dict[str, list[dict[str, Any]]] = {}
-    for idx, (code, name) in enumerate(universe, start=1):
-        trend = score_themes_from_news(
-            stock_name=name,
-            theme_keywords=theme_keywords,
-            window_days=args.window_days,
-            max_items=args.max_items,
+    with CrawlScheduler() as crawler:
+        if args.codes.strip():
+            code_list = [c.strip() for c in args.codes.split(",") if c.strip()]
+            master = get_master(wait=True)
+            universe = [(code, master.name_of(code, default=code)) for code in code_list]
+        else:
+            universe = fetch_naver_top_marketcap_codes(limit=args.top_n, crawler=crawler)
+
+        # One news crawl per stock, run in parallel under the scheduler's per-host limit.
+        trends = crawler.map(
+            lambda stock: score_themes_from_news(
+                stock_name=stock[1],
+                theme_keywords=theme_keywords,
+                window_days=args.window_days,
+                max_items=args.max_items,
+                crawler=crawler,
+            ),
+            universe,
         )
-        if trend:
-            signals[code] = trend
-        if idx % 20 == 0:
-            print(f"Processed {idx}/{len(universe)}")
+        signals: dict[str, list[dict[str, Any]]] = {}
+        for idx, ((code, _), trend) in enumerate(zip(universe, trends), start=1):
+            if trend:
+                signals[code] = trend
+            if idx % 20 == 0:
+                print(f"Processed {idx}/{len(universe)}")
 
     output = {
         "generated_at": datetime.now(timezone.utc).isoformat(),
@@ -1,9 +1,45 @@
-import requests
-from bs4 import BeautifulSoup
 from concurrent.futures import ThreadPoolExecutor, as_completed
+import os
 import re
+import threading
+import time
+
+import http_client
+from crawl import get_crawler, naver_market_sum_pages
+from metrics import parse_timer, record_error
+from naver_list import parse_list_page
+from naver_themes import MIN_CODES_PER_GROUP, get_group_quotes
+from quotes import Quote, QuoteBatch
+from shares_reference import apply_market_caps
+from snapshot_recorder import record_batch
 
 DEFAULT_HEADERS = {'User-Agent': 'Mozilla/5.0'}
+DEFAULT_NAVER_BASE_URL = 'https://finance.naver.com'
+MARKET_SUM_MARKETS = (0, 1)  # KOSPI, KOSDAQ
+# The whole market is ~55 market-sum pages; a sweep younger than this is served as-is.
+SWEEP_TTL_SECONDS = 20.0
+SWEEP_MIN_CODES = 10
+# Budget charged for a sweep before the first one has reported its page count.
+SWEEP_PAGE_ESTIMATE = 55
+
+_sweep = {"quotes": QuoteBatch.empty(), "swept_at": 0.0, "pages": 0}
+_sweep_lock = threading.Lock()
+
+
+def naver_url(path):
+    """
+    Build a Naver Finance URL. NAVER_BASE_URL redirects all Naver traffic
+    (e.g. to a local stand-in server for load testing).
+    """
+    base = (os.getenv('NAVER_BASE_URL', '').strip() or DEFAULT_NAVER_BASE_URL).rstrip('/')
+    return base + path
+
+
+def _soup(markup):
+    # bs4 is only needed for item, index and theme pages; list pages parse without it.
+    from bs4 import BeautifulSoup
+
+    return BeautifulSoup(markup, 'html.parser')
 
 
 def _parse_int(text):
@@ -28,18 +64,6 @@ def _extract_market_cap(text):
     return _parse_int(match.group(1))
 
 
-def _parse_amount_millions(text):
-    text = (text or "").strip().replace(",", "")
-    if not text or text == "-":
-        return 0
-    if text.isdigit():
-        return int(text)
-    try:
-        return int(float(text))
-    except ValueError:
-        return 0
-
-
 def _extract_stock_snapshot(soup, code):
     name_tag = soup.select_one('.wrap_company h2 a')
     price_tag = soup.select_one('.no_today .blind')
@@ -71,16 +95,7 @@ def _extract_stock_snapshot(soup, code):
 
     market_cap = _extract_market_cap(soup.get_text(" ", strip=True))
 
-    return {
-        "name": name,
-        "code": code,
-        "price": price,
-        "current_price": f"{price:,}" if price else "0",
-        "rate": rate,
-        "volume": volume,
-        "amount": amount,
-        "market_cap": market_cap,
-    }
+    return Quote(code=code, name=name, price=price, rate=rate, volume=volume, amount=amount, market_cap=market_cap)
 
 def get_stock_info(code):
     """
@@ -88,43 +103,114 @@ def get_stock_info(code):
     Args:
         code (str): The stock code (e.g., '005930' for Samsung Electronics).
     Returns:
-        dict: A dictionary containing stock details, or None if failed.
+        Quote: The stock's quote, or None if failed.
     """
-    url = f"https://finance.naver.com/item/main.naver?code={code}"
+    url = naver_url(f"/item/main.naver?code={code}")
     try:
-        response = requests.get(url, headers={'User-Agent': 'Mozilla/5.0'})
+        response = http_client.get('naver.item', url, headers={'User-Agent': 'Mozilla/5.0'})
         response.raise_for_status()
-        soup = BeautifulSoup(response.content.decode('utf-8', 'replace'), 'html.parser')
-        snapshot = _extract_stock_snapshot(soup, code)
-        if not snapshot:
-            return None
-        return {
-            "name": snapshot["name"],
-            "code": code,
-            "current_price": snapshot["current_price"],
-            "rate": snapshot["rate"],
-            "volume": f"{snapshot['volume']:,}" if snapshot["volume"] else "0",
-            "amount": snapshot["amount"],
-        }
+        with parse_timer('naver.item'):
+            soup = _soup(response.content.decode('utf-8', 'replace'))
+            return _extract_stock_snapshot(soup, code)
     except Exception as e:
+        record_error('naver.stock_info')
         print(f"Error fetching data for {code}: {e}")
         return None
 
 
+def sweep_market_pages(crawler=None):
+    """
+    Fetch every market-sum page of KOSPI and KOSDAQ through `crawler` (by default the
+    process-wide crawl scheduler, whose per-host gate bounds the load on Naver). Both
+    markets are crawled in parallel and their pages concurrently. Failed pages are
+    skipped, so their codes are simply not covered.
+    """
+    crawler = crawler or get_crawler()
+
+    def sweep_market(sosok):
+        try:
+            return naver_market_sum_pages(crawler, sosok)
+        except Exception as e:
+            record_error('naver.market_sum')
+            print(f"Error sweeping market {sosok}: {e}")
+            return []
+
+    return [page for pages in crawler.map(sweep_market, MARKET_SUM_MARKETS) for page in pages]
+
+
+def _sweep_now():
+    """Quote the whole KOSPI+KOSDAQ universe from the market-sum list pages as one QuoteBatch."""
+    pages = sweep_market_pages()
+    _sweep["quotes"] = QuoteBatch.concat(page.batch() for page in pages)
+    _sweep["pages"] = len(pages)
+    _sweep["swept_at"] = time.monotonic()
+
+
+def _sweep_is_fresh(max_age):
+    return time.monotonic() - _sweep["swept_at"] < max_age
+
+
+def get_market_quotes(max_age=SWEEP_TTL_SECONDS):
+    """Market-wide quote table, re-swept when older than `max_age`; concurrent callers share one sweep."""
+    with _sweep_lock:
+        if not _sweep_is_fresh(max_age):
+            _sweep_now()
+        return _sweep["quotes"]
+
+
+def _sweep_enabled():
+    return os.getenv('BLUEKEY_NAVER_SWEEP', '1').strip().lower() not in ('0', 'false', 'no', 'off')
+
+
+def refresh_from_sweep(scheduler, codes):
+    """
+    Quote `codes` from the market sweep into `scheduler` (a QuoteScheduler) and return the
+    codes the sweep does not cover, which still need per-code requests. A fresh sweep is
+    free; a new one is charged to the scheduler's budget per page and, when the budget
+    cannot cover it, covered codes keep their last quote until it can. The covered quotes
+    are archived once per sweep, not on every call that reads the same table.
+    """
+    codes = {code for code in codes if code}
+    if not codes or not _sweep_enabled():
+        return codes
+    if _sweep_is_fresh(SWEEP_TTL_SECONDS) or scheduler.charge(_sweep["pages"] or SWEEP_PAGE_ESTIMATE):
+        swept_at = _sweep["swept_at"]
+        table = get_market_quotes()
+        swept = {code: table.get(code) for code in codes if code in table}
+        apply_market_caps(swept.values())
+        if _sweep["swept_at"] != swept_at:
+            record_batch(swept.values(), 'naver')
+        scheduler.observe(swept)
+        return codes - swept.keys()
+    table = _sweep["quotes"]
+    return {code for code in codes if code not in table}
+
+
 def get_stock_snapshots(codes):
     """
     Fetch detailed quote data for arbitrary stock codes.
-    Returns: {code: {"name","code","price","rate","amount","volume"}}
+    Codes covered by the market sweep are served from it, then Naver theme group
+    pages quote several remaining codes per request; item pages are fetched only for
+    the rest. Small requests sweep only when a fresh table already exists.
+    Returns: {code: Quote}
     """
     snapshots = {}
     unique_codes = [code for code in dict.fromkeys(codes) if code]
+    if unique_codes and _sweep_enabled() and (len(unique_codes) >= SWEEP_MIN_CODES or _sweep_is_fresh(SWEEP_TTL_SECONDS)):
+        table = get_market_quotes()
+        snapshots = {code: table.get(code) for code in unique_codes if code in table}
+        unique_codes = [code for code in unique_codes if code not in snapshots]
+    if len(unique_codes) >= MIN_CODES_PER_GROUP:
+        snapshots.update(get_group_quotes(unique_codes))
+        unique_codes = [code for code in unique_codes if code not in snapshots]
 
     def fetch_one(code):
-        url = f"https://finance.naver.com/item/main.naver?code={code}"
-        response = requests.get(url, headers={'User-Agent': 'Mozilla/5.0'}, timeout=10)
+        url = naver_url(f"/item/main.naver?code={code}")
+        response = http_client.get('naver.item', url, headers={'User-Agent': 'Mozilla/5.0'}, timeout=10)
         response.raise_for_status()
-        soup = BeautifulSoup(response.content.decode('utf-8', 'replace'), 'html.parser')
-        return _extract_stock_snapshot(soup, code)
+        with parse_timer('naver.item'):
+            soup = _soup(response.content.decode('utf-8', 'replace'))
+            return _extract_stock_snapshot(soup, code)
 
     max_workers = min(12, max(1, len(unique_codes)))
     with ThreadPoolExecutor(max_workers=max_workers) as executor:
@@ -136,8 +222,10 @@ def get_stock_snapshots(codes):
                 if snapshot:
                     snapshots[code] = snapshot
             except Exception as e:
+                record_error('naver.snapshot')
                 print(f"Error fetching snapshot for {code}: {e}")
 
+    apply_market_caps(snapshots.values())
     return snapshots
 
 def get_market_indices():
@@ -145,10 +233,10 @@ def get_market_indices():
     Fetches KOSPI/KOSDAQ indices with rate of change.
     Returns: dict with 'KOSPI' and 'KOSDAQ' sub-dicts containing 'value', 'change', 'rate'
     """
-    url = "https://finance.naver.com/sise/"
+    url = naver_url("/sise/")
     try:
-        response = requests.get(url, headers={'User-Agent': 'Mozilla/5.0'})
-        soup = BeautifulSoup(response.content.decode('utf-8', 'replace'), 'html.parser')
+        response = http_client.get('naver.sise', url, headers={'User-Agent': 'Mozilla/5.0'})
+        soup = _soup(response.content.decode('utf-8', 'replace'))
 
         # KOSPI
         kospi_value = soup.select_one('#KOSPI_now').text.strip()
@@ -187,6 +275,7 @@ def get_market_indices():
             }
         }
     except Exception as e:
+        record_error('naver.market_indices')
         print(f"Error fetching market indices: {e}")
         return None
 
@@ -197,199 +286,108 @@ def get_top_stocks(limit=30, sort_by="volume"):
         limit (int): Number of stocks to return.
         sort_by (str): 'volume' (Top 100 Volume) or 'amount' (Top Trading Value via Market Sum sorted).
     Returns:
-        list: List of dictionaries.
+        list: List of Quotes.
     """
     if sort_by == 'amount':
         # Trading-value mode needs a wider candidate set than just one page.
         # Merge a few pages of market-cap leaders and high-volume leaders, then sort by amount.
         url_specs = [
-            ("https://finance.naver.com/sise/sise_market_sum.naver?sosok=0", 3),
-            ("https://finance.naver.com/sise/sise_market_sum.naver?sosok=1", 3),
-            ("https://finance.naver.com/sise/sise_quant.naver", 6),
+            (naver_url("/sise/sise_market_sum.naver?sosok=0"), 3),
+            (naver_url("/sise/sise_market_sum.naver?sosok=1"), 3),
+            (naver_url("/sise/sise_quant.naver"), 6),
         ]
 
         seen_codes = set()
         all_stocks = []
 
         for base_url, pages in url_specs:
+            endpoint = 'naver.quant' if 'quant' in base_url else 'naver.market_sum'
             try:
                 for page in range(1, pages + 1):
                     page_url = f"{base_url}&page={page}" if "?" in base_url else f"{base_url}?page={page}"
-                    response = requests.get(page_url, headers=DEFAULT_HEADERS, timeout=10)
-                    soup = BeautifulSoup(response.content.decode('euc-kr', 'replace'), 'html.parser')
-                    table = soup.select_one('table.type_2')
-                    if not table:
-                        continue
-
-                    rows = table.select('tr')
+                    response = http_client.get(endpoint, page_url, headers=DEFAULT_HEADERS, timeout=10)
+                    with parse_timer(endpoint):
+                        rows = parse_list_page(response.content.decode('euc-kr', 'replace')).batch()
                     for row in rows:
-                        cols = row.select('td')
-                        if not (len(cols) > 5 and cols[0].text.strip().isdigit()):
-                            continue
-
-                        try:
-                            name_tag = cols[1].select_one('a')
-                            if not name_tag:
-                                continue
-
-                            name = name_tag.text.strip()
-                            href = name_tag['href']
-                            stock_code = href.split('=')[-1]
-                            if stock_code in seen_codes:
-                                continue
-
-                            is_quant = 'quant' in base_url
-                            price_str = cols[2].text.strip()
-                            rate_str = cols[4].text.strip()
-                            price = _parse_int(price_str)
-                            rate_val = _parse_rate(rate_str)
-
-                            market_cap_str = "-"
-                            if is_quant:
-                                volume = _parse_int(cols[5].text.strip())
-                                amount = _parse_amount_millions(cols[6].text.strip())
-                                if len(cols) > 9:
-                                    market_cap_str = cols[9].text.strip()
-                            else:
-                                volume = _parse_int(cols[9].text.strip())
-                                amount = (price * volume) // 1000000
-                                market_cap_str = cols[6].text.strip()
-
-                            market_cap_val = _parse_int(market_cap_str) if market_cap_str != "-" else 0
-                            item = {
-                                "code": stock_code,
-                                "name": name,
-                                "price": price,
-                                "price_str": price_str,
-                                "rate_str": rate_str,
-                                "rate": rate_val,
-                                "volume": volume,
-                                "amount": amount,
-                                "amount_str": f"{amount:,}",
-                                "market_cap": market_cap_val,
-                                "market_cap_str": market_cap_str,
-                            }
-                            all_stocks.append(item)
-                            seen_codes.add(stock_code)
-                        except (ValueError, IndexError):
-                            continue
+                        if row.code not in seen_codes:
+                            seen_codes.add(row.code)
+                            all_stocks.append(row)
             except Exception as e:
+                record_error(endpoint)
                 print(f"Error fetching {base_url}: {e}")
 
-        all_stocks.sort(key=lambda x: x['amount'], reverse=True)
+        all_stocks.sort(key=lambda x: x.amount, reverse=True)
 
         final_stocks = []
         for i, stock in enumerate(all_stocks[:limit]):
-            stock['rank'] = i + 1
+            stock.rank = i + 1
             final_stocks.append(stock)
 
+        apply_market_caps(final_stocks)
         return final_stocks
 
     else:
         # Use sise_quant for Top Volume
-        url = "https://finance.naver.com/sise/sise_quant.naver"
+        url = naver_url("/sise/sise_quant.naver")
         try:
-            response = requests.get(url, headers=DEFAULT_HEADERS, timeout=10)
-            soup = BeautifulSoup(response.content.decode('euc-kr', 'replace'), 'html.parser')
-            
-            table = soup.select_one('table.type_2')
-            if not table:
-                return []
-                
-            stocks = []
-            rows = table.select('tr')
-            
-            generated_rank = 1
-            for row in rows:
-                cols = row.select('td')
-                # Valid data row check
-                if not (len(cols) > 5 and cols[0].text.strip().isdigit()):
-                    continue
-                    
-                try:
-                    # Use generated rank instead of static 'N' column
-                    rank = generated_rank
-                    name = cols[1].text.strip()
-                    price_str = cols[2].text.strip()
-                    rate_str = cols[4].text.strip().strip()
-                    vol_str = cols[5].text.strip()
-                    amt_str = cols[6].text.strip() # explicit amount
-                    
-                    volume = int(vol_str.replace(',', ''))
-                    amount = int(amt_str.replace(',', '')) if amt_str else 0
-
-                    rate_val = 0.0
-                    clean_rate = rate_str.replace('%', '').strip()
-                    if clean_rate:
-                        rate_val = float(clean_rate)
-                    
-                    item = {
-                        "rank": rank,
-                        "name": name,
-                        "price": price_str,
-                        "rate_str": rate_str,
-                        "rate": rate_val,
-                        "volume": volume,
-                        "amount": amount,
-                        "amount_str": amt_str
-                    }
-                    stocks.append(item)
-                    generated_rank += 1
-                except (ValueError, IndexError) as e:
-                    # print(f"Skipping row: {e}")
-                    continue
-                    
-            return stocks[:limit]
-            
+            response = http_client.get('naver.quant', url, headers=DEFAULT_HEADERS, timeout=10)
+            with parse_timer('naver.quant'):
+                stocks = list(parse_list_page(response.content.decode('euc-kr', 'replace')).batch())[:limit]
+            for i, stock in enumerate(stocks):
+                stock.rank = i + 1
+            apply_market_caps(stocks)
+            return stocks
+
         except Exception as e:
+            record_error('naver.quant')
             print(f"Error fetching top stocks: {e}")
             return []
-def get_theme_details(theme_no):
+
+def get_theme_details(theme_no, crawler=None):
     """
     Fetches all stocks belonging to a theme with their real-time data.
     Args:
         theme_no (str): Naver Finance theme ID.
+        crawler: Crawl scheduler whose per-host gate the request goes through
+            (default: the process-wide one).
     Returns:
-        list: List of dicts containing stock data.
+        list: List of Quotes, one per member.
     """
-    url = f"https://finance.naver.com/sise/sise_group_detail.naver?type=theme&no={theme_no}"
+    url = naver_url(f"/sise/sise_group_detail.naver?type=theme&no={theme_no}")
     stocks = []
-    
+
     try:
-        response = requests.get(url, headers={'User-Agent': 'Mozilla/5.0'})
-        soup = BeautifulSoup(response.content.decode('euc-kr', 'replace'), 'html.parser')
-        
+        response = (crawler or get_crawler()).get(url, endpoint='naver.theme', headers=DEFAULT_HEADERS, timeout=10)
+        response.raise_for_status()
+        with parse_timer('naver.theme'):
+            soup = _soup(response.content.decode('euc-kr', 'replace'))
+
         table = soup.select_one('table.type_5')
         if not table:
             return []
-            
-        rows = table.select('tr')
-        for row in rows:
+
+        # Columns: name, theme reason (hidden), price, change, rate, bid, ask, volume, amount(백만), ...
+        for row in table.select('tr'):
             cols = row.select('td')
-            if len(cols) >= 9:
-                link = cols[0].select_one('a')
-                if not link: continue
-                
-                name = link.text.strip().replace('*', '').strip()
-                code = link.get('href', '').split('code=')[-1].split('&')[0]
-                
-                price = cols[2].text.strip().replace(',', '')
-                rate = cols[4].text.strip().replace('%', '').replace('+', '')
-                amount = cols[8].text.strip().replace(',', '')
-                
-                try:
-                    stocks.append({
-                        "name": name,
-                        "code": code,
-                        "price": int(price) if price else 0,
-                        "rate": float(rate) if rate else 0.0,
-                        "amount": int(amount) if amount else 0
-                    })
-                except ValueError:
-                    continue
-                    
+            if len(cols) < 9:
+                continue
+            link = cols[0].select_one('a')
+            if not link:
+                continue
+            code = link.get('href', '').split('code=')[-1].split('&')[0]
+            if not code:
+                continue
+            stocks.append(Quote(
+                code=code,
+                name=link.text.strip().replace('*', '').strip(),
+                price=_parse_int(cols[2].text),
+                rate=_parse_rate(cols[4].text),
+                volume=_parse_int(cols[7].text),
+                amount=_parse_int(cols[8].text),
+            ))
+
         return stocks
     except Exception as e:
+        record_error('naver.theme')
         print(f"Error fetching theme details for {theme_no}: {e}")
         return []
-
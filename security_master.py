@@ -0,0 +1,340 @@
+"""
+Daily security master: code -> name, market and type for every KRX listing.
+
+Listed companies (with sector and main products) come from the KRX KIND corp lists,
+ETFs and ETNs from Naver's ETF/ETN lists, and the traded short names (현대차 rather than
+현대자동차) from the scraper's market-sum sweep. Everything is fetched through the shared
+crawl scheduler, so the crawl stays under its per-host limits. The master is rebuilt at
+most once per day, in a background thread, and persisted to security_master.json.
+Lookups by code or name are dict hits.
+
+    python security_master.py            # refresh now
+"""
+
+import argparse
+import html
+import json
+import os
+import re
+import threading
+import time
+from dataclasses import asdict, dataclass, replace
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from crawl import CrawlScheduler, get_crawler
+from metrics import parse_timer, record_error
+
+KST = timezone(timedelta(hours=9))
+MASTER_FILENAME = 'security_master.json'
+REFRESH_RETRY_SECONDS = 600.0
+
+KIND_STOCK = 'stock'
+KIND_ETF = 'etf'
+KIND_ETN = 'etn'
+KIND_SPAC = 'spac'
+KIND_REIT = 'reit'
+EXCHANGE_TRADED_KINDS = frozenset({KIND_ETF, KIND_ETN})
+
+KRX_MARKETS = {'KOSPI': 'stockMkt', 'KOSDAQ': 'kosdaqMkt'}
+DEFAULT_KRX_BASE_URL = 'https://kind.krx.co.kr'
+KRX_CORP_LIST_PATH = '/corpgeneral/corpList.do?method=download&marketType={market_type}'
+NAVER_FUND_LISTS = {KIND_ETF: ('/api/sise/etfItemList.nhn', 'etfItemList'), KIND_ETN: ('/api/sise/etnItemList.nhn', 'etnItemList')}
+# Name heuristics, used only for codes none of the lists classify (e.g. a listing newer than the master).
+ETF_KEYWORDS = [
+    'KODEX',
+    'TIGER',
+    'KBSTAR',
+    'KOSEF',
+    'ACE',
+    'SOL',
+    'ARIRANG',
+    'HANARO',
+    'ETN',
+    '레버리지',
+    '인버스',
+    '선물',
+]
+
+_ROW_RE = re.compile(r'<tr[^>]*>(.*?)</tr>', re.S)
+_CELL_RE = re.compile(r'<t[hd][^>]*>(.*?)</t[hd]>', re.S)
+_TAG_RE = re.compile(r'<[^>]+>')
+
+
+@dataclass(frozen=True, slots=True)
+class Security:
+    code: str
+    name: str
+    market: str = ''
+    kind: str = KIND_STOCK
+    sector: str = ''
+    products: str = ''
+    # KRX company name (회사명); empty for codes KRX's corp lists do not include (ETFs, ETNs).
+    listed_name: str = ''
+
+
+def _name_key(name: str) -> str:
+    return re.sub(r'\s+', '', name).casefold()
+
+
+class SecurityMaster:
+    """Securities indexed by code and by name (traded and KRX names, case and space insensitive)."""
+
+    def __init__(self, securities: Iterable[Security] = ()) -> None:
+        self.by_code: dict[str, Security] = {}
+        for security in securities:
+            self.by_code.setdefault(security.code, security)
+        self.by_name: dict[str, Security] = {}
+        for security in self.by_code.values():
+            for name in (security.name, security.listed_name):
+                if name:
+                    self.by_name.setdefault(_name_key(name), security)
+
+    def __len__(self) -> int:
+        return len(self.by_code)
+
+    def __iter__(self) -> Iterator[Security]:
+        return iter(self.by_code.values())
+
+    def __contains__(self, code: object) -> bool:
+        return code in self.by_code
+
+    def get(self, code: str) -> Security | None:
+        return self.by_code.get(code)
+
+    def find(self, name: str) -> Security | None:
+        return self.by_name.get(_name_key(name))
+
+    def resolve(self, query: str) -> Security | None:
+        """Look `query` up as a code first, then as a name."""
+        query = query.strip()
+        return self.by_code.get(query.upper()) or self.find(query)
+
+    def name_of(self, code: str, default: str = '') -> str:
+        security = self.by_code.get(code)
+        return security.name if security else default
+
+    def kind_of(self, code: str) -> str:
+        """The code's type, or '' when the master does not know it."""
+        security = self.by_code.get(code)
+        return security.kind if security else ''
+
+
+def _master_path() -> Path:
+    configured = os.getenv('BLUEKEY_SECURITY_MASTER_FILE', '').strip()
+    return Path(configured) if configured else Path(__file__).resolve().parent / MASTER_FILENAME
+
+
+def krx_url(path: str) -> str:
+    """KRX KIND URL; KRX_BASE_URL redirects it (like NAVER_BASE_URL, e.g. to the load-test mock)."""
+    base = (os.getenv('KRX_BASE_URL', '').strip() or DEFAULT_KRX_BASE_URL).rstrip('/')
+    return base + path
+
+
+def _today() -> str:
+    return datetime.now(KST).strftime('%Y%m%d')
+
+
+def _listed_kind(name: str) -> str:
+    if '스팩' in name or '기업인수목적' in name:
+        return KIND_SPAC
+    if '리츠' in name or 'REIT' in name.upper():
+        return KIND_REIT
+    return KIND_STOCK
+
+
+def name_kind(name: str) -> str:
+    """Best guess at a type from the name alone."""
+    if 'ETN' in name:
+        return KIND_ETN
+    if any(keyword in name for keyword in ETF_KEYWORDS):
+        return KIND_ETF
+    return _listed_kind(name)
+
+
+def _cell_text(cell: str) -> str:
+    return html.unescape(_TAG_RE.sub('', cell)).strip()
+
+
+def parse_krx_corp_list(page_html: str) -> list[dict[str, str]]:
+    """Rows of a KIND corp-list download as {header: value}."""
+    rows = [[_cell_text(cell) for cell in _CELL_RE.findall(row)] for row in _ROW_RE.findall(page_html)]
+    if not rows:
+        return []
+    headers, body = rows[0], rows[1:]
+    return [dict(zip(headers, values)) for values in body if len(values) == len(headers)]
+
+
+def fetch_krx_listing(market: str, crawler: CrawlScheduler | None = None) -> list[Security]:
+    url = krx_url(KRX_CORP_LIST_PATH.format(market_type=KRX_MARKETS[market]))
+    response = (crawler or get_crawler()).get(url, endpoint='krx.corp_list', timeout=20)
+    response.raise_for_status()
+    with parse_timer('krx.corp_list'):
+        rows = parse_krx_corp_list(response.content.decode('euc-kr', 'replace'))
+    if not rows:
+        raise RuntimeError(f'No rows found in KRX list for {market}')
+    securities = []
+    for row in rows:
+        code = str(row.get('종목코드', '')).strip().upper()
+        code = code.zfill(6) if code.isdigit() else code
+        name = str(row.get('회사명', '')).strip()
+        if not code or not name:
+            continue
+        securities.append(Security(
+            code=code,
+            name=name,
+            market=market,
+            kind=_listed_kind(name),
+            sector=str(row.get('업종', '')).strip(),
+            products=str(row.get('주요제품', '')).strip(),
+            listed_name=name,
+        ))
+    return securities
+
+
+def fetch_naver_fund_list(kind: str, crawler: CrawlScheduler | None = None) -> dict[str, str]:
+    """{code: name} of every ETF or ETN Naver lists."""
+    from scraper import DEFAULT_HEADERS, naver_url
+
+    path, key = NAVER_FUND_LISTS[kind]
+    response = (crawler or get_crawler()).get(naver_url(path), endpoint=f'naver.{kind}_list', headers=DEFAULT_HEADERS, timeout=10)
+    response.raise_for_status()
+    try:
+        text = response.content.decode('utf-8')
+    except UnicodeDecodeError:
+        text = response.content.decode('euc-kr', 'replace')
+    items = json.loads(text).get('result', {}).get(key, [])
+    return {str(item['itemcode']): str(item.get('itemname', '')).strip() for item in items if item.get('itemcode')}
+
+
+def fetch_naver_names(crawler: CrawlScheduler | None = None) -> dict[str, str]:
+    """{code: traded short name} from the market-sum sweep."""
+    from scraper import sweep_market_pages
+
+    names: dict[str, str] = {}
+    for page in sweep_market_pages(crawler):
+        for code, name in zip(page.code.tolist(), page.name.tolist()):
+            if name:
+                names.setdefault(code, name)
+    return names
+
+
+def crawl_master(crawler: CrawlScheduler | None = None) -> SecurityMaster:
+    crawler = crawler or get_crawler()
+    listings = [crawler.submit(fetch_krx_listing, market, crawler) for market in KRX_MARKETS]
+    funds = {kind: crawler.submit(fetch_naver_fund_list, kind, crawler) for kind in NAVER_FUND_LISTS}
+    # The sweep runs its markets as crawls of their own, so it is driven from this thread.
+    try:
+        short_names = fetch_naver_names(crawler)
+    except Exception:
+        record_error('security_master.naver_names')
+        short_names = {}
+
+    # KRX is the backbone; without both markets the master would drop listings.
+    listed = [security for listing in listings for security in listing.result()]
+    fund_names: dict[str, dict[str, str]] = {}
+    for kind, future in funds.items():
+        try:
+            fund_names[kind] = future.result()
+        except Exception:
+            record_error(f'security_master.{kind}_list')
+            fund_names[kind] = {}
+
+    securities = [replace(security, name=short_names.get(security.code) or security.name) for security in listed]
+    for kind, names in fund_names.items():
+        securities += [Security(code=code, name=name, market='KOSPI', kind=kind) for code, name in names.items()]
+    known = {security.code for security in securities}
+    securities += [
+        Security(code=code, name=name, kind=name_kind(name))
+        for code, name in short_names.items()
+        if code not in known
+    ]
+    return SecurityMaster(securities)
+
+
+_master = SecurityMaster()
+_master_date = ''
+_loaded = False
+_refresh_thread: threading.Thread | None = None
+_last_attempt = 0.0
+_lock = threading.Lock()
+
+
+def refresh_master() -> SecurityMaster:
+    global _master, _master_date
+    master = crawl_master()
+    if not len(master):
+        raise RuntimeError('KRX corp lists returned no securities.')
+    today = _today()
+    path = _master_path()
+    tmp_path = path.with_name(path.name + '.tmp')
+    payload = {'date': today, 'securities': [asdict(security) for security in master]}
+    tmp_path.write_text(json.dumps(payload, ensure_ascii=False), encoding='utf-8')
+    os.replace(tmp_path, path)
+    with _lock:
+        _master, _master_date = master, today
+    return master
+
+
+def _load() -> None:
+    global _master, _master_date, _loaded
+    try:
+        payload = json.loads(_master_path().read_text(encoding='utf-8'))
+        _master = SecurityMaster(Security(**row) for row in payload.get('securities', []))
+        _master_date = str(payload.get('date', ''))
+    except (OSError, ValueError, AttributeError, TypeError):
+        pass
+    _loaded = True
+
+
+def _refresh_in_background() -> None:
+    global _refresh_thread, _last_attempt
+
+    def refresh() -> None:
+        try:
+            refresh_master()
+        except Exception:
+            record_error('security_master.refresh')
+
+    if _refresh_thread is not None and _refresh_thread.is_alive():
+        return
+    if time.monotonic() - _last_attempt < REFRESH_RETRY_SECONDS and _last_attempt:
+        return
+    _last_attempt = time.monotonic()
+    _refresh_thread = threading.Thread(target=refresh, name='security-master-refresh', daemon=True)
+    _refresh_thread.start()
+
+
+def get_master(wait: bool = False) -> SecurityMaster:
+    """
+    Current master; a stale or missing one is refreshed in the background. With `wait`
+    (build scripts), a stale master is refreshed first, falling back to it if that fails.
+    """
+    with _lock:
+        if not _loaded:
+            _load()
+        stale = _master_date != _today()
+        if stale and not wait:
+            _refresh_in_background()
+        if not stale or not wait:
+            return _master
+    try:
+        return refresh_master()
+    except Exception as e:
+        record_error('security_master.refresh')
+        print(f'Security master refresh failed, using the {_master_date or "empty"} master: {e}')
+        return _master
+
+
+def main() -> None:
+    argparse.ArgumentParser(description='Refresh the security master from KRX and Naver.').parse_args()
+    master = refresh_master()
+    counts: dict[str, int] = {}
+    for security in master:
+        counts[security.kind] = counts.get(security.kind, 0) + 1
+    print(f'Saved {len(master)} securities to {_master_path()} ' + ', '.join(f'{kind}={count}' for kind, count in sorted(counts.items())))
+
+
+if __name__ == '__main__':
+    main()
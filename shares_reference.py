@@ -0,0 +1,133 @@
+"""
+Daily reference table of listed shares per stock code.
+
+Market cap is computed locally as price x shares for quotes from any source, so the hot
+path never fetches item pages just for a cap. The table is taken from the 상장주식수 column
+of the scraper's market-sum sweep at most once per day, in a background thread, and
+persisted to shares_outstanding.json.
+
+    python shares_reference.py            # refresh now
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Iterable
+
+from metrics import record_error
+
+KST = timezone(timedelta(hours=9))
+REFERENCE_FILENAME = 'shares_outstanding.json'
+REFRESH_RETRY_SECONDS = 600.0
+# Market caps across the app are in 억원 (100 million KRW).
+MARKET_CAP_UNIT = 100_000_000
+
+_table: dict[str, int] = {}
+_table_date = ''
+_loaded = False
+_refresh_thread: threading.Thread | None = None
+_last_attempt = 0.0
+_lock = threading.Lock()
+
+
+def _reference_path() -> Path:
+    configured = os.getenv('BLUEKEY_SHARES_FILE', '').strip()
+    return Path(configured) if configured else Path(__file__).resolve().parent / REFERENCE_FILENAME
+
+
+def _today() -> str:
+    return datetime.now(KST).strftime('%Y%m%d')
+
+
+def crawl_shares_table() -> dict[str, int]:
+    from scraper import sweep_market_pages
+
+    shares: dict[str, int] = {}
+    for page in sweep_market_pages():
+        for code, count in zip(page.code.tolist(), page.shares.tolist()):
+            if count:
+                shares.setdefault(code, count)
+    return shares
+
+
+def refresh_shares_table() -> dict[str, int]:
+    global _table, _table_date
+    shares = crawl_shares_table()
+    if not shares:
+        raise RuntimeError('Naver market-sum pages returned no share counts.')
+    today = _today()
+    path = _reference_path()
+    tmp_path = path.with_name(path.name + '.tmp')
+    tmp_path.write_text(json.dumps({'date': today, 'shares': shares}, ensure_ascii=False), encoding='utf-8')
+    os.replace(tmp_path, path)
+    with _lock:
+        _table, _table_date = shares, today
+    return shares
+
+
+def _load() -> None:
+    global _table, _table_date, _loaded
+    try:
+        payload = json.loads(_reference_path().read_text(encoding='utf-8'))
+        _table = {str(code): int(count) for code, count in payload.get('shares', {}).items()}
+        _table_date = str(payload.get('date', ''))
+    except (OSError, ValueError, AttributeError):
+        pass
+    _loaded = True
+
+
+def _refresh_in_background() -> None:
+    global _refresh_thread, _last_attempt
+
+    def refresh() -> None:
+        try:
+            refresh_shares_table()
+        except Exception:
+            record_error('shares_reference.refresh')
+
+    if _refresh_thread is not None and _refresh_thread.is_alive():
+        return
+    if time.monotonic() - _last_attempt < REFRESH_RETRY_SECONDS and _last_attempt:
+        return
+    _last_attempt = time.monotonic()
+    _refresh_thread = threading.Thread(target=refresh, name='shares-refresh', daemon=True)
+    _refresh_thread.start()
+
+
+def get_shares_table() -> dict[str, int]:
+    """Current {code: listed shares}; a stale or missing table is refreshed in the background."""
+    with _lock:
+        if not _loaded:
+            _load()
+        if _table_date != _today():
+            _refresh_in_background()
+        return _table
+
+
+def _price(value: Any) -> int:
+    text = str(value or '').replace(',', '').strip()
+    return int(text) if text.isdigit() else 0
+
+
+def apply_market_caps(stocks: Iterable[dict[str, Any]]) -> None:
+    """Set market_cap (억원) from price x listed shares; rows with unknown codes keep their value."""
+    table = get_shares_table()
+    for stock in stocks:
+        shares = table.get(stock.get('code', ''))
+        price = _price(stock.get('price'))
+        if shares and price:
+            stock['market_cap'] = price * shares // MARKET_CAP_UNIT
+
+
+def main() -> None:
+    argparse.ArgumentParser(description='Refresh the listed-shares reference table from Naver.').parse_args()
+    shares = refresh_shares_table()
+    print(f'Saved {len(shares)} share counts to {_reference_path()}')
+
+
+if __name__ == '__main__':
+    main()
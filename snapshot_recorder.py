@@ -0,0 +1,184 @@
+"""
+Intraday quote archive: every fetched top-list and snapshot batch appended to Parquet.
+
+Rows are buffered in memory and flushed as one compressed part file per batch under
+<root>/<YYYYMMDD>/, so a trading day is a directory that pyarrow reads as one table.
+Enable it with BLUEKEY_RECORD_DIR; the query helpers return NumPy arrays per code or theme.
+"""
+
+import atexit
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Iterable
+
+import numpy as np
+
+import metrics
+from dashboard_engine import normalize_float, normalize_int
+from themes import get_theme_members
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+KST = timezone(timedelta(hours=9))
+FLUSH_ROWS = 5000
+FLUSH_SECONDS = 30.0
+SERIES_FIELDS = ('price', 'rate', 'volume', 'amount', 'market_cap')
+
+
+def _schema():
+    return pa.schema([
+        ('code', pa.string()),
+        ('ts', pa.timestamp('ms', tz='Asia/Seoul')),
+        ('price', pa.int64()),
+        ('rate', pa.float64()),
+        ('volume', pa.int64()),
+        ('amount', pa.int64()),
+        ('market_cap', pa.int64()),
+        ('source', pa.string()),
+    ])
+
+
+class SnapshotRecorder:
+    def __init__(self, root: str | Path, flush_rows: int = FLUSH_ROWS, flush_seconds: float = FLUSH_SECONDS) -> None:
+        if pa is None:
+            raise RuntimeError('Snapshot recording needs pyarrow (pip install pyarrow).')
+        self.root = Path(root)
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self._columns: dict[str, list[Any]] = {name: [] for name in _schema().names}
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+    def record(self, stocks: Iterable[dict[str, Any]], source: str, ts: datetime | None = None) -> int:
+        """Buffer one fetched batch (top-list rows or snapshot values) and flush when due."""
+        ts = ts or datetime.now(KST)
+        added = 0
+        with self._lock:
+            columns = self._columns
+            for stock in stocks:
+                code = stock.get('code')
+                if not code:
+                    continue
+                columns['code'].append(code)
+                columns['ts'].append(ts)
+                columns['price'].append(normalize_int(stock.get('price', 0)))
+                columns['rate'].append(normalize_float(stock.get('rate', 0.0)))
+                columns['volume'].append(normalize_int(stock.get('volume', 0)))
+                columns['amount'].append(normalize_int(stock.get('amount', 0)))
+                columns['market_cap'].append(normalize_int(stock.get('market_cap', 0)))
+                columns['source'].append(source)
+                added += 1
+            due = len(columns['code']) >= self.flush_rows or time.monotonic() - self._last_flush >= self.flush_seconds
+        if due:
+            self.flush()
+        return added
+
+    def flush(self) -> Path | None:
+        """Write the buffered rows as one part file; on a write error the batch is dropped and counted."""
+        with self._lock:
+            columns = self._columns
+            self._columns = {name: [] for name in columns}
+            self._last_flush = time.monotonic()
+        if not columns['code']:
+            return None
+        table = pa.table(columns, schema=_schema())
+        day = columns['ts'][0].astimezone(KST).strftime('%Y%m%d')
+        directory = self.root / day
+        with self._write_lock:
+            path = directory / f'part-{datetime.now(KST):%H%M%S%f}.parquet'
+            tmp_path = path.with_suffix('.tmp')
+            try:
+                directory.mkdir(parents=True, exist_ok=True)
+                pq.write_table(table, tmp_path, compression='zstd')
+                os.replace(tmp_path, path)
+            except (OSError, pa.ArrowException):
+                # A full or read-only disk must not take the fetch path down with it.
+                metrics.record_error('recorder.flush')
+                try:
+                    tmp_path.unlink(missing_ok=True)
+                except OSError:
+                    pass
+                return None
+        return path
+
+
+def read_day(root: str | Path, day: str | None = None, codes: Iterable[str] | None = None):
+    """Return one day's archive as a pyarrow Table, optionally only for `codes`."""
+    if pq is None:
+        raise RuntimeError('Reading the snapshot archive needs pyarrow (pip install pyarrow).')
+    directory = Path(root) / (day or datetime.now(KST).strftime('%Y%m%d'))
+    parts = sorted(directory.glob('part-*.parquet'))
+    if not parts:
+        return _schema().empty_table()
+    filters = [('code', 'in', sorted(set(codes)))] if codes is not None else None
+    table = pq.read_table(parts, schema=_schema(), filters=filters)
+    return table.sort_by([('code', 'ascending'), ('ts', 'ascending')])
+
+
+def _split_by_code(table) -> dict[str, dict[str, np.ndarray]]:
+    if table.num_rows == 0:
+        return {}
+    codes = table.column('code').to_numpy(zero_copy_only=False)
+    ts = table.column('ts').cast(pa.timestamp('ms')).to_numpy()
+    values = {name: table.column(name).to_numpy() for name in SERIES_FIELDS}
+    # Rows are sorted by code, so each code is one contiguous slice.
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    ends = np.r_[starts[1:], len(codes)]
+    series = {}
+    for start, end in zip(starts, ends):
+        entry = {'ts': ts[start:end]}
+        entry.update({name: column[start:end] for name, column in values.items()})
+        series[str(codes[start])] = entry
+    return series
+
+
+def code_series(root: str | Path, code: str, day: str | None = None) -> dict[str, np.ndarray]:
+    """Intraday series for one code: {'ts' (UTC datetime64[ms]), 'price', 'rate', 'volume', 'amount', 'market_cap'}."""
+    series = _split_by_code(read_day(root, day, [code]))
+    if code in series:
+        return series[code]
+    empty = {'ts': np.array([], dtype='datetime64[ms]'), 'rate': np.array([], dtype=np.float64)}
+    empty.update({name: np.array([], dtype=np.int64) for name in SERIES_FIELDS if name != 'rate'})
+    return empty
+
+
+def theme_series(root: str | Path, theme: str, day: str | None = None) -> dict[str, dict[str, np.ndarray]]:
+    """Intraday series for every recorded member of a theme, keyed by code."""
+    codes = [member['code'] for member in get_theme_members(theme) if member.get('code')]
+    if not codes:
+        return {}
+    return _split_by_code(read_day(root, day, codes))
+
+
+_recorder: SnapshotRecorder | None = None
+_recorder_lock = threading.Lock()
+
+
+def get_recorder() -> SnapshotRecorder | None:
+    """Process-wide recorder configured by BLUEKEY_RECORD_DIR; None when recording is off."""
+    global _recorder
+    root = os.getenv('BLUEKEY_RECORD_DIR', '').strip()
+    if not root or pa is None:
+        return None
+    with _recorder_lock:
+        if _recorder is None or _recorder.root != Path(root):
+            if _recorder is not None:
+                _recorder.flush()
+            _recorder = SnapshotRecorder(root)
+            atexit.register(_recorder.flush)
+        return _recorder
+
+
+def record_batch(stocks: Iterable[dict[str, Any]], source: str) -> None:
+    recorder = get_recorder()
+    if recorder is not None:
+        recorder.record(stocks, source)
@@ -0,0 +1,34 @@
+import pytest
+
+import kiwoom_provider
+from offline import fixture_json
+
+
+@pytest.fixture(autouse=True)
+def fresh_schemas(monkeypatch):
+    monkeypatch.setattr(kiwoom_provider, '_schemas', {})
+
+
+def test_error_envelope_does_not_pin_schema():
+    error = {'return_code': 3, 'return_msg': 'rate limited'}
+    kiwoom_provider._extract_table('ka10032', error)
+    assert 'ka10032' not in kiwoom_provider._schemas
+
+    rows, schema = kiwoom_provider._extract_table('ka10032', fixture_json('kiwoom_ka10032.json'))
+    assert len(rows) > 1
+    assert schema.fields['code'] and schema.fields['name']
+    columns = kiwoom_provider._normalize_table(rows, schema)
+    assert all(columns['code'])
+
+
+def test_schema_recompiled_when_code_key_disappears():
+    kiwoom_provider._extract_table('ka99999', {'list': [{'stk_cd': '005930', 'stk_nm': 'A', 'cur_prc': '1'}]})
+    rows, schema = kiwoom_provider._extract_table('ka99999', {'list': [{'code': '000660', 'name': 'B', 'price': '2'}]})
+    assert schema.fields['code'] == 'code'
+    assert kiwoom_provider._normalize_table(rows, schema)['code'] == ['000660']
+
+
+def test_single_row_field_resolved_from_later_response():
+    kiwoom_provider._extract_table('ka10001', {'stk_cd': '005930', 'stk_nm': 'A', 'cur_prc': '1', 'trde_prica': ''})
+    rows, schema = kiwoom_provider._extract_table('ka10001', {'stk_cd': '005930', 'stk_nm': 'A', 'cur_prc': '1', 'trde_prica': '55'})
+    assert kiwoom_provider._normalize_table(rows, schema)['amount'] == [55]
@@ -0,0 +1,64 @@
+import pytest
+
+import naver_themes
+from crawl import CrawlScheduler
+
+LIST_PAGES = {
+    1: '<a href="/sise/sise_group_detail.naver?type=theme&no=10">반도체</a>'
+       '<td class="pgRR"><a href="/sise/theme.naver?page=2">맨뒤</a>',
+    2: '<a href="/sise/sise_group_detail.naver?type=theme&no=20">2차전지</a>',
+}
+GROUP_MEMBERS = {'10': ['005930', '000660'], '20': ['373220', '006400']}
+
+
+def _group_page(no):
+    rows = ''.join(
+        f'<tr><td><a href="/item/main.naver?code={code}">S{code}</a></td>'
+        f'<td></td><td>1,000</td><td></td><td>+1.00%</td><td></td><td></td><td>10</td><td>5</td></tr>'
+        for code in GROUP_MEMBERS[no]
+    )
+    return f'<table class="type_5">{rows}</table>'
+
+
+class _Response:
+    def __init__(self, text):
+        self.content = text.encode('euc-kr')
+
+    def raise_for_status(self):
+        pass
+
+
+class RecordingCrawler(CrawlScheduler):
+    def __init__(self):
+        super().__init__(min_interval=0.0)
+        self.endpoints = []
+
+    def get(self, url, endpoint=None, **kwargs):
+        self.endpoints.append(endpoint)
+        if 'theme.naver?page=' in url:
+            return _Response(LIST_PAGES[int(url.rsplit('=', 1)[1])])
+        return _Response(_group_page(url.rsplit('no=', 1)[1]))
+
+
+@pytest.fixture
+def crawler():
+    with RecordingCrawler() as crawler:
+        yield crawler
+
+
+def test_catalog_crawled_through_scheduler(crawler):
+    catalog = naver_themes.crawl_catalog(crawler)
+    assert catalog == {
+        '10': {'name': '반도체', 'codes': ['005930', '000660']},
+        '20': {'name': '2차전지', 'codes': ['373220', '006400']},
+    }
+    assert sorted(crawler.endpoints) == ['naver.theme', 'naver.theme', 'naver.theme_list', 'naver.theme_list']
+
+
+def test_group_quotes_fetched_through_scheduler(crawler, monkeypatch):
+    monkeypatch.setattr(naver_themes, 'plan_groups', lambda codes: ['10', '20'])
+    monkeypatch.setenv('BLUEKEY_NAVER_GROUP_QUOTES', '1')
+    quotes = naver_themes.get_group_quotes({'005930', '000660', '006400'}, crawler)
+    assert sorted(quotes) == ['000660', '005930', '006400']
+    assert quotes['005930'].price == 1000
+    assert crawler.endpoints == ['naver.theme', 'naver.theme']
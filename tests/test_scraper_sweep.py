@@ -0,0 +1,43 @@
+import pytest
+
+import scraper
+from quote_scheduler import QuoteScheduler
+from quotes import QuoteBatch
+
+TABLE = QuoteBatch.from_quotes([
+    {'code': '005930', 'name': 'A', 'price': 70000, 'rate': 1.0, 'volume': 10, 'amount': 700000},
+    {'code': '000660', 'name': 'B', 'price': 150000, 'rate': -0.5, 'volume': 5, 'amount': 750000},
+])
+
+
+@pytest.fixture
+def recorded(monkeypatch):
+    batches = []
+    sweeps = []
+
+    def sweep_now():
+        sweeps.append(1)
+        scraper._sweep.update(quotes=TABLE, pages=2, swept_at=scraper.time.monotonic())
+
+    monkeypatch.setattr(scraper, '_sweep', {'quotes': QuoteBatch.empty(), 'pages': 0, 'swept_at': float('-inf')})
+    monkeypatch.setattr(scraper, '_sweep_now', sweep_now)
+    monkeypatch.setattr(scraper, 'apply_market_caps', lambda quotes: None)
+    monkeypatch.setattr(scraper, 'record_batch', lambda stocks, source: batches.append((sorted(q['code'] for q in stocks), source)))
+    monkeypatch.setenv('BLUEKEY_NAVER_SWEEP', '1')
+    return batches, sweeps
+
+
+def test_swept_quotes_recorded_once_per_sweep(recorded):
+    batches, sweeps = recorded
+    scheduler = QuoteScheduler(requests_per_minute=600)
+    assert scraper.refresh_from_sweep(scheduler, {'005930', '999999'}) == {'999999'}
+    assert batches == [(['005930'], 'naver')]
+
+    # The same fresh table read again is not archived twice.
+    scraper.refresh_from_sweep(scheduler, {'005930', '000660'})
+    assert len(sweeps) == 1
+    assert batches == [(['005930'], 'naver')]
+
+    scraper._sweep['swept_at'] -= scraper.SWEEP_TTL_SECONDS
+    scraper.refresh_from_sweep(scheduler, {'005930', '000660'})
+    assert batches[-1] == (['000660', '005930'], 'naver')
@@ -0,0 +1,49 @@
+import pytest
+
+pytest.importorskip('pyarrow')
+
+import metrics
+import snapshot_recorder
+from snapshot_recorder import SnapshotRecorder, read_day
+
+ROWS = [{'code': '005930', 'price': '70,000', 'rate': '1.5', 'volume': '10', 'amount': '700000'}]
+
+
+def _errors(where):
+    return metrics.REGISTRY.counter('errors_total').get((('where', where),), 0)
+
+
+def test_flush_into_unwritable_directory_is_recorded_not_raised(tmp_path):
+    # A regular file where the archive directory should be: unwritable even for root.
+    blocker = tmp_path / 'recordings'
+    blocker.write_text('')
+    recorder = SnapshotRecorder(blocker)
+    recorder.record(ROWS, 'naver')
+    before = _errors('recorder.flush')
+    assert recorder.flush() is None
+    assert _errors('recorder.flush') == before + 1
+    assert blocker.is_file()
+
+
+def test_flush_write_error_removes_tmp_file(tmp_path, monkeypatch):
+    def fail(table, where, **kwargs):
+        open(where, 'wb').close()
+        raise OSError('disk full')
+
+    monkeypatch.setattr(snapshot_recorder.pq, 'write_table', fail)
+    recorder = SnapshotRecorder(tmp_path)
+    recorder.record(ROWS, 'naver')
+    before = _errors('recorder.flush')
+    assert recorder.flush() is None
+    assert _errors('recorder.flush') == before + 1
+    assert not list(tmp_path.rglob('*.tmp'))
+    assert recorder.flush() is None
+
+
+def test_flush_writes_part_file(tmp_path):
+    recorder = SnapshotRecorder(tmp_path)
+    recorder.record(ROWS, 'naver')
+    path = recorder.flush()
+    assert path is not None and path.exists()
+    table = read_day(tmp_path, path.parent.name)
+    assert table.column('code').to_pylist() == ['005930']
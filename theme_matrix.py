@@ -0,0 +1,202 @@
+"""
+Sparse stock x theme matrix weighted by the classification scores in theme_details.json.
+
+Rows are L2-normalised, so the similarity of two stocks is the cosine of their theme
+score vectors. The matrix is kept as CSR (stock -> themes) and CSC (theme -> stocks)
+index arrays: a "similar stocks" query only touches the members of the queried stock's
+themes, and theme co-membership counts come from one pass over the non-zeros.
+"""
+
+import json
+import threading
+from pathlib import Path
+from typing import Any, Iterable, Mapping
+
+import numpy as np
+import pandas as pd
+
+from themes import add_reload_listener, get_all_theme_members
+
+DETAILS_FILENAME = 'theme_details.json'
+SIMILAR_FIELDS = ['code', 'name', 'similarity', 'shared_themes']
+OVERLAP_FIELDS = ['theme', 'other', 'shared', 'jaccard']
+
+
+class ThemeMatrix:
+    def __init__(self, scores: Mapping[str, Mapping[str, float]], names: Mapping[str, str] | None = None) -> None:
+        """`scores` is {code: {theme: score}}; non-positive scores are dropped."""
+        names = names or {}
+        rows = {code: {theme: float(score) for theme, score in themes.items() if score > 0} for code, themes in scores.items()}
+        rows = {code: themes for code, themes in rows.items() if themes}
+        self.codes = sorted(rows)
+        self.themes = sorted({theme for themes in rows.values() for theme in themes})
+        self.names = {code: names.get(code, '') for code in self.codes}
+        self._code_index = {code: index for index, code in enumerate(self.codes)}
+        self._theme_index = {theme: index for index, theme in enumerate(self.themes)}
+
+        lengths = np.array([len(rows[code]) for code in self.codes], dtype=np.int64)
+        self._indptr = np.zeros(len(self.codes) + 1, dtype=np.int64)
+        self._indptr[1:] = np.cumsum(lengths)
+        self._indices = np.fromiter(
+            (self._theme_index[theme] for code in self.codes for theme in rows[code]), dtype=np.int64, count=int(self._indptr[-1])
+        )
+        data = np.fromiter((score for code in self.codes for score in rows[code].values()), dtype=np.float64, count=int(self._indptr[-1]))
+        entry_rows = np.repeat(np.arange(len(self.codes)), lengths)
+        norms = np.sqrt(np.bincount(entry_rows, weights=data * data, minlength=len(self.codes)))
+        self._data = data / np.maximum(norms, 1e-12)[entry_rows]
+
+        # Theme -> stocks (CSC) for the similarity products.
+        order = np.argsort(self._indices, kind='stable')
+        self._theme_rows = entry_rows[order]
+        self._theme_data = self._data[order]
+        self.member_count = np.bincount(self._indices, minlength=len(self.themes))
+        self._theme_indptr = np.zeros(len(self.themes) + 1, dtype=np.int64)
+        self._theme_indptr[1:] = np.cumsum(self.member_count)
+        self._co_membership: np.ndarray | None = None
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __contains__(self, code: object) -> bool:
+        return code in self._code_index
+
+    def themes_of(self, code: str) -> list[str]:
+        row = self._code_index.get(code)
+        if row is None:
+            return []
+        return [self.themes[index] for index in self._indices[self._indptr[row]:self._indptr[row + 1]]]
+
+    def similar(self, code: str, top_n: int = 10) -> pd.DataFrame:
+        """The `top_n` stocks whose theme vectors are closest (cosine) to `code`'s."""
+        row = self._code_index.get(code)
+        if row is None:
+            return pd.DataFrame(columns=SIMILAR_FIELDS)
+        start, end = self._indptr[row], self._indptr[row + 1]
+        query_themes, query_weights = self._indices[start:end], self._data[start:end]
+
+        # Gather the members of every queried theme at once and sum weight x weight per stock.
+        starts = self._theme_indptr[query_themes]
+        repeats = self._theme_indptr[query_themes + 1] - starts
+        positions = np.repeat(starts - np.cumsum(repeats) + repeats, repeats) + np.arange(int(repeats.sum()))
+        similarity = np.bincount(
+            self._theme_rows[positions],
+            weights=self._theme_data[positions] * np.repeat(query_weights, repeats),
+            minlength=len(self.codes),
+        )
+        similarity[row] = 0.0
+        candidates = np.flatnonzero(similarity > 0)
+        if len(candidates) > top_n:
+            candidates = candidates[np.argpartition(-similarity[candidates], top_n - 1)[:top_n]]
+        candidates = candidates[np.lexsort((candidates, -similarity[candidates]))]
+
+        own = set(query_themes.tolist())
+        return pd.DataFrame({
+            'code': [self.codes[index] for index in candidates],
+            'name': [self.names[self.codes[index]] for index in candidates],
+            'similarity': similarity[candidates],
+            'shared_themes': [
+                ', '.join(self.themes[theme] for theme in self._indices[self._indptr[index]:self._indptr[index + 1]] if theme in own)
+                for index in candidates
+            ],
+        }, columns=SIMILAR_FIELDS)
+
+    def co_membership(self) -> np.ndarray:
+        """Theme x theme counts of stocks belonging to both (the diagonal is the member count)."""
+        if self._co_membership is None:
+            lengths = np.diff(self._indptr)
+            entry_lengths = np.repeat(lengths, lengths)
+            # Pair every non-zero with every non-zero of its own row.
+            left = np.repeat(self._indices, entry_lengths)
+            row_starts = np.repeat(np.repeat(self._indptr[:-1], lengths), entry_lengths)
+            offsets = np.arange(int(entry_lengths.sum())) - np.repeat(np.cumsum(entry_lengths) - entry_lengths, entry_lengths)
+            right = self._indices[row_starts + offsets]
+            counts = np.zeros((len(self.themes), len(self.themes)), dtype=np.int64)
+            np.add.at(counts, (left, right), 1)
+            self._co_membership = counts
+        return self._co_membership
+
+    def overlap(self, themes: Iterable[str] | None = None, top_n: int = 10) -> pd.DataFrame:
+        """Most overlapping theme pairs by Jaccard index, optionally only pairs involving `themes`."""
+        counts = self.co_membership()
+        sizes = np.diag(counts)
+        union = sizes[:, None] + sizes[None, :] - counts
+        jaccard = np.where(union > 0, counts / np.maximum(union, 1), 0.0)
+        if themes is None:
+            left, right = np.triu_indices(len(self.themes), k=1)
+        else:
+            wanted = np.array([self._theme_index[theme] for theme in themes if theme in self._theme_index], dtype=np.int64)
+            wanted = np.unique(wanted)
+            left = np.repeat(wanted, len(self.themes))
+            right = np.tile(np.arange(len(self.themes)), len(wanted))
+            # A pair with both themes wanted would otherwise be listed twice.
+            unique = ~(np.isin(right, wanted) & (right < left))
+            left, right = left[unique], right[unique]
+        keep = (left != right) & (counts[left, right] > 0)
+        left, right = left[keep], right[keep]
+        order = np.lexsort((-counts[left, right], -jaccard[left, right]))[:top_n]
+        left, right = left[order], right[order]
+        return pd.DataFrame({
+            'theme': [self.themes[index] for index in left],
+            'other': [self.themes[index] for index in right],
+            'shared': counts[left, right],
+            'jaccard': jaccard[left, right],
+        }, columns=OVERLAP_FIELDS)
+
+
+def _load_scores() -> tuple[dict[str, dict[str, float]], dict[str, str]]:
+    """{code: {theme: score}} and {code: name} from theme_details.json, else unit weights from theme_map."""
+    try:
+        details = json.loads((Path(__file__).resolve().parent / DETAILS_FILENAME).read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        details = None
+    scores: dict[str, dict[str, float]] = {}
+    names: dict[str, str] = {}
+    if isinstance(details, dict) and details:
+        for code, entry in details.items():
+            if not isinstance(entry, dict):
+                continue
+            themes: dict[str, float] = {}
+            for theme in entry.get('themes', []):
+                if isinstance(theme, dict) and theme.get('name'):
+                    themes[str(theme['name'])] = max(themes.get(str(theme['name']), 0.0), _score(theme.get('score')))
+            scores[str(code)] = themes
+            names[str(code)] = str(entry.get('name', ''))
+        return scores, names
+
+    for theme, members in get_all_theme_members().items():
+        for member in members:
+            code = member.get('code', '')
+            if code:
+                scores.setdefault(code, {})[theme] = 1.0
+                names.setdefault(code, member.get('name', ''))
+    return scores, names
+
+
+def _score(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+_matrix: ThemeMatrix | None = None
+_matrix_lock = threading.Lock()
+
+
+def get_theme_matrix() -> ThemeMatrix:
+    """Process-wide matrix, built on first use and rebuilt when the theme files are reloaded."""
+    global _matrix
+    with _matrix_lock:
+        if _matrix is None:
+            _matrix = ThemeMatrix(*_load_scores())
+        return _matrix
+
+
+def _rebuild() -> None:
+    global _matrix
+    matrix = ThemeMatrix(*_load_scores())
+    with _matrix_lock:
+        _matrix = matrix
+
+
+add_reload_listener(_rebuild)
@@ -0,0 +1,175 @@
+import threading
+from typing import Any, Mapping
+
+import numpy as np
+import pandas as pd
+
+from dashboard_engine import normalize_float, normalize_int
+from themes import add_reload_listener, get_all_theme_members
+
+LEADERBOARD_FIELDS = ['theme', 'members', 'quoted', 'breadth', 'weighted_rate', 'total_amount', 'leader', 'leader_share']
+
+
+class ThemeStrength:
+    """
+    Incrementally maintained strength statistics for every theme.
+
+    Memberships are stored as CSR index arrays (code -> themes and theme -> codes).
+    `update` only touches the themes of codes whose rate or trading value changed,
+    so refreshing a handful of quotes does not recompute all themes.
+    """
+
+    def __init__(self, memberships: Mapping[str, list[dict[str, str]]] | None = None) -> None:
+        memberships = get_all_theme_members() if memberships is None else memberships
+        self.themes = sorted(memberships)
+        code_themes: dict[str, list[int]] = {}
+        self.names: dict[str, str] = {}
+        theme_codes: list[list[str]] = []
+        for theme_index, theme in enumerate(self.themes):
+            codes = []
+            for member in memberships[theme]:
+                code = member.get('code', '')
+                if not code or theme_index in code_themes.get(code, ()):
+                    continue
+                code_themes.setdefault(code, []).append(theme_index)
+                self.names.setdefault(code, member.get('name', ''))
+                codes.append(code)
+            theme_codes.append(codes)
+
+        self.codes = sorted(code_themes)
+        self._code_index = {code: index for index, code in enumerate(self.codes)}
+        self._code_indptr, self._code_themes = _csr([code_themes[code] for code in self.codes])
+        self._theme_indptr, self._theme_codes = _csr([[self._code_index[code] for code in codes] for codes in theme_codes])
+
+        n_codes, n_themes = len(self.codes), len(self.themes)
+        self._rate = np.zeros(n_codes)
+        self._amount = np.zeros(n_codes, dtype=np.int64)
+        self._quoted = np.zeros(n_codes, dtype=bool)
+        self.member_count = np.diff(self._theme_indptr)
+        self.quoted_count = np.zeros(n_themes, dtype=np.int64)
+        self.up_count = np.zeros(n_themes, dtype=np.int64)
+        self.total_amount = np.zeros(n_themes, dtype=np.int64)
+        self._amount_rate = np.zeros(n_themes)
+        self._lock = threading.Lock()
+
+    def update(self, quotes: Mapping[str, Mapping[str, Any]]) -> int:
+        """Apply new quotes; returns how many codes actually changed."""
+        indices, rates, amounts = [], [], []
+        for code, quote in quotes.items():
+            index = self._code_index.get(code)
+            if index is None:
+                continue
+            indices.append(index)
+            rates.append(normalize_float(quote.get('rate', 0.0)))
+            amounts.append(normalize_int(quote.get('amount', 0)))
+        if not indices:
+            return 0
+
+        with self._lock:
+            index = np.array(indices)
+            # A code listed twice in one batch keeps its last quote.
+            index, last = np.unique(index[::-1], return_index=True)
+            rate = np.array(rates)[::-1][last]
+            amount = np.array(amounts, dtype=np.int64)[::-1][last]
+            changed = ~self._quoted[index] | (self._rate[index] != rate) | (self._amount[index] != amount)
+            index, rate, amount = index[changed], rate[changed], amount[changed]
+            if not len(index):
+                return 0
+
+            was_quoted = self._quoted[index]
+            old_rate, old_amount = self._rate[index], self._amount[index]
+            self._apply(index, was_quoted.astype(np.int64), (was_quoted & (old_rate > 0)).astype(np.int64),
+                        np.where(was_quoted, old_amount, 0), np.where(was_quoted, old_amount * old_rate, 0.0), sign=-1)
+            self._apply(index, np.ones(len(index), dtype=np.int64), (rate > 0).astype(np.int64), amount, amount * rate, sign=1)
+            self._rate[index], self._amount[index], self._quoted[index] = rate, amount, True
+            return len(index)
+
+    def quotes(self) -> dict[str, dict[str, Any]]:
+        """The last applied quote per code, e.g. to replay into a rebuilt instance."""
+        with self._lock:
+            index = np.flatnonzero(self._quoted)
+            return {
+                self.codes[i]: {'rate': rate, 'amount': amount}
+                for i, rate, amount in zip(index.tolist(), self._rate[index].tolist(), self._amount[index].tolist())
+            }
+
+    def _apply(self, index, quoted, up, amount, amount_rate, sign: int) -> None:
+        starts = self._code_indptr[index]
+        repeats = self._code_indptr[index + 1] - starts
+        total = int(repeats.sum())
+        if not total:
+            return
+        # Expand each code to the positions of its themes in the CSR index array.
+        positions = np.repeat(starts - np.cumsum(repeats) + repeats, repeats) + np.arange(total)
+        themes = self._code_themes[positions]
+        np.add.at(self.quoted_count, themes, sign * np.repeat(quoted, repeats))
+        np.add.at(self.up_count, themes, sign * np.repeat(up, repeats))
+        np.add.at(self.total_amount, themes, sign * np.repeat(amount, repeats))
+        np.add.at(self._amount_rate, themes, sign * np.repeat(amount_rate, repeats))
+
+    def leaderboard(self, min_quoted: int = 1, sort_by: str = 'weighted_rate') -> pd.DataFrame:
+        """Ranked theme table: breadth, amount-weighted rate, total value and leader share."""
+        with self._lock:
+            quoted = self.quoted_count.copy()
+            up = self.up_count.copy()
+            total = self.total_amount.copy()
+            amount_rate = self._amount_rate.copy()
+            member_amount = np.where(self._quoted, self._amount, 0)[self._theme_codes]
+
+        keep = np.flatnonzero(quoted >= max(1, min_quoted))
+        if not len(keep):
+            return pd.DataFrame(columns=LEADERBOARD_FIELDS)
+
+        leaders = []
+        for theme_index in keep:
+            start, end = self._theme_indptr[theme_index], self._theme_indptr[theme_index + 1]
+            offset = int(np.argmax(member_amount[start:end])) if end > start else 0
+            leaders.append((self._theme_codes[start + offset], member_amount[start + offset]))
+        leader_amount = np.array([amount for _, amount in leaders], dtype=np.float64)
+        safe_total = np.maximum(total[keep], 1)
+
+        df = pd.DataFrame({
+            'theme': [self.themes[index] for index in keep],
+            'members': self.member_count[keep],
+            'quoted': quoted[keep],
+            'breadth': up[keep] / quoted[keep] * 100,
+            'weighted_rate': np.where(total[keep] > 0, amount_rate[keep] / safe_total, 0.0),
+            'total_amount': total[keep],
+            'leader': [self.names.get(self.codes[code_index], self.codes[code_index]) for code_index, _ in leaders],
+            'leader_share': np.where(total[keep] > 0, leader_amount / safe_total * 100, 0.0),
+        })
+        return df.sort_values(by=[sort_by, 'total_amount'], ascending=False, kind='stable').reset_index(drop=True)
+
+
+def _csr(rows: list[list[int]]) -> tuple[np.ndarray, np.ndarray]:
+    indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum([len(row) for row in rows])
+    indices = np.fromiter((value for row in rows for value in row), dtype=np.int64, count=int(indptr[-1]))
+    return indptr, indices
+
+
+_instances: dict[str, ThemeStrength] = {}
+_instances_lock = threading.Lock()
+
+
+def get_theme_strength(source: str) -> ThemeStrength:
+    """Process-wide ThemeStrength per quote source."""
+    with _instances_lock:
+        strength = _instances.get(source)
+        if strength is None:
+            strength = _instances[source] = ThemeStrength()
+        return strength
+
+
+def _rebuild_instances() -> None:
+    """Rebuild every instance from the reloaded theme maps, replaying its quotes."""
+    with _instances_lock:
+        current = dict(_instances)
+    for source, old in current.items():
+        strength = ThemeStrength()
+        strength.update(old.quotes())
+        with _instances_lock:
+            _instances[source] = strength
+
+
+add_reload_listener(_rebuild_instances)
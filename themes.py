@@ -1,6 +1,20 @@
+"""
+Theme lookups backed by stock_themes.json and theme_map.json.
+
+The maps are rebuilt whenever build_themes.py rewrites either file: readers stat the files
+at most every few seconds, a changed signature starts a rebuild on a background thread,
+and the finished maps replace the old ones in a single assignment. Readers never wait on
+a rebuild and never see a half-built cache; they keep the previous maps until the swap.
+"""
+
+import hashlib
 import json
+import threading
+import time
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable
+
+from metrics import record_error
 
 
 BUILTIN_BY_NAME = {
@@ -13,14 +27,52 @@ BUILTIN_BY_NAME = {
 }
 
 
-_cache: dict[str, Any] | None = None
+THEME_FILES = ("stock_themes.json", "theme_map.json")
+CHECK_INTERVAL_SECONDS = 2.0
 
-
-def _safe_load_json(path: Path) -> Any:
+_cache: dict[str, Any] | None = None
+_signature: tuple | None = None
+_digest = ""
+_version = 0
+_checked_at = 0.0
+# Serialises rebuilds only; readers never take it.
+_rebuild_lock = threading.Lock()
+_rebuild_thread: threading.Thread | None = None
+_listeners: list[Callable[[], None]] = []
+
+
+def _base_dir() -> Path:
+    return Path(__file__).resolve().parent
+
+
+def _file_signature() -> tuple:
+    """(mtime_ns, size) per theme file, None for a missing one."""
+    signature = []
+    for name in THEME_FILES:
+        try:
+            stat = (_base_dir() / name).stat()
+            signature.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            signature.append(None)
+    return tuple(signature)
+
+
+def _read_files() -> dict[str, bytes | None]:
+    contents: dict[str, bytes | None] = {}
+    for name in THEME_FILES:
+        try:
+            contents[name] = (_base_dir() / name).read_bytes()
+        except OSError:
+            contents[name] = None
+    return contents
+
+
+def _parse_json(raw: bytes | None) -> Any:
+    if raw is None:
+        return None
     try:
-        with path.open("r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception:
+        return json.loads(raw.decode("utf-8"))
+    except ValueError:
         return None
 
 
@@ -87,15 +139,7 @@ def _build_members_from_theme_map(data: Any) -> dict[str, list[dict[str, str]]]:
     return members
 
 
-def _load() -> dict[str, Any]:
-    global _cache
-    if _cache is not None:
-        return _cache
-
-    base = Path(__file__).resolve().parent
-    stock_themes_raw = _safe_load_json(base / "stock_themes.json")
-    theme_map_raw = _safe_load_json(base / "theme_map.json")
-
+def _build(stock_themes_raw: Any, theme_map_raw: Any) -> dict[str, Any]:
     by_name, by_code = _build_maps_from_stock_themes(stock_themes_raw)
     if not by_name:
         by_name = dict(BUILTIN_BY_NAME)
@@ -111,12 +155,85 @@ def _load() -> dict[str, Any]:
                     {"code": "", "name": stock_name, "market": ""}
                 )
 
-    _cache = {
+    return {
         "by_name": by_name,
         "by_code": by_code,
         "members": members,
     }
-    return _cache
+
+
+def _rebuild(signature: tuple, initial: bool = False) -> bool:
+    """Rebuild the maps from disk and swap them in; returns whether the maps changed."""
+    global _cache, _signature, _digest, _version
+    with _rebuild_lock:
+        if not initial and signature == _signature:
+            return False
+        contents = _read_files()
+        digest = hashlib.sha1(b"\0".join(raw or b"" for raw in contents.values())).hexdigest()
+        if _cache is not None and digest == _digest:
+            # Touched but unchanged (or rewritten with the same content).
+            _signature = signature
+            return False
+        parsed = {name: _parse_json(raw) for name, raw in contents.items()}
+        if not initial and any(contents[name] is not None and parsed[name] is None for name in THEME_FILES):
+            # A file is mid-write or broken: keep serving the current maps and
+            # leave the signature alone so the next check tries again.
+            return False
+        cache = _build(parsed["stock_themes.json"], parsed["theme_map.json"])
+        # One reference assignment: readers see either the old maps or the new ones.
+        _cache = cache
+        _signature, _digest = signature, digest
+        _version += 1
+    if initial:
+        return True
+    for listener in list(_listeners):
+        try:
+            listener()
+        except Exception:
+            record_error("themes.reload_listener")
+    return True
+
+
+def _check_for_changes() -> None:
+    global _checked_at, _rebuild_thread
+    now = time.monotonic()
+    if now - _checked_at < CHECK_INTERVAL_SECONDS:
+        return
+    _checked_at = now
+    signature = _file_signature()
+    if signature == _signature:
+        return
+    if _rebuild_thread is not None and _rebuild_thread.is_alive():
+        return
+    _rebuild_thread = threading.Thread(target=_rebuild, args=(signature,), name="themes-reload", daemon=True)
+    _rebuild_thread.start()
+
+
+def _load() -> dict[str, Any]:
+    cache = _cache
+    if cache is None:
+        # First use has nothing to serve yet, so it builds inline.
+        _rebuild(_file_signature(), initial=True)
+        return _cache
+    _check_for_changes()
+    return cache
+
+
+def reload_themes() -> bool:
+    """Rebuild now if the theme files changed; returns whether new maps were swapped in."""
+    _load()
+    return _rebuild(_file_signature())
+
+
+def theme_version() -> int:
+    """Incremented every time new maps are swapped in."""
+    _load()
+    return _version
+
+
+def add_reload_listener(listener: Callable[[], None]) -> None:
+    """Call `listener` (on the rebuild thread) after each swap, e.g. to rebuild derived indexes."""
+    _listeners.append(listener)
 
 
 def get_theme(stock_name: str, max_themes: int = 3) -> str:
@@ -139,6 +256,11 @@ def get_theme_members(theme_name: str) -> list[dict[str, str]]:
     return data["members"].get(theme_name, [])
 
 
+def get_all_theme_members() -> dict[str, list[dict[str, str]]]:
+    data = _load()
+    return data["members"]
+
+
 def get_all_themes() -> dict[str, list[str]]:
     data = _load()
     return data["by_name"]
@@ -0,0 +1,49 @@
+"""
+Boot-time warmup: build the indexes a first page view would otherwise build inline.
+
+`warm_up()` runs once per process (the dashboard calls it from a cache_resource, the
+quote service before it starts serving) and does its work on a background thread, so
+the first render is not held up by it.
+"""
+
+import threading
+import time
+from typing import Callable
+
+from last_quotes import get_last_known
+from metrics import record_error
+from naver_themes import get_catalog
+from security_master import get_master
+from shares_reference import get_shares_table
+from theme_matrix import get_theme_matrix
+from theme_strength import get_theme_strength
+from themes import get_all_theme_members
+
+WARMUP_TASKS: tuple[tuple[str, Callable[[], object]], ...] = (
+    ('themes', get_all_theme_members),
+    ('last_quotes', get_last_known),
+    ('theme_strength', lambda: get_theme_strength('naver')),
+    ('theme_matrix', get_theme_matrix),
+    ('shares', get_shares_table),
+    ('security_master', get_master),
+    ('naver_themes', get_catalog),
+)
+
+# Seconds each task took on the last warmup, shown under Diagnostics.
+timings: dict[str, float] = {}
+
+
+def _run() -> None:
+    for name, task in WARMUP_TASKS:
+        started = time.perf_counter()
+        try:
+            task()
+        except Exception:
+            record_error(f'warmup.{name}')
+        timings[name] = time.perf_counter() - started
+
+
+def warm_up() -> threading.Thread:
+    thread = threading.Thread(target=_run, name='warmup', daemon=True)
+    thread.start()
+    return thread